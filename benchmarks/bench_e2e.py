@@ -0,0 +1,179 @@
+"""End-to-end call benchmark through Proxy, pool and transport.
+
+Calls go to in-process mock providers, either from a fixed number of
+concurrent callers (closed loop) or at a fixed arrival rate regardless of
+how fast answers come back (open loop), and the results are printed as one
+JSON object. Run with, for example::
+
+    python -m benchmarks.bench_e2e --concurrency 64 --duration 10
+    python -m benchmarks.bench_e2e --rate 5000 --latency 0.002 --jitter 0.01
+
+Open loop latencies run from each call's scheduled arrival, so that a
+stalled client shows up in the percentiles instead of hiding them.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+from typing import Any, Optional
+
+from benchmarks.provider import MockProvider
+from dubbo.common.config import (
+    ApplicationConfig,
+    CenterConfig,
+    ProtocolConfig,
+    ReferenceConfig,
+)
+from dubbo.exceptions import RpcError
+from dubbo.pool import ConnectionPool
+from dubbo.proxy import Proxy
+from dubbo.registry import MemoryRegistry
+
+INTERFACE = "com.example.bench.EchoService"
+
+
+def quantile(latencies: list[float], q: float) -> Optional[float]:
+    # ``latencies`` sorted.
+    if not latencies:
+        return None
+    return latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+
+
+class Recorder:
+
+    __slots__ = ("latencies", "errors")
+
+    latencies: list[float]
+    errors: int
+
+    def __init__(self) -> None:
+        self.latencies = []
+        self.errors = 0
+
+    async def call(self, proxy: Proxy, args: tuple, started: float) -> None:
+        try:
+            await proxy.invoke("echo", args)
+        except RpcError:
+            self.errors += 1
+        else:
+            self.latencies.append(time.perf_counter() - started)
+
+
+async def closed_loop(
+    proxy: Proxy, args: tuple, recorder: Recorder, concurrency: int, until: float
+) -> None:
+    async def caller() -> None:
+        while time.perf_counter() < until:
+            await recorder.call(proxy, args, time.perf_counter())
+
+    await asyncio.gather(*[caller() for _ in range(concurrency)])
+
+
+async def open_loop(
+    proxy: Proxy, args: tuple, recorder: Recorder, rate: float, until: float
+) -> None:
+    # Poisson arrivals; calls still in flight at the end are waited for.
+    calls: set[asyncio.Task] = set()
+    arrival = time.perf_counter()
+    while arrival < until:
+        delay = arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        call = asyncio.ensure_future(recorder.call(proxy, args, arrival))
+        calls.add(call)
+        call.add_done_callback(calls.discard)
+        arrival += random.expovariate(rate)
+    if calls:
+        await asyncio.wait(calls)
+
+
+async def run(options: argparse.Namespace) -> dict[str, Any]:
+    providers = [
+        MockProvider(options.response_size, options.latency, options.jitter).start()
+        for _ in range(options.providers)
+    ]
+    registry = MemoryRegistry(ApplicationConfig("bench"), CenterConfig("memory://"))
+    for provider in providers:
+        registry.register(f"dubbo://127.0.0.1:{provider.port}/{INTERFACE}?version=1.0")
+    reference_config = ReferenceConfig(
+        INTERFACE,
+        "1.0",
+        protocols=(ProtocolConfig(connections=options.connections),),
+        loadbalance=options.loadbalance,
+        timeout=options.timeout,
+        concurrency=options.limit,
+        max_queue=options.max_queue,
+    )
+    pool = ConnectionPool()
+    proxy = Proxy(reference_config, registry, pool)
+    args = ("x" * options.request_size,)
+    try:
+        await proxy.connect()
+        warmup = Recorder()
+        await closed_loop(
+            proxy, args, warmup, 16, time.perf_counter() + options.warmup
+        )
+        recorder = Recorder()
+        cpu = time.thread_time()
+        started = time.perf_counter()
+        until = started + options.duration
+        if options.rate:
+            await open_loop(proxy, args, recorder, options.rate, until)
+        else:
+            await closed_loop(proxy, args, recorder, options.concurrency, until)
+        elapsed = time.perf_counter() - started
+        cpu = time.thread_time() - cpu
+    finally:
+        pool.close()
+        registry.close()
+        for provider in providers:
+            provider.stop()
+    latencies = sorted(recorder.latencies)
+    calls = len(latencies) + recorder.errors
+    return {
+        "python": platform.python_version(),
+        "mode": "open" if options.rate else "closed",
+        "options": vars(options),
+        "calls": calls,
+        "errors": recorder.errors,
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed,
+        "latency": {
+            "mean": sum(latencies) / len(latencies) if latencies else None,
+            "p50": quantile(latencies, 0.5),
+            "p99": quantile(latencies, 0.99),
+            "p999": quantile(latencies, 0.999),
+            "max": latencies[-1] if latencies else None,
+        },
+        # The client's thread only, the providers run on their own threads.
+        "cpu_per_call": cpu / calls if calls else None,
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    add = parser.add_argument
+    add("--duration", type=float, default=5.0, help="seconds")
+    add("--warmup", type=float, default=1.0, help="seconds")
+    add("--concurrency", type=int, default=64, help="closed loop callers")
+    add("--rate", type=float, default=0.0, help="open loop calls per second")
+    add("--providers", type=int, default=1)
+    add("--connections", type=int, default=1, help="per provider")
+    add("--loadbalance", default="random")
+    add("--latency", type=float, default=0.0, help="provider seconds")
+    add("--jitter", type=float, default=0.0, help="extra provider seconds")
+    add("--request-size", type=int, default=64, help="characters")
+    add("--response-size", type=int, default=64, help="characters")
+    add("--timeout", type=float, default=5.0, help="seconds")
+    add("--limit", type=int, default=None, help="initial adaptive concurrency")
+    add("--max-queue", type=int, default=128, help="calls waiting per provider")
+    options = parser.parse_args(argv)
+    json.dump(asyncio.run(run(options)), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Hessian2 serialization micro-benchmarks on typical DTO payloads.
+
+Run with ``python -m benchmarks.bench_hessian2``.
+"""
+from datetime import datetime
+from decimal import Decimal
+import timeit
+
+from dubbo.codec import DubboCodec, Invocation, RESPONSE_VALUE
+from dubbo.common.config import ReferenceConfig
+from dubbo.hessian2 import Decoder, Encoder, JavaObject
+
+
+def user(index: int) -> JavaObject:
+    return JavaObject(
+        "com.example.user.dto.UserDTO",
+        id=10000000 + index,
+        name=f"user-{index}",
+        nickname="昵称",
+        email=f"user{index}@example.com",
+        age=20 + index % 50,
+        vip=index % 3 == 0,
+        score=98.5,
+        balance=Decimal("1024.32"),
+        tags=["a", "b", "c"],
+        created=datetime(2022, 10, 1, 12, 0, 0),
+    )
+
+
+PAYLOADS = {
+    "string": "hello world",
+    "dto": user(1),
+    "dto_list_100": [user(i) for i in range(100)],
+    "map_100": {f"key-{i}": i for i in range(100)},
+    "binary_64k": bytes(65536),
+}
+
+
+def bench(name: str, statement, number: int) -> None:
+    seconds = min(timeit.repeat(statement, number=number, repeat=5))
+    print(f"{name:<32}{seconds / number * 1e6:>12.2f} us/op")
+
+
+def main() -> None:
+    encoder, decoder = Encoder(), Decoder()
+    for name, payload in PAYLOADS.items():
+        data = encoder.encode(payload)
+        number = 200 if name == "dto_list_100" else 20000
+        bench(f"encode {name} ({len(data)}B)", lambda: encoder.encode(payload), number)
+        view = memoryview(data)
+        bench(f"decode {name} ({len(data)}B)", lambda: decoder.decode(view), number)
+
+    codec = DubboCodec()
+    reference_config = ReferenceConfig("com.example.user.UserService", "1.0.0")
+    invocation = Invocation(reference_config, "getUser", ("long", "java.lang.String"))
+    bench(
+        "encode request",
+        lambda: codec.encode_request(invocation, (42, "name"), None),
+        20000,
+    )
+    response = memoryview(encoder.encode(RESPONSE_VALUE, user(1)))
+    bench("decode response", lambda: codec.decode_response(20, response), 20000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Cost of the metrics recorded by every call.
+
+Calls go through Proxy to an in-memory protocol answering at once, so that
+a call is nothing but the client's own work. Calls sampled one in 16, the
+default, and every call are timed against calls recording nothing at all,
+clock reads and sampling included; the difference is checked against the
+budget, and so are the histogram records and extra clock reads made per
+call priced at their own cost, which is less noisy. Run with::
+
+    python -m benchmarks.bench_metrics [calls]
+"""
+import asyncio
+from statistics import median
+import sys
+import time
+import timeit
+from typing import Optional, Sequence
+from unittest import mock
+
+from dubbo.codec import RESPONSE_NULL_VALUE, STATUS_OK, DubboCodec
+from dubbo.common.config import (
+    ApplicationConfig,
+    CenterConfig,
+    ProtocolConfig,
+    ReferenceConfig,
+)
+from dubbo.hessian2 import Encoder
+from dubbo.metrics import Histogram
+from dubbo.proxy import MethodStub, Proxy
+from dubbo.registry import MemoryRegistry
+from dubbo.transport import Response
+
+INTERFACE = "com.example.bench.EchoService"
+
+# The most the metrics may add to a call, in seconds.
+BUDGET = 1e-6
+
+# Runs of each sample, of a few thousand calls each.
+PASSES = 41
+
+
+class InstantProtocol:
+    """Answers every request with null before it is even awaited."""
+
+    __slots__ = ("codec", "_response")
+
+    writable: bool = True
+
+    def __init__(self) -> None:
+        self.codec = DubboCodec()
+        self._response = Response(
+            STATUS_OK, 0, memoryview(Encoder().encode(RESPONSE_NULL_VALUE))
+        )
+
+    def request(self, body: bytes, timeout: Optional[float] = None) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(self._response)
+        return future
+
+
+class InstantPool:
+
+    __slots__ = ("_protocol",)
+
+    def __init__(self) -> None:
+        self._protocol = InstantProtocol()
+
+    async def acquire(
+        self,
+        netloc: str,
+        protocol_config: ProtocolConfig,
+        timeout: Optional[float] = None,
+    ) -> InstantProtocol:
+        return self._protocol
+
+
+async def per_call(
+    samples: Sequence[int], calls: int
+) -> dict[int, tuple[float, float, float]]:
+    # Per metrics_sample, the histogram records and clock reads per call,
+    # and the median of PASSES runs in seconds per call, the runs of every
+    # sample interleaved so that all of them see the same machine.
+    registry = MemoryRegistry(ApplicationConfig("bench"), CenterConfig("memory://"))
+    registry.register(f"dubbo://127.0.0.1:20880/{INTERFACE}?version=1.0")
+    args = ("x" * 64,)
+    stubs = {
+        metrics_sample: Proxy(
+            ReferenceConfig(
+                INTERFACE,
+                "1.0",
+                protocols=(ProtocolConfig(),),
+                metrics_sample=metrics_sample,
+            ),
+            registry,
+            InstantPool(),  # type: ignore[arg-type]
+        ).stub("echo")
+        for metrics_sample in samples
+    }
+
+    async def run(echo: MethodStub) -> float:
+        started = time.perf_counter()
+        for _ in range(calls):
+            await echo(*args)
+        return (time.perf_counter() - started) / calls
+
+    counts = {}
+    for metrics_sample, echo in stubs.items():
+        with mock.patch.object(
+            Histogram, "record", autospec=True, side_effect=Histogram.record
+        ) as record, mock.patch.object(
+            time, "monotonic", side_effect=time.monotonic
+        ) as monotonic:
+            await run(echo)
+        counts[metrics_sample] = (
+            record.call_count / calls,
+            monotonic.call_count / calls,
+        )
+    runs: dict[int, list[float]] = {metrics_sample: [] for metrics_sample in stubs}
+    for _ in range(PASSES):
+        for metrics_sample, echo in stubs.items():
+            runs[metrics_sample].append(await run(echo))
+    registry.close()
+    return {
+        metrics_sample: (*counts[metrics_sample], median(runs[metrics_sample]))
+        for metrics_sample in stubs
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    calls = int(argv[0]) if argv else 5000
+    histogram = Histogram()
+    number = 200000
+    record_cost = (
+        min(timeit.repeat(lambda: histogram.record(1e-4), number=number, repeat=5))
+        / number
+    )
+    clock_cost = (
+        min(timeit.repeat(time.monotonic, number=number, repeat=5)) / number
+    )
+    print(f"{'record':<20}{record_cost * 1e6:>10.2f} us")
+    print(f"{'monotonic':<20}{clock_cost * 1e6:>10.2f} us")
+    # Without sampling nothing is recorded, and no clock read for it.
+    results = asyncio.run(per_call((0, 16, 1), calls))
+    _, clocks, baseline = results.pop(0)
+    print(f"{'metrics_sample=0':<20}{baseline * 1e6:>10.2f} us/call")
+    for metrics_sample, (records, sample_clocks, elapsed) in results.items():
+        reads = sample_clocks - clocks
+        priced = records * record_cost + reads * clock_cost
+        measured = elapsed - baseline
+        print(
+            f"{f'metrics_sample={metrics_sample}':<20}"
+            f"{measured * 1e6:>10.2f} us/call more"
+            f"{'' if max(measured, priced) < BUDGET else ' over budget'}"
+            f", {priced * 1e6:.2f} us for {records:.2f} records"
+            f" and {reads:.2f} clock reads"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Registry memory footprint at a large provider fleet.
+
+Run with ``python -m benchmarks.bench_registry [providers]``.
+"""
+import sys
+import time
+import tracemalloc
+import urllib.parse
+
+from dubbo.common.config import ApplicationConfig, CenterConfig, ReferenceConfig
+from dubbo.registry import Registry, parse_node
+
+INTERFACES = 100
+METHODS = ",".join(f"method{i}" for i in range(40))
+
+
+def children(providers: int) -> dict[str, list[str]]:
+    # Java providers publish every interface of the application from each
+    # host, so netlocs, versions and method lists repeat across children.
+    interfaces: dict[str, list[str]] = {}
+    for index in range(providers):
+        interface = f"com.example.service.DemoService{index % INTERFACES}"
+        query = urllib.parse.urlencode(
+            {
+                "anyhost": "true",
+                "application": "demo-provider",
+                "deprecated": "false",
+                "dubbo": "2.0.2",
+                "dynamic": "true",
+                "generic": "false",
+                "group": "default",
+                "interface": interface,
+                "methods": METHODS,
+                "pid": str(1000 + index // INTERFACES),
+                "release": "2.7.15",
+                "revision": "1.0.0",
+                "side": "provider",
+                "timestamp": str(1660000000000 + index // INTERFACES),
+                "version": "1.0.0",
+            }
+        )
+        host = index // INTERFACES
+        netloc = f"10.0.{host // 256 % 256}.{host % 256}:20880"
+        url = f"dubbo://{netloc}/{interface}?{query}"
+        interfaces.setdefault(interface, []).append(urllib.parse.quote(url, safe=""))
+    return interfaces
+
+
+def build(
+    interfaces: dict[str, list[str]], references: list[ReferenceConfig]
+) -> tuple[Registry, float]:
+    start = time.perf_counter()
+    registry = Registry(ApplicationConfig("bench"), CenterConfig("memory://"))
+    for interface, values in interfaces.items():
+        registry._update(interface, values)
+    for reference_config in references:
+        registry._subscribe(reference_config).instances
+    return registry, time.perf_counter() - start
+
+
+def main() -> None:
+    providers = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    interfaces = children(providers)
+    references = [
+        ReferenceConfig(interface, "1.0.0", "default") for interface in interfaces
+    ]
+
+    elapsed = build(interfaces, references)[1]
+    parse_node.cache_clear()
+    tracemalloc.start()
+    registry = build(interfaces, references)[0]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    registry.close()
+
+    print(f"providers                       {providers:>12}")
+    print(f"interfaces                      {len(interfaces):>12}")
+    print(f"index build                     {elapsed * 1000:>12.1f} ms")
+    print(f"retained                        {current / 2**20:>12.1f} MiB")
+    print(f"peak                            {peak / 2**20:>12.1f} MiB")
+    print(f"per provider                    {current / providers:>12.0f} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Mock Dubbo provider answering every call with a fixed payload.
+
+Runs on an event loop thread of its own, so that the client's CPU time
+can be told apart from the provider's with ``time.thread_time()``.
+"""
+import asyncio
+import random
+import threading
+from typing import Optional
+
+from dubbo.codec import RESPONSE_NULL_VALUE, RESPONSE_VALUE, STATUS_OK
+from dubbo.hessian2 import Encoder
+from dubbo.transport import (
+    FLAG_EVENT,
+    FLAG_TWOWAY,
+    HEADER,
+    MAGIC,
+    NULL_BODY,
+    SERIALIZATION_MASK,
+    FrameDecoder,
+)
+
+__all__ = ("MockProviderProtocol", "MockProvider")
+
+
+def response_body(size: int) -> bytes:
+    # A string of ``size`` characters, or null for none.
+    encoder = Encoder()
+    if size:
+        encoder.write(RESPONSE_VALUE)
+        encoder.write("x" * size)
+    else:
+        encoder.write(RESPONSE_NULL_VALUE)
+    return encoder.getvalue()
+
+
+class MockProviderProtocol(asyncio.Protocol):
+    """Replies ``body`` after ``latency`` plus up to ``jitter`` seconds."""
+
+    def __init__(self, body: bytes, latency: float = 0.0, jitter: float = 0.0) -> None:
+        self._body = body
+        self._latency = latency
+        self._jitter = jitter
+        self._decoder = FrameDecoder()
+        self._transport: Optional[asyncio.Transport] = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self._transport = transport  # type: ignore[assignment]
+
+    def data_received(self, data: bytes) -> None:
+        loop = asyncio.get_running_loop()
+        for frame in self._decoder.feed(data):
+            if not frame.flag & FLAG_TWOWAY:
+                continue
+            flag = frame.flag & SERIALIZATION_MASK
+            if frame.flag & FLAG_EVENT:
+                # Heartbeats are answered at once.
+                self._reply(FLAG_EVENT | flag, frame.request_id, NULL_BODY)
+                continue
+            delay = self._latency
+            if self._jitter:
+                delay += random.random() * self._jitter
+            if delay:
+                loop.call_later(delay, self._reply, flag, frame.request_id, self._body)
+            else:
+                self._reply(flag, frame.request_id, self._body)
+
+    def _reply(self, flag: int, request_id: int, body: bytes) -> None:
+        transport = self._transport
+        if transport is not None and not transport.is_closing():
+            transport.write(
+                HEADER.pack(MAGIC, flag, STATUS_OK, request_id, len(body)) + body
+            )
+
+
+class MockProvider:
+    """A mock provider listening on 127.0.0.1 from a background thread."""
+
+    def __init__(
+        self, response_size: int = 64, latency: float = 0.0, jitter: float = 0.0
+    ) -> None:
+        body = response_body(response_size)
+        self._factory = lambda: MockProviderProtocol(body, latency, jitter)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.port = 0
+
+    def start(self) -> "MockProvider":
+        self._thread.start()
+        self._server = asyncio.run_coroutine_threadsafe(
+            self._loop.create_server(self._factory, "127.0.0.1", 0), self._loop
+        ).result()
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
@@ -0,0 +1,129 @@
+"""Result cache classes."""
+import asyncio
+from collections import OrderedDict
+from functools import partial
+import time
+from typing import Any, Awaitable, Callable, NamedTuple
+
+from dubbo.hessian2 import Encoder
+
+__all__ = ("ResultCache",)
+
+MISSING = object()
+
+# Parameter types and serialized arguments.
+Key = tuple[tuple[str, ...], bytes]
+
+
+class Entry(NamedTuple):
+    value: Any
+    size: int
+    # The time.monotonic() past which the entry is not served.
+    expires: float
+
+
+class ResultCache:
+    """Results of one method by arguments, evicted by age and LRU.
+
+    Keys are the arguments serialized with Hessian2, so that lists, maps
+    and Java objects key the cache as well as strings, and two calls hit
+    the same entry exactly when they would send the same arguments. The
+    cache holds at most ``max_entries`` results and ``max_bytes`` of keys
+    and serialized results, each for ``ttl`` seconds. Concurrent calls
+    with a result missing share one load of it.
+
+    Every caller hitting an entry gets the very same object, which must be
+    treated as read-only: a change made by one caller would be seen by the
+    others, and serving copies would cost more than the call saved.
+    """
+
+    __slots__ = (
+        "_ttl",
+        "_max_entries",
+        "_max_bytes",
+        "_entries",
+        "_bytes",
+        "_loading",
+        "_encoder",
+    )
+
+    _ttl: float
+    _max_entries: int
+    _max_bytes: int
+    _entries: OrderedDict[Key, Entry]
+    _bytes: int
+    _loading: dict[Key, asyncio.Future]
+    _encoder: Encoder
+
+    def __init__(
+        self,
+        ttl: float = 60.0,
+        max_entries: int = 1000,
+        max_bytes: int = 16 * 1024 * 1024,
+    ) -> None:
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._loading = dict()
+        self._encoder = Encoder()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def key(self, parameter_types: tuple[str, ...], args: Any) -> Key:
+        return (parameter_types, self._encoder.encode(*args))
+
+    def get(self, key: Key) -> Any:
+        # The cached result, or MISSING.
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        if entry.expires <= time.monotonic():
+            self._remove(key)
+            return MISSING
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def put(self, key: Key, value: Any, size: int) -> None:
+        # ``size`` is the value's serialized size, as received.
+        size += len(key[1])
+        if size > self._max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = Entry(value, size, time.monotonic() + self._ttl)
+        self._bytes += size
+        entries = self._entries
+        while len(entries) > self._max_entries or self._bytes > self._max_bytes:
+            self._bytes -= entries.popitem(last=False)[1].size
+
+    async def load(
+        self, key: Key, loader: Callable[[], Awaitable[tuple[Any, int]]]
+    ) -> Any:
+        # The result of a key, loaded once for every caller asking for it
+        # meanwhile and cached; failures go to all of them, uncached. The
+        # loader returns the result with its size.
+        future = self._loading.get(key)
+        if future is None:
+            future = self._loading[key] = asyncio.ensure_future(loader())
+            future.add_done_callback(partial(self._loaded, key))
+        # A caller giving up leaves the load to the others.
+        return (await asyncio.shield(future))[0]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def _loaded(self, key: Key, future: asyncio.Future) -> None:
+        del self._loading[key]
+        if not future.cancelled() and future.exception() is None:
+            self.put(key, *future.result())
+
+    def _remove(self, key: Key) -> None:
+        self._bytes -= self._entries.pop(key).size
@@ -0,0 +1,181 @@
+"""Dubbo RPC body codec."""
+from datetime import datetime
+from decimal import Decimal
+import struct
+from typing import Any, Optional, Sequence, Union
+
+from dubbo.common.config import ReferenceConfig
+from dubbo.exceptions import ProtocolError, RemotingError, ServiceError
+from dubbo.hessian2 import Decoder, Encoder, JavaObject
+
+__all__ = ("DubboCodec", "Invocation", "descriptor", "java_types")
+
+DUBBO_VERSION = "2.0.2"
+DEFAULT_VERSION = "0.0.0"
+
+STATUS_OK = 20
+STATUS_MESSAGES = {
+    30: "client timeout",
+    31: "server timeout",
+    40: "bad request",
+    50: "bad response",
+    60: "service not found",
+    70: "service error",
+    80: "server error",
+    90: "client error",
+    100: "server threadpool exhausted",
+}
+
+RESPONSE_WITH_EXCEPTION = 0
+RESPONSE_VALUE = 1
+RESPONSE_NULL_VALUE = 2
+RESPONSE_WITH_EXCEPTION_WITH_ATTACHMENTS = 3
+RESPONSE_VALUE_WITH_ATTACHMENTS = 4
+RESPONSE_NULL_VALUE_WITH_ATTACHMENTS = 5
+
+_PRIMITIVES = {
+    "boolean": "Z",
+    "byte": "B",
+    "char": "C",
+    "short": "S",
+    "int": "I",
+    "long": "J",
+    "float": "F",
+    "double": "D",
+    "void": "V",
+}
+
+_JAVA_TYPES: dict[type, str] = {
+    str: "java.lang.String",
+    bool: "boolean",
+    float: "double",
+    bytes: "byte[]",
+    bytearray: "byte[]",
+    list: "java.util.List",
+    tuple: "java.util.List",
+    dict: "java.util.Map",
+    datetime: "java.util.Date",
+    Decimal: "java.math.BigDecimal",
+    type(None): "java.lang.Object",
+}
+
+
+def _descriptor(name: str) -> str:
+    if name.startswith("["):
+        return name.replace(".", "/")
+    dimensions = 0
+    while name.endswith("[]"):
+        name = name[:-2]
+        dimensions += 1
+    return "[" * dimensions + (_PRIMITIVES.get(name) or f"L{name.replace('.', '/')};")
+
+
+def descriptor(parameter_types: Sequence[str]) -> str:
+    return "".join(_descriptor(name) for name in parameter_types)
+
+
+def java_types(args: Sequence[Any]) -> tuple[str, ...]:
+    types = []
+    for arg in args:
+        if isinstance(arg, JavaObject):
+            types.append(arg.java_class)
+        elif type(arg) is int:
+            types.append("int" if -0x80000000 <= arg <= 0x7FFFFFFF else "long")
+        else:
+            types.append(_JAVA_TYPES.get(type(arg), "java.lang.Object"))
+    return tuple(types)
+
+
+class Invocation:
+    """The encoded parts of a request that are constant for a method."""
+
+    __slots__ = ("method", "parameter_types", "header", "attachments")
+
+    method: str
+    parameter_types: tuple[str, ...]
+    header: bytes
+    attachments: bytes
+
+    def __init__(
+        self,
+        reference_config: ReferenceConfig,
+        method: str,
+        parameter_types: Sequence[str],
+    ) -> None:
+        self.method = method
+        self.parameter_types = tuple(parameter_types)
+        interface = reference_config.interface
+        version = reference_config.version or DEFAULT_VERSION
+        encoder = Encoder()
+        self.header = encoder.encode(
+            DUBBO_VERSION, interface, version, method, descriptor(parameter_types)
+        )
+        attachments = ["path", interface, "interface", interface, "version", version]
+        if reference_config.group:
+            attachments += ["group", reference_config.group]
+        self.attachments = encoder.encode(*attachments)
+
+
+class DubboCodec:
+
+    __slots__ = ("_encoder", "_decoder")
+
+    _encoder: Encoder
+    _decoder: Decoder
+
+    def __init__(self) -> None:
+        self._encoder = Encoder()
+        self._decoder = Decoder()
+
+    def encode_request(
+        self,
+        invocation: Invocation,
+        args: Sequence[Any],
+        attachments: Optional[dict[str, Any]] = None,
+    ) -> bytes:
+        encoder = self._encoder
+        encoder.reset()
+        encoder.write_raw(invocation.header)
+        for arg in args:
+            encoder.write(arg)
+        encoder.write_raw(b"H")
+        encoder.write_raw(invocation.attachments)
+        if attachments:
+            for key, value in attachments.items():
+                encoder.write_string(key)
+                encoder.write(value)
+        encoder.write_raw(b"Z")
+        return encoder.getvalue()
+
+    def decode_response(
+        self, status: int, body: Union[bytes, memoryview]
+    ) -> Any:
+        decoder = self._decoder
+        if status != STATUS_OK:
+            message = STATUS_MESSAGES.get(status)
+            try:
+                message = decoder.decode(body) or message
+            except (IndexError, ValueError, struct.error):
+                pass
+            raise RemotingError(status, message)
+        decoder.reset(body)
+        try:
+            flag = decoder.read()
+            if flag == RESPONSE_VALUE or flag == RESPONSE_VALUE_WITH_ATTACHMENTS:
+                return decoder.read()
+            if (
+                flag == RESPONSE_NULL_VALUE
+                or flag == RESPONSE_NULL_VALUE_WITH_ATTACHMENTS
+            ):
+                return None
+            if (
+                flag == RESPONSE_WITH_EXCEPTION
+                or flag == RESPONSE_WITH_EXCEPTION_WITH_ATTACHMENTS
+            ):
+                exception = decoder.read()
+            else:
+                raise RemotingError(status, f"unknown response flag {flag}")
+        except (IndexError, ValueError, struct.error) as e:
+            # A truncated or corrupt body.
+            raise ProtocolError(f"malformed response body: {e!r}") from e
+        raise ServiceError(exception)
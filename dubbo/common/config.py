@@ -1,5 +1,11 @@
 """Dubbo configuration classes."""
-__all__ = ("ApplicationConfig", "ProtocolConfig", "CenterConfig", "ReferenceConfig")
+__all__ = (
+    "ApplicationConfig",
+    "ProtocolConfig",
+    "CenterConfig",
+    "MethodConfig",
+    "ReferenceConfig",
+)
 
 from abc import ABC, abstractmethod
 from typing import Optional, Tuple
@@ -40,14 +46,62 @@ class ApplicationConfig(BaseConfig):
 
 class ProtocolConfig(BaseConfig):
 
-    __slots__ = ("_name", "_port")
+    __slots__ = (
+        "_name",
+        "_port",
+        "_connections",
+        "_idle_timeout",
+        "_heartbeat",
+        "_flush_bytes",
+        "_flush_delay",
+        "_high_water",
+        "_low_water",
+        "_connect_timeout",
+        "_payload",
+    )
 
     _name: str
     _port: int
+    _connections: int
+    _idle_timeout: float
+    _heartbeat: float
+    # Frames are written out once per loop iteration, or after
+    # ``flush_delay`` seconds, unless ``flush_bytes`` are queued first.
+    _flush_bytes: int
+    _flush_delay: float
+    # Write buffer limits of a connection, in bytes, for backpressure.
+    _high_water: int
+    _low_water: int
+    # Seconds a new connection may take to be established.
+    _connect_timeout: float
+    # The largest frame body accepted, in bytes, as Java Dubbo's payload.
+    _payload: int
 
-    def __init__(self, name: str = "dubbo", port: int = 20880) -> None:
+    def __init__(
+        self,
+        name: str = "dubbo",
+        port: int = 20880,
+        connections: int = 1,
+        idle_timeout: float = 600.0,
+        heartbeat: float = 60.0,
+        flush_bytes: int = 64 * 1024,
+        flush_delay: float = 0.0,
+        high_water: int = 4 * 1024 * 1024,
+        low_water: int = 1024 * 1024,
+        connect_timeout: float = 3.0,
+        payload: int = 8 * 1024 * 1024,
+    ) -> None:
         self._name = name
         self._port = port
+        self._connections = connections
+        self._idle_timeout = idle_timeout
+        self._heartbeat = heartbeat
+        self._flush_bytes = flush_bytes
+        self._flush_delay = flush_delay
+        self._high_water = high_water
+        self._low_water = low_water
+        self._connect_timeout = connect_timeout
+        self._payload = payload
 
     @property
     def id(self) -> str:
@@ -61,15 +115,72 @@ class ProtocolConfig(BaseConfig):
     def port(self) -> int:
         return self._port
 
+    @property
+    def connections(self) -> int:
+        return self._connections
+
+    @property
+    def idle_timeout(self) -> float:
+        return self._idle_timeout
+
+    @property
+    def heartbeat(self) -> float:
+        return self._heartbeat
+
+    @property
+    def flush_bytes(self) -> int:
+        return self._flush_bytes
+
+    @property
+    def flush_delay(self) -> float:
+        return self._flush_delay
+
+    @property
+    def high_water(self) -> int:
+        return self._high_water
+
+    @property
+    def low_water(self) -> int:
+        return self._low_water
+
+    @property
+    def connect_timeout(self) -> float:
+        return self._connect_timeout
+
+    @property
+    def payload(self) -> int:
+        return self._payload
+
 
 class CenterConfig(BaseConfig):
 
-    __slots__ = "_address"
+    __slots__ = (
+        "_address",
+        "_debounce",
+        "_snapshot",
+        "_snapshot_interval",
+        "_shared",
+    )
 
     _address: str
+    _debounce: float
+    _snapshot: Optional[str]
+    _snapshot_interval: float
+    _shared: Optional[str]
 
-    def __init__(self, address: str) -> None:
+    def __init__(
+        self,
+        address: str,
+        debounce: float = 0.2,
+        snapshot: Optional[str] = None,
+        snapshot_interval: float = 30.0,
+        shared: Optional[str] = None,
+    ) -> None:
         self._address = address
+        self._debounce = debounce
+        self._snapshot = snapshot
+        self._snapshot_interval = snapshot_interval
+        self._shared = shared
 
     @property
     def id(self) -> str:
@@ -79,6 +190,99 @@ class CenterConfig(BaseConfig):
     def address(self) -> str:
         return self._address
 
+    @property
+    def debounce(self) -> float:
+        return self._debounce
+
+    @property
+    def snapshot(self) -> Optional[str]:
+        return self._snapshot
+
+    @property
+    def snapshot_interval(self) -> float:
+        return self._snapshot_interval
+
+    @property
+    def shared(self) -> Optional[str]:
+        return self._shared
+
+
+class MethodConfig(BaseConfig):
+
+    __slots__ = (
+        "_name",
+        "_timeout",
+        "_hedge",
+        "_cache",
+        "_cache_ttl",
+        "_cache_entries",
+        "_cache_bytes",
+    )
+
+    _name: str
+    _timeout: Optional[float]
+    # The percentile of the method's latency, such as 0.95, after which a
+    # call is sent to a second provider as well; idempotent methods only.
+    _hedge: Optional[float]
+    # "lru" to serve calls from earlier results with the same arguments,
+    # for up to ``cache_ttl`` seconds, within entry and byte bounds; the
+    # results are shared by the callers, read-only.
+    _cache: Optional[str]
+    _cache_ttl: float
+    _cache_entries: int
+    _cache_bytes: int
+
+    def __init__(
+        self,
+        name: str,
+        timeout: Optional[float] = None,
+        hedge: Optional[float] = None,
+        cache: Optional[str] = None,
+        cache_ttl: float = 60.0,
+        cache_entries: int = 1000,
+        cache_bytes: int = 16 * 1024 * 1024,
+    ) -> None:
+        assert cache in (None, "lru"), f"unknown cache {cache}"
+        self._name = name
+        self._timeout = timeout
+        self._hedge = hedge
+        self._cache = cache
+        self._cache_ttl = cache_ttl
+        self._cache_entries = cache_entries
+        self._cache_bytes = cache_bytes
+
+    @property
+    def id(self) -> str:
+        return self._name
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def timeout(self) -> Optional[float]:
+        return self._timeout
+
+    @property
+    def hedge(self) -> Optional[float]:
+        return self._hedge
+
+    @property
+    def cache(self) -> Optional[str]:
+        return self._cache
+
+    @property
+    def cache_ttl(self) -> float:
+        return self._cache_ttl
+
+    @property
+    def cache_entries(self) -> int:
+        return self._cache_entries
+
+    @property
+    def cache_bytes(self) -> int:
+        return self._cache_bytes
+
 
 class ReferenceConfig(BaseConfig):
 
@@ -89,6 +293,14 @@ class ReferenceConfig(BaseConfig):
         "_protocols",
         "_registries",
         "_metadata_report",
+        "_loadbalance",
+        "_timeout",
+        "_methods",
+        "_concurrency",
+        "_max_queue",
+        "_outlier_detection",
+        "_hedge_budget",
+        "_metrics_sample",
     )
 
     _interface: str
@@ -97,6 +309,21 @@ class ReferenceConfig(BaseConfig):
     _protocols: dict[str, ProtocolConfig]
     _registries: dict[str, CenterConfig]
     _metadata_report: Optional[CenterConfig]
+    _loadbalance: str
+    # In seconds, for every method without a timeout of its own.
+    _timeout: Optional[float]
+    _methods: dict[str, MethodConfig]
+    # The initial adaptive limit of calls in flight per provider, None, the
+    # default, for no limit, and how many calls may wait for one once it is
+    # reached.
+    _concurrency: Optional[int]
+    _max_queue: int
+    _outlier_detection: bool
+    # The share of the calls to hedged methods that may be hedged.
+    _hedge_budget: float
+    # One call in this many records its RTT, queue, codec, size and
+    # provider histograms; 0 for none.
+    _metrics_sample: int
 
     def __init__(
         self,
@@ -106,6 +333,14 @@ class ReferenceConfig(BaseConfig):
         protocols: Optional[Tuple[ProtocolConfig]] = None,
         registries: Optional[Tuple[CenterConfig]] = None,
         metadata_report: Optional[CenterConfig] = None,
+        loadbalance: str = "random",
+        timeout: Optional[float] = 1.0,
+        methods: Optional[Tuple[MethodConfig, ...]] = None,
+        concurrency: Optional[int] = None,
+        max_queue: int = 128,
+        outlier_detection: bool = True,
+        hedge_budget: float = 0.05,
+        metrics_sample: int = 16,
     ) -> None:
         self._interface = interface
         self._version = version
@@ -113,6 +348,14 @@ class ReferenceConfig(BaseConfig):
         self.protocols = protocols
         self.registries = registries
         self._metadata_report = metadata_report
+        self._loadbalance = loadbalance
+        self._timeout = timeout
+        self.methods = methods
+        self._concurrency = concurrency
+        self._max_queue = max_queue
+        self._outlier_detection = outlier_detection
+        self._hedge_budget = hedge_budget
+        self._metrics_sample = metrics_sample
 
     @property
     def id(self) -> str:
@@ -130,6 +373,48 @@ class ReferenceConfig(BaseConfig):
     def group(self) -> Optional[str]:
         return self._group
 
+    @property
+    def loadbalance(self) -> str:
+        return self._loadbalance
+
+    @property
+    def timeout(self) -> Optional[float]:
+        return self._timeout
+
+    @property
+    def methods(self) -> dict[str, MethodConfig]:
+        return self._methods
+
+    @methods.setter
+    def methods(self, values: Optional[Tuple[MethodConfig, ...]]) -> None:
+        self._methods = {} if not values else {config.id: config for config in values}
+
+    @property
+    def concurrency(self) -> Optional[int]:
+        return self._concurrency
+
+    @property
+    def max_queue(self) -> int:
+        return self._max_queue
+
+    @property
+    def outlier_detection(self) -> bool:
+        return self._outlier_detection
+
+    @property
+    def hedge_budget(self) -> float:
+        return self._hedge_budget
+
+    @property
+    def metrics_sample(self) -> int:
+        return self._metrics_sample
+
+    def method_timeout(self, method: str) -> Optional[float]:
+        config = self._methods.get(method)
+        if config is not None and config.timeout is not None:
+            return config.timeout
+        return self._timeout
+
     @property
     def protocols(self) -> dict[str, ProtocolConfig]:
         return self._protocols
@@ -154,4 +439,4 @@ class ReferenceConfig(BaseConfig):
 
     @metadata_report.setter
     def metadata_report(self, value: Optional[CenterConfig]) -> None:
-        self.metadata_report = value
+        self._metadata_report = value
@@ -1,3 +1,17 @@
-__all__ = ("Bootstrap",)
+__all__ = (
+    "ApplicationConfig",
+    "Bootstrap",
+    "CenterConfig",
+    "MethodConfig",
+    "ProtocolConfig",
+    "ReferenceConfig",
+)
 
+from dubbo.common.config import (
+    ApplicationConfig,
+    CenterConfig,
+    MethodConfig,
+    ProtocolConfig,
+    ReferenceConfig,
+)
 from .bootstrap import Bootstrap
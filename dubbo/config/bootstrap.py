@@ -1,18 +1,21 @@
 """The bootstrap class of Dubbo"""
-from dubbo.proxy import Proxy
-from dubbo.registry import Registry
 from __future__ import annotations
 
+import asyncio
+import time
+from typing import Any, Callable, Coroutine, Optional, Tuple, Union
 
-from typing import Optional, Tuple, Union
-
-from abc.meta import SingletonMeta
-from common.config import (
+from dubbo.abc.meta import SingletonMeta
+from dubbo.common.config import (
     ApplicationConfig,
     ProtocolConfig,
     CenterConfig,
     ReferenceConfig,
 )
+from dubbo.pool import ConnectionPool
+from dubbo.proxy import Proxy
+from dubbo.registry import Registry, RegistryFactory
+from dubbo.sync import SyncProxy
 
 
 class Bootstrap(metaclass=SingletonMeta):
@@ -25,6 +28,7 @@ class Bootstrap(metaclass=SingletonMeta):
         "_reference_config",
         "_registry_center",
         "_reference_proxy",
+        "_connection_pool",
     )
 
     _application_config: Optional[ApplicationConfig]
@@ -35,12 +39,21 @@ class Bootstrap(metaclass=SingletonMeta):
 
     _registry_center: dict[str, Registry]
     _reference_proxy: dict[str, Proxy]
+    _connection_pool: ConnectionPool
 
     def __init__(self) -> None:
+        self._application_config = None
         self._protocol_config = dict()
         self._registry_config = dict()
         self._metadata_report_config = dict()
         self._reference_config = dict()
+        self._registry_center = dict()
+        self._reference_proxy = dict()
+        self._connection_pool = ConnectionPool()
+
+    @property
+    def connection_pool(self) -> ConnectionPool:
+        return self._connection_pool
 
     def application(self, config: Union[str, ApplicationConfig]) -> Bootstrap:
         if isinstance(config, str):
@@ -117,6 +130,75 @@ class Bootstrap(metaclass=SingletonMeta):
         self._reference_config[key] = config
         return self
 
+    def proxy(self, name: str) -> Proxy:
+        return self._reference_proxy[name]
+
+    def sync_proxy(self, name: str) -> SyncProxy:
+        # Blocking calls through the process's event loop thread; stop with
+        # LoopThread().run(bootstrap.stop) then.
+        return SyncProxy(self._reference_proxy[name])
+
     def start(self) -> None:
-        self._registry_center = {}
-        pass
+        assert self._application_config is not None
+        for registry_config in self._registry_config.values():
+            if registry_config.id not in self._registry_center:
+                self._registry_center[registry_config.id] = RegistryFactory.get_registry(
+                    self._application_config, registry_config
+                )
+        for key, reference_config in self._reference_config.items():
+            if key not in self._reference_proxy:
+                registry_config = next(iter(reference_config.registries.values()))
+                self._reference_proxy[key] = Proxy(
+                    reference_config,
+                    self._registry_center[registry_config.id],
+                    self._connection_pool,
+                )
+
+    async def warmup(
+        self, connect_ratio: float = 1.0, echo: bool = False, timeout: float = 10.0
+    ) -> dict[str, float]:
+        """Starts and prepares every reference ahead of the first calls.
+
+        Subscribes all references concurrently, connects to ``connect_ratio``
+        of their providers and, with ``echo``, sends each one an ``$echo``
+        call. Phases share the ``timeout`` deadline; what is still pending
+        then is cancelled and left to the request path. Returns the seconds
+        spent per phase.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        started = time.monotonic()
+        self.start()
+        timings = {"registries": time.monotonic() - started}
+        phases: list[tuple[str, Callable[[Proxy], Coroutine[Any, Any, Any]]]] = [
+            ("subscribe", lambda proxy: proxy.instances())
+        ]
+        if connect_ratio > 0:
+            phases.append(("connect", lambda proxy: proxy.connect(connect_ratio)))
+        if echo:
+            phases.append(
+                (
+                    "echo",
+                    lambda proxy: proxy.invoke("$echo", ("",), ("java.lang.Object",)),
+                )
+            )
+        proxies = list(self._reference_proxy.values())
+        for phase, action in phases:
+            remaining = deadline - loop.time()
+            if remaining <= 0 or not proxies:
+                break
+            started = time.monotonic()
+            tasks = [asyncio.ensure_future(action(proxy)) for proxy in proxies]
+            done, pending = await asyncio.wait(tasks, timeout=remaining)
+            for task in pending:
+                task.cancel()
+            for task in done:
+                # A failed reference is retried on its first call.
+                task.exception()
+            timings[phase] = time.monotonic() - started
+        return timings
+
+    def stop(self) -> None:
+        self._connection_pool.close()
+        for registry in self._registry_center.values():
+            registry.close()
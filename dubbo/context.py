@@ -0,0 +1,29 @@
+"""Call context carried along asyncio tasks."""
+from contextlib import contextmanager
+from contextvars import ContextVar
+import time
+from typing import Iterator, Optional
+
+__all__ = ("deadline", "remaining")
+
+# The time.monotonic() by which the caller needs an answer.
+_deadline: ContextVar[Optional[float]] = ContextVar("dubbo_deadline", default=None)
+
+
+@contextmanager
+def deadline(timeout: float) -> Iterator[float]:
+    # Nested scopes can only shorten the deadline they inherit.
+    expires = time.monotonic() + timeout
+    current = _deadline.get()
+    if current is not None and current < expires:
+        expires = current
+    token = _deadline.set(expires)
+    try:
+        yield expires
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
@@ -0,0 +1,317 @@
+"""Discovery shared by the worker processes of one host."""
+import asyncio
+from contextlib import suppress
+import fcntl
+import json
+import os
+import random
+import struct
+from typing import Any, Optional
+
+from dubbo.common.config import ApplicationConfig, CenterConfig
+from dubbo.exceptions import RegistryError
+from dubbo.registry import Registry, RegistryFactory, _consume
+
+__all__ = ("SharedRegistry",)
+
+LENGTH = struct.Struct(">I")
+
+
+async def _read(reader: asyncio.StreamReader) -> dict[str, Any]:
+    (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+    return json.loads(await reader.readexactly(length))
+
+
+def _write(writer: asyncio.StreamWriter, message: dict[str, Any]) -> None:
+    data = json.dumps(message, separators=(",", ":")).encode()
+    writer.write(LENGTH.pack(len(data)) + data)
+
+
+class SharedRegistry(Registry):
+    """One upstream registry session per host, fanned out over a Unix socket.
+
+    The worker holding the lock file beside the socket owns the upstream
+    registry and publishes versioned children lists; the other workers
+    subscribe to that feed and take over when the owner goes away.
+    """
+
+    __slots__ = (
+        "_application_config",
+        "_registry_config",
+        "_path",
+        "_lock",
+        "_upstream",
+        "_server",
+        "_clients",
+        "_epoch",
+        "_versions",
+        "_writer",
+        "_attaching",
+        "_waiters",
+        "_tasks",
+        "_closed",
+    )
+
+    _application_config: ApplicationConfig
+    _registry_config: CenterConfig
+    _path: str
+    _lock: Optional[int]
+    _upstream: Optional[Registry]
+    _server: Optional[asyncio.AbstractServer]
+    _clients: dict[str, set[asyncio.StreamWriter]]
+    _epoch: str
+    # The (epoch, version) of the latest children list per interface; the
+    # epoch changes with the owner, the version with every update.
+    _versions: dict[str, tuple[str, int]]
+    _writer: Optional[asyncio.StreamWriter]
+    _attaching: Optional[asyncio.Future]
+    _waiters: dict[str, asyncio.Future]
+    _tasks: set[asyncio.Task]
+    _closed: bool
+
+    RETRY_INTERVAL: float = 0.5
+
+    def __init__(
+        self, application_config: ApplicationConfig, registry_config: CenterConfig
+    ) -> None:
+        super().__init__(application_config, registry_config)
+        # Only the owner's upstream registry writes the snapshot.
+        self._snapshot = None
+        self._application_config = application_config
+        self._registry_config = registry_config
+        self._path = registry_config.shared  # type: ignore[assignment]
+        self._lock = None
+        self._upstream = None
+        self._server = None
+        self._clients = dict()
+        self._epoch = ""
+        self._versions = dict()
+        self._writer = None
+        self._attaching = None
+        self._waiters = dict()
+        self._tasks = set()
+        self._closed = False
+
+    @property
+    def ready(self) -> bool:
+        if self._upstream is not None:
+            return self._upstream.ready
+        return self._writer is not None
+
+    @property
+    def owner(self) -> bool:
+        return self._upstream is not None
+
+    @property
+    def upstream(self) -> Optional[Registry]:
+        return self._upstream
+
+    def close(self) -> None:
+        self._closed = True
+        super().close()
+        if self._attaching is not None:
+            self._attaching.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+        if self._server is not None:
+            self._server.close()
+            for writers in self._clients.values():
+                for writer in writers:
+                    writer.close()
+            with suppress(OSError):
+                os.unlink(self._path)
+        if self._upstream is not None:
+            self._upstream.close()
+        if self._lock is not None:
+            # Closing the descriptor releases the lock for the next owner.
+            os.close(self._lock)
+            self._lock = None
+
+    async def _fetch(self, interface: str) -> list[str]:
+        if self._upstream is None and self._writer is None:
+            await self._attached()
+        if self._upstream is not None:
+            return await self._upstream.watch(interface)
+        waiter = self._waiters.get(interface)
+        if waiter is None:
+            waiter = self._waiters[interface] = (
+                asyncio.get_running_loop().create_future()
+            )
+            if self._writer is not None:
+                _write(self._writer, {"subscribe": interface})
+        return await asyncio.shield(waiter)
+
+    def _attached(self) -> asyncio.Future:
+        attaching = self._attaching
+        if attaching is None:
+            attaching = self._attaching = asyncio.ensure_future(self._attach())
+            attaching.add_done_callback(self._on_attached)
+        return asyncio.shield(attaching)
+
+    def _on_attached(self, future: asyncio.Future) -> None:
+        self._attaching = None
+        _consume(future)
+
+    async def _attach(self) -> None:
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self._path)
+            except OSError:
+                if self._elect():
+                    await self._own()
+                    return
+                await asyncio.sleep(self.RETRY_INTERVAL * (0.5 + random.random()))
+                continue
+            self._writer = writer
+            self._spawn(self._receive(reader, writer))
+            for interface in self._nodes.keys() | self._waiters.keys():
+                _write(writer, {"subscribe": interface})
+            return
+
+    def _elect(self) -> bool:
+        lock = os.open(f"{self._path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(lock)
+            return False
+        self._lock = lock
+        return True
+
+    async def _own(self) -> None:
+        config = self._registry_config
+        # Built off the loop: a ZooKeeper client connects as it starts.
+        upstream = await asyncio.get_running_loop().run_in_executor(
+            None,
+            RegistryFactory.get_registry,
+            self._application_config,
+            CenterConfig(
+                config.address,
+                config.debounce,
+                config.snapshot,
+                config.snapshot_interval,
+            ),
+        )
+        if self._closed:
+            upstream.close()
+            return
+        self._upstream = upstream
+        self._epoch = os.urandom(8).hex()
+        self._versions.clear()
+        upstream.add_listener(self._publish)
+        # A socket file left behind by a dead owner refuses connections.
+        with suppress(FileNotFoundError):
+            os.unlink(self._path)
+        self._server = await asyncio.start_unix_server(self._serve, path=self._path)
+        for interface in self._nodes.keys() | self._waiters.keys():
+            self._spawn(self._adopt(interface))
+
+    async def _adopt(self, interface: str) -> None:
+        try:
+            children = await self._upstream.watch(interface)  # type: ignore[union-attr]
+        except Exception as e:
+            self._fail(interface, e)
+            return
+        self._deliver(interface, children)
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        upstream: Registry = self._upstream  # type: ignore[assignment]
+        try:
+            while True:
+                interface = (await _read(reader))["subscribe"]
+                try:
+                    await upstream.watch(interface)
+                    # Added before the current state is read, which the loaded
+                    # interface returns without yielding: no update slips by.
+                    self._clients.setdefault(interface, set()).add(writer)
+                    children = await upstream.watch(interface)
+                except Exception as e:
+                    # Fails the subscriber's fetch as it would fail here; the
+                    # connection goes on serving its other interfaces.
+                    self._clients.get(interface, set()).discard(writer)
+                    _write(writer, {"interface": interface, "error": repr(e)})
+                    continue
+                _write(writer, self._message(interface, children))
+        except (asyncio.IncompleteReadError, OSError, ValueError, KeyError):
+            pass
+        finally:
+            for writers in self._clients.values():
+                writers.discard(writer)
+            writer.close()
+
+    async def _receive(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                message = await _read(reader)
+                interface = message["interface"]
+                if "error" in message:
+                    self._fail(
+                        interface,
+                        RegistryError(f"cannot fetch {interface}: {message['error']}"),
+                    )
+                    continue
+                epoch, version = message["epoch"], message["version"]
+                current = self._versions.get(interface)
+                if current is not None and current[0] == epoch:
+                    if current[1] >= version:
+                        continue
+                self._versions[interface] = (epoch, version)
+                self._deliver(interface, message["children"])
+        except (asyncio.IncompleteReadError, OSError, ValueError, KeyError):
+            pass
+        finally:
+            writer.close()
+            if self._writer is writer:
+                self._writer = None
+            if not self._closed:
+                self._spawn(self._reattach())
+
+    async def _reattach(self) -> None:
+        # Reconnects to the next owner, or becomes it, after a jittered pause
+        # so that the workers neither storm it nor spin on a failing one.
+        await asyncio.sleep(self.RETRY_INTERVAL * (0.5 + random.random()))
+        self._attached().add_done_callback(_consume)
+
+    def _publish(self, interface: str, children: list[str]) -> None:
+        version = self._versions.get(interface, (self._epoch, 0))[1] + 1
+        self._versions[interface] = (self._epoch, version)
+        if interface in self._nodes:
+            self._update(interface, children)
+        writers = self._clients.get(interface)
+        if writers:
+            message = self._message(interface, children)
+            for writer in writers:
+                if not writer.is_closing():
+                    _write(writer, message)
+
+    def _message(self, interface: str, children: list[str]) -> dict[str, Any]:
+        epoch, version = self._versions.get(interface, (self._epoch, 0))
+        return {
+            "interface": interface,
+            "epoch": epoch,
+            "version": version,
+            "children": children,
+        }
+
+    def _deliver(self, interface: str, children: list[str]) -> None:
+        waiter = self._waiters.pop(interface, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(children)
+        elif interface in self._nodes:
+            self._update(interface, children)
+
+    def _fail(self, interface: str, exception: Exception) -> None:
+        waiter = self._waiters.pop(interface, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_exception(exception)
+
+    def _spawn(self, coroutine: Any) -> None:
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
@@ -0,0 +1,75 @@
+"""Dubbo exception classes."""
+__all__ = (
+    "RpcError",
+    "NoProviderError",
+    "ConnectionLostError",
+    "ConnectError",
+    "ProtocolError",
+    "RpcTimeoutError",
+    "ConcurrencyLimitError",
+    "RemotingError",
+    "ServiceError",
+    "RegistryError",
+)
+
+from typing import Any, Optional
+
+
+class RpcError(Exception):
+    pass
+
+
+class NoProviderError(RpcError):
+    pass
+
+
+class ConnectionLostError(RpcError):
+    pass
+
+
+class ConnectError(ConnectionLostError):
+    pass
+
+
+class ProtocolError(RpcError):
+    pass
+
+
+class RpcTimeoutError(RpcError, TimeoutError):
+    pass
+
+
+class ConcurrencyLimitError(RpcError):
+    pass
+
+
+class RemotingError(RpcError):
+
+    __slots__ = ("status",)
+
+    status: int
+
+    def __init__(self, status: int, message: Optional[str] = None) -> None:
+        super().__init__(message or f"remote status {status}")
+        self.status = status
+
+
+class ServiceError(RpcError):
+
+    __slots__ = ("exception",)
+
+    exception: Any
+
+    def __init__(self, exception: Any) -> None:
+        message = None
+        if isinstance(exception, dict):
+            message = exception.get("detailMessage")
+            name = getattr(exception, "java_class", None)
+            if name:
+                message = f"{name}: {message}" if message else name
+        super().__init__(message or str(exception))
+        self.exception = exception
+
+
+class RegistryError(Exception):
+    pass
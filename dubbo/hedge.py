@@ -0,0 +1,97 @@
+"""Request hedging classes."""
+from array import array
+from typing import Optional
+
+__all__ = ("LatencyTracker", "HedgeBudget")
+
+
+class LatencyTracker:
+    """A percentile of the latest latencies of one method.
+
+    The percentile is recomputed every ``size // 8`` calls rather than on
+    every one, and is unknown until ``min_samples`` calls have completed.
+    """
+
+    __slots__ = (
+        "_percentile",
+        "_min_samples",
+        "_latencies",
+        "_index",
+        "_count",
+        "_stale",
+        "_value",
+    )
+
+    _percentile: float
+    _min_samples: int
+    _latencies: array
+    _index: int
+    _count: int
+    # Calls recorded since the percentile was last computed.
+    _stale: int
+    _value: Optional[float]
+
+    def __init__(
+        self, percentile: float, size: int = 128, min_samples: int = 32
+    ) -> None:
+        self._percentile = percentile
+        self._min_samples = min_samples
+        self._latencies = array("d", bytes(8 * size))
+        self._index = 0
+        self._count = 0
+        self._stale = 0
+        self._value = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def value(self) -> Optional[float]:
+        if self._count < self._min_samples:
+            return None
+        if self._value is None or self._stale >= len(self._latencies) // 8:
+            latencies = sorted(self._latencies[: self._count])
+            index = min(self._count - 1, int(self._count * self._percentile))
+            self._value = latencies[index]
+            self._stale = 0
+        return self._value
+
+    def record(self, latency: float) -> None:
+        self._latencies[self._index] = latency
+        self._index = (self._index + 1) % len(self._latencies)
+        if self._count < len(self._latencies):
+            self._count += 1
+        self._stale += 1
+
+
+class HedgeBudget:
+    """Token bucket holding hedges to a ``ratio`` of the calls.
+
+    Every call deposits ``ratio`` of a token and every hedge withdraws a
+    whole one, so that hedging cannot multiply the load of an overloaded
+    service; up to ``max_tokens`` saved up on quiet periods absorb bursts.
+    """
+
+    __slots__ = ("_ratio", "_max_tokens", "_tokens")
+
+    _ratio: float
+    _max_tokens: float
+    _tokens: float
+
+    def __init__(self, ratio: float = 0.05, max_tokens: float = 10.0) -> None:
+        self._ratio = ratio
+        self._max_tokens = max_tokens
+        self._tokens = 0.0
+
+    @property
+    def tokens(self) -> float:
+        return self._tokens
+
+    def deposit(self) -> None:
+        self._tokens = min(self._max_tokens, self._tokens + self._ratio)
+
+    def withdraw(self) -> bool:
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
@@ -0,0 +1,680 @@
+"""Hessian2 serialization."""
+from datetime import datetime
+from decimal import Decimal
+import math
+import struct
+from typing import Any, Callable, Optional, Union
+
+__all__ = ("ClassDef", "Decoder", "Encoder", "JavaObject")
+
+_INT = struct.Struct(">i")
+_LONG = struct.Struct(">q")
+_DOUBLE = struct.Struct(">d")
+_SHORT = struct.Struct(">h")
+_USHORT = struct.Struct(">H")
+
+_CHUNK = 0x8000
+
+BIG_DECIMAL = "java.math.BigDecimal"
+
+
+class JavaObject(dict):
+    """A Java bean: its field values keyed by name plus the Java class name."""
+
+    __slots__ = ("java_class",)
+
+    java_class: str
+
+    def __init__(self, java_class: str, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.java_class = java_class
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __repr__(self) -> str:
+        return f"{self.java_class}({dict.__repr__(self)})"
+
+
+class ClassDef:
+
+    __slots__ = ("name", "fields", "factory")
+
+    name: str
+    fields: tuple[str, ...]
+    factory: Optional[Callable[[JavaObject], Any]]
+
+    def __init__(self, name: str, fields: tuple[str, ...]) -> None:
+        self.name = name
+        self.fields = fields
+        self.factory = _FACTORIES.get(name)
+
+
+_FACTORIES: dict[str, Callable[[JavaObject], Any]] = {
+    BIG_DECIMAL: lambda obj: Decimal(obj["value"]),
+}
+
+
+def _split_surrogates(value: str) -> str:
+    # Java counts and encodes characters outside the BMP as surrogate pairs.
+    chars = []
+    for char in value:
+        code = ord(char)
+        if code > 0xFFFF:
+            code -= 0x10000
+            chars.append(chr(0xD800 + (code >> 10)))
+            chars.append(chr(0xDC00 + (code & 0x3FF)))
+        else:
+            chars.append(char)
+    return "".join(chars)
+
+
+class Encoder:
+
+    __slots__ = ("_buffer", "_class_refs", "_definitions")
+
+    _buffer: bytearray
+    _class_refs: dict[tuple[str, tuple[str, ...]], int]
+    # Encoded class definitions, kept across messages.
+    _definitions: dict[tuple[str, tuple[str, ...]], bytes]
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._class_refs = dict()
+        self._definitions = dict()
+
+    def reset(self) -> None:
+        self._buffer = bytearray()
+        self._class_refs.clear()
+
+    def getvalue(self) -> bytes:
+        return bytes(self._buffer)
+
+    def encode(self, *values: Any) -> bytes:
+        self.reset()
+        for value in values:
+            self.write(value)
+        return self.getvalue()
+
+    def write_raw(self, data: Union[bytes, bytearray, memoryview]) -> None:
+        self._buffer += data
+
+    def write(self, value: Any) -> None:
+        writer = _WRITERS.get(type(value))
+        if writer is None:
+            writer = self._find_writer(value)
+        writer(self, value)
+
+    def write_null(self, _: Any = None) -> None:
+        self._buffer.append(0x4E)
+
+    def write_bool(self, value: bool) -> None:
+        self._buffer.append(0x54 if value else 0x46)
+
+    def write_int(self, value: int) -> None:
+        buffer = self._buffer
+        if -0x10 <= value <= 0x2F:
+            buffer.append(value + 0x90)
+        elif -0x800 <= value <= 0x7FF:
+            buffer.append(0xC8 + (value >> 8))
+            buffer.append(value & 0xFF)
+        elif -0x40000 <= value <= 0x3FFFF:
+            buffer.append(0xD4 + (value >> 16))
+            buffer.append((value >> 8) & 0xFF)
+            buffer.append(value & 0xFF)
+        elif -0x80000000 <= value <= 0x7FFFFFFF:
+            buffer.append(0x49)
+            buffer += _INT.pack(value)
+        else:
+            self.write_long(value)
+
+    def write_long(self, value: int) -> None:
+        buffer = self._buffer
+        if -0x08 <= value <= 0x0F:
+            buffer.append(value + 0xE0)
+        elif -0x800 <= value <= 0x7FF:
+            buffer.append(0xF8 + (value >> 8))
+            buffer.append(value & 0xFF)
+        elif -0x40000 <= value <= 0x3FFFF:
+            buffer.append(0x3C + (value >> 16))
+            buffer.append((value >> 8) & 0xFF)
+            buffer.append(value & 0xFF)
+        elif -0x80000000 <= value <= 0x7FFFFFFF:
+            buffer.append(0x59)
+            buffer += _INT.pack(value)
+        else:
+            buffer.append(0x4C)
+            buffer += _LONG.pack(value)
+
+    def write_double(self, value: float) -> None:
+        buffer = self._buffer
+        if math.isfinite(value):
+            integer = int(value)
+            if integer == value:
+                if integer == 0:
+                    buffer.append(0x5B)
+                    return
+                if integer == 1:
+                    buffer.append(0x5C)
+                    return
+                if -0x80 <= integer <= 0x7F:
+                    buffer.append(0x5D)
+                    buffer.append(integer & 0xFF)
+                    return
+                if -0x8000 <= integer <= 0x7FFF:
+                    buffer.append(0x5E)
+                    buffer += _SHORT.pack(integer)
+                    return
+            mills = int(value * 1000)
+            if -0x80000000 <= mills <= 0x7FFFFFFF and 0.001 * mills == value:
+                buffer.append(0x5F)
+                buffer += _INT.pack(mills)
+                return
+        buffer.append(0x44)
+        buffer += _DOUBLE.pack(value)
+
+    def write_string(self, value: str) -> None:
+        buffer = self._buffer
+        if not value.isascii() and max(value) > "\uffff":
+            value = _split_surrogates(value)
+        length = len(value)
+        if length <= 0x1F:
+            buffer.append(length)
+            buffer += value.encode("utf-8", "surrogatepass")
+        elif length <= 0x3FF:
+            buffer.append(0x30 + (length >> 8))
+            buffer.append(length & 0xFF)
+            buffer += value.encode("utf-8", "surrogatepass")
+        else:
+            start = 0
+            while start < length:
+                end = min(start + _CHUNK, length)
+                if end < length and "\ud800" <= value[end - 1] <= "\udbff":
+                    end -= 1
+                buffer.append(0x53 if end == length else 0x52)
+                buffer += _USHORT.pack(end - start)
+                buffer += value[start:end].encode("utf-8", "surrogatepass")
+                start = end
+
+    def write_binary(self, value: Union[bytes, bytearray, memoryview]) -> None:
+        buffer = self._buffer
+        length = len(value)
+        if length <= 0x0F:
+            buffer.append(0x20 + length)
+            buffer += value
+        elif length <= 0x3FF:
+            buffer.append(0x34 + (length >> 8))
+            buffer.append(length & 0xFF)
+            buffer += value
+        else:
+            view = memoryview(value)
+            for start in range(0, length, _CHUNK):
+                chunk = view[start : start + _CHUNK]
+                buffer.append(0x42 if start + _CHUNK >= length else 0x41)
+                buffer += _USHORT.pack(len(chunk))
+                buffer += chunk
+
+    def write_list(self, value: Union[list, tuple]) -> None:
+        length = len(value)
+        if length <= 7:
+            self._buffer.append(0x78 + length)
+        else:
+            self._buffer.append(0x58)
+            self.write_int(length)
+        write = self.write
+        for item in value:
+            write(item)
+
+    def write_map(self, value: dict) -> None:
+        self._buffer.append(0x48)
+        write = self.write
+        for key, item in value.items():
+            write(key)
+            write(item)
+        self._buffer.append(0x5A)
+
+    def write_object(self, value: JavaObject) -> None:
+        self._write_instance(value.java_class, tuple(value.keys()), value.values())
+
+    def write_date(self, value: datetime) -> None:
+        self._buffer.append(0x4A)
+        self._buffer += _LONG.pack(round(value.timestamp() * 1000))
+
+    def write_decimal(self, value: Decimal) -> None:
+        self._write_instance(BIG_DECIMAL, ("value",), (str(value),))
+
+    def _write_instance(self, name: str, fields: tuple[str, ...], values: Any) -> None:
+        key = (name, fields)
+        index = self._class_refs.get(key)
+        buffer = self._buffer
+        if index is None:
+            definition = self._definitions.get(key)
+            if definition is None:
+                definition = self._definitions[key] = self._define(name, fields)
+            buffer += definition
+            index = self._class_refs[key] = len(self._class_refs)
+        if index <= 0x0F:
+            buffer.append(0x60 + index)
+        else:
+            buffer.append(0x4F)
+            self.write_int(index)
+        write = self.write
+        for item in values:
+            write(item)
+
+    def _define(self, name: str, fields: tuple[str, ...]) -> bytes:
+        buffer, self._buffer = self._buffer, bytearray(b"C")
+        try:
+            self.write_string(name)
+            self.write_int(len(fields))
+            for field in fields:
+                self.write_string(field)
+            return bytes(self._buffer)
+        finally:
+            self._buffer = buffer
+
+    def _find_writer(self, value: Any) -> Callable[["Encoder", Any], None]:
+        for cls, writer in _WRITERS.items():
+            if isinstance(value, cls):
+                return writer
+        raise TypeError(f"cannot serialize {type(value).__name__} to hessian2")
+
+
+_WRITERS: dict[type, Callable[[Encoder, Any], None]] = {
+    str: Encoder.write_string,
+    # bool before int: isinstance(True, int) holds for the fallback lookup.
+    bool: Encoder.write_bool,
+    int: Encoder.write_int,
+    float: Encoder.write_double,
+    type(None): Encoder.write_null,
+    JavaObject: Encoder.write_object,
+    dict: Encoder.write_map,
+    list: Encoder.write_list,
+    tuple: Encoder.write_list,
+    bytes: Encoder.write_binary,
+    bytearray: Encoder.write_binary,
+    memoryview: Encoder.write_binary,
+    datetime: Encoder.write_date,
+    Decimal: Encoder.write_decimal,
+}
+
+
+class Decoder:
+
+    __slots__ = (
+        "_data",
+        "_position",
+        "_refs",
+        "_classes",
+        "_types",
+        "_definitions",
+        "_strings",
+    )
+
+    _data: memoryview
+    _position: int
+    _refs: list[Any]
+    _classes: list[ClassDef]
+    _types: list[str]
+    # Class definitions and type names, kept across messages.
+    _definitions: dict[tuple[str, tuple[str, ...]], ClassDef]
+    _strings: dict[bytes, str]
+
+    MAX_CACHED_STRINGS: int = 4096
+
+    def __init__(self) -> None:
+        self._data = memoryview(b"")
+        self._position = 0
+        self._refs = []
+        self._classes = []
+        self._types = []
+        self._definitions = dict()
+        self._strings = dict()
+
+    @property
+    def position(self) -> int:
+        return self._position
+
+    def reset(
+        self, data: Union[bytes, bytearray, memoryview], position: int = 0
+    ) -> None:
+        self._data = data if isinstance(data, memoryview) else memoryview(data)
+        self._position = position
+        self._refs.clear()
+        self._classes.clear()
+        self._types.clear()
+
+    def decode(self, data: Union[bytes, bytearray, memoryview]) -> Any:
+        self.reset(data)
+        return self.read()
+
+    def read(self) -> Any:
+        tag = self._data[self._position]
+        self._position += 1
+        return _READERS[tag](self, tag)
+
+    def _byte(self) -> int:
+        value = self._data[self._position]
+        self._position += 1
+        return value
+
+    def _unpack(self, unpacker: struct.Struct) -> Any:
+        value = unpacker.unpack_from(self._data, self._position)[0]
+        self._position += unpacker.size
+        return value
+
+    def _read_null(self, _: int) -> None:
+        return None
+
+    def _read_true(self, _: int) -> bool:
+        return True
+
+    def _read_false(self, _: int) -> bool:
+        return False
+
+    def _read_compact_int(self, tag: int) -> int:
+        return tag - 0x90
+
+    def _read_byte_int(self, tag: int) -> int:
+        return ((tag - 0xC8) << 8) + self._byte()
+
+    def _read_short_int(self, tag: int) -> int:
+        data, position = self._data, self._position
+        self._position = position + 2
+        return ((tag - 0xD4) << 16) + (data[position] << 8) + data[position + 1]
+
+    def _read_int(self, _: int) -> int:
+        return self._unpack(_INT)
+
+    def _read_compact_long(self, tag: int) -> int:
+        return tag - 0xE0
+
+    def _read_byte_long(self, tag: int) -> int:
+        return ((tag - 0xF8) << 8) + self._byte()
+
+    def _read_short_long(self, tag: int) -> int:
+        data, position = self._data, self._position
+        self._position = position + 2
+        return ((tag - 0x3C) << 16) + (data[position] << 8) + data[position + 1]
+
+    def _read_long(self, _: int) -> int:
+        return self._unpack(_LONG)
+
+    def _read_double_zero(self, _: int) -> float:
+        return 0.0
+
+    def _read_double_one(self, _: int) -> float:
+        return 1.0
+
+    def _read_byte_double(self, _: int) -> float:
+        value = self._byte()
+        return float(value - 0x100 if value > 0x7F else value)
+
+    def _read_short_double(self, _: int) -> float:
+        return float(self._unpack(_SHORT))
+
+    def _read_mill_double(self, _: int) -> float:
+        return 0.001 * self._unpack(_INT)
+
+    def _read_double(self, _: int) -> float:
+        return self._unpack(_DOUBLE)
+
+    def _read_date(self, _: int) -> datetime:
+        return datetime.fromtimestamp(self._unpack(_LONG) / 1000)
+
+    def _read_compact_date(self, _: int) -> datetime:
+        return datetime.fromtimestamp(self._unpack(_INT) * 60)
+
+    def _read_short_string(self, tag: int) -> str:
+        return self._utf8(tag)
+
+    def _read_medium_string(self, tag: int) -> str:
+        return self._utf8(((tag - 0x30) << 8) + self._byte())
+
+    def _read_chunked_string(self, tag: int) -> str:
+        chunks = []
+        while True:
+            chunks.append(self._utf8(self._unpack(_USHORT)))
+            if tag == 0x53:
+                break
+            tag = self._byte()
+            if tag <= 0x1F:
+                chunks.append(self._utf8(tag))
+                break
+            if 0x30 <= tag <= 0x33:
+                chunks.append(self._read_medium_string(tag))
+                break
+        return "".join(chunks)
+
+    def _utf8(self, length: int) -> str:
+        data, start = self._data, self._position
+        end = start + length
+        try:
+            value = str(data[start:end], "ascii")
+        except UnicodeDecodeError:
+            # ``length`` counts UTF-16 units, walk the lead bytes to find
+            # where the characters end.
+            end = start
+            surrogates = False
+            while length > 0:
+                lead = data[end]
+                if lead < 0x80:
+                    end += 1
+                elif lead < 0xE0:
+                    end += 2
+                elif lead < 0xF0:
+                    surrogates = surrogates or lead == 0xED
+                    end += 3
+                else:
+                    end += 4
+                    length -= 1
+                length -= 1
+            value = str(data[start:end], "utf-8", "surrogatepass")
+            if surrogates:
+                value = value.encode("utf-16-be", "surrogatepass").decode(
+                    "utf-16-be", "surrogatepass"
+                )
+        self._position = end
+        return value
+
+    def _read_cached_string(self) -> str:
+        # Type and field names repeat across messages on a connection, so
+        # they are decoded once and shared by their raw bytes.
+        data, start = self._data, self._position
+        tag = data[start]
+        if tag <= 0x1F:
+            end = start + 1 + tag
+        elif 0x30 <= tag <= 0x33:
+            end = start + 2 + ((tag - 0x30) << 8) + data[start + 1]
+        else:
+            return self.read()
+        raw = bytes(data[start:end])
+        value = self._strings.get(raw)
+        if value is not None:
+            self._position = end
+            return value
+        value = self.read()
+        # Only ASCII names span exactly ``end``, others are not cached.
+        if self._position == end and len(self._strings) < self.MAX_CACHED_STRINGS:
+            self._strings[raw] = value
+        return value
+
+    def _read_short_binary(self, tag: int) -> bytes:
+        return self._binary(tag - 0x20)
+
+    def _read_medium_binary(self, tag: int) -> bytes:
+        return self._binary(((tag - 0x34) << 8) + self._byte())
+
+    def _read_chunked_binary(self, tag: int) -> bytes:
+        chunks = []
+        while True:
+            chunks.append(self._binary(self._unpack(_USHORT)))
+            if tag == 0x42:
+                break
+            tag = self._byte()
+            if 0x20 <= tag <= 0x2F:
+                chunks.append(self._binary(tag - 0x20))
+                break
+            if 0x34 <= tag <= 0x37:
+                chunks.append(self._read_medium_binary(tag))
+                break
+        return b"".join(chunks)
+
+    def _binary(self, length: int) -> bytes:
+        start = self._position
+        self._position = start + length
+        return bytes(self._data[start : start + length])
+
+    def _read_type(self) -> str:
+        tag = self._data[self._position]
+        if tag <= 0x1F or 0x30 <= tag <= 0x33 or tag == 0x52 or tag == 0x53:
+            name = self._read_cached_string()
+            self._types.append(name)
+            return name
+        return self._types[self.read()]
+
+    def _read_items(self, items: list, length: int) -> list:
+        self._refs.append(items)
+        read = self.read
+        for _ in range(length):
+            items.append(read())
+        return items
+
+    def _read_variable_items(self, items: list) -> list:
+        self._refs.append(items)
+        data, read = self._data, self.read
+        while data[self._position] != 0x5A:
+            items.append(read())
+        self._position += 1
+        return items
+
+    def _read_typed_list(self, _: int) -> list:
+        self._read_type()
+        return self._read_variable_items([])
+
+    def _read_typed_fixed_list(self, _: int) -> list:
+        self._read_type()
+        return self._read_items([], self.read())
+
+    def _read_untyped_list(self, _: int) -> list:
+        return self._read_variable_items([])
+
+    def _read_untyped_fixed_list(self, _: int) -> list:
+        return self._read_items([], self.read())
+
+    def _read_compact_typed_list(self, tag: int) -> list:
+        self._read_type()
+        return self._read_items([], tag - 0x70)
+
+    def _read_compact_untyped_list(self, tag: int) -> list:
+        return self._read_items([], tag - 0x78)
+
+    def _read_map(self, _: int) -> dict:
+        value: dict = {}
+        self._refs.append(value)
+        data, read = self._data, self.read
+        while data[self._position] != 0x5A:
+            key = read()
+            value[key] = read()
+        self._position += 1
+        return value
+
+    def _read_typed_map(self, tag: int) -> dict:
+        self._read_type()
+        return self._read_map(tag)
+
+    def _read_definition(self, _: int) -> Any:
+        name = self._read_cached_string()
+        fields = tuple(self._read_cached_string() for _ in range(self.read()))
+        key = (name, fields)
+        definition = self._definitions.get(key)
+        if definition is None:
+            definition = self._definitions[key] = ClassDef(name, fields)
+        self._classes.append(definition)
+        return self.read()
+
+    def _read_compact_object(self, tag: int) -> Any:
+        return self._instance(self._classes[tag - 0x60])
+
+    def _read_object(self, _: int) -> Any:
+        return self._instance(self._classes[self.read()])
+
+    def _instance(self, definition: ClassDef) -> Any:
+        value = JavaObject(definition.name)
+        refs = self._refs
+        index = len(refs)
+        refs.append(value)
+        read = self.read
+        for field in definition.fields:
+            value[field] = read()
+        if definition.factory is not None:
+            value = refs[index] = definition.factory(value)
+        return value
+
+    def _read_ref(self, _: int) -> Any:
+        return self._refs[self.read()]
+
+    def _read_invalid(self, tag: int) -> Any:
+        raise ValueError(
+            f"unexpected hessian2 tag {tag:#x} at {self._position - 1}"
+        )
+
+
+def _readers() -> list[Callable[[Decoder, int], Any]]:
+    readers = [Decoder._read_invalid] * 0x100
+    ranges = (
+        (0x00, 0x1F, Decoder._read_short_string),
+        (0x20, 0x2F, Decoder._read_short_binary),
+        (0x30, 0x33, Decoder._read_medium_string),
+        (0x34, 0x37, Decoder._read_medium_binary),
+        (0x38, 0x3F, Decoder._read_short_long),
+        (0x60, 0x6F, Decoder._read_compact_object),
+        (0x70, 0x77, Decoder._read_compact_typed_list),
+        (0x78, 0x7F, Decoder._read_compact_untyped_list),
+        (0x80, 0xBF, Decoder._read_compact_int),
+        (0xC0, 0xCF, Decoder._read_byte_int),
+        (0xD0, 0xD7, Decoder._read_short_int),
+        (0xD8, 0xEF, Decoder._read_compact_long),
+        (0xF0, 0xFF, Decoder._read_byte_long),
+    )
+    for first, last, reader in ranges:
+        for tag in range(first, last + 1):
+            readers[tag] = reader
+    tags = {
+        0x41: Decoder._read_chunked_binary,
+        0x42: Decoder._read_chunked_binary,
+        0x43: Decoder._read_definition,
+        0x44: Decoder._read_double,
+        0x46: Decoder._read_false,
+        0x48: Decoder._read_map,
+        0x49: Decoder._read_int,
+        0x4A: Decoder._read_date,
+        0x4B: Decoder._read_compact_date,
+        0x4C: Decoder._read_long,
+        0x4D: Decoder._read_typed_map,
+        0x4E: Decoder._read_null,
+        0x4F: Decoder._read_object,
+        0x51: Decoder._read_ref,
+        0x52: Decoder._read_chunked_string,
+        0x53: Decoder._read_chunked_string,
+        0x54: Decoder._read_true,
+        0x55: Decoder._read_typed_list,
+        0x56: Decoder._read_typed_fixed_list,
+        0x57: Decoder._read_untyped_list,
+        0x58: Decoder._read_untyped_fixed_list,
+        0x59: Decoder._read_int,
+        0x5B: Decoder._read_double_zero,
+        0x5C: Decoder._read_double_one,
+        0x5D: Decoder._read_byte_double,
+        0x5E: Decoder._read_short_double,
+        0x5F: Decoder._read_mill_double,
+    }
+    for tag, reader in tags.items():
+        readers[tag] = reader
+    return readers
+
+
+_READERS = _readers()
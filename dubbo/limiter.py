@@ -0,0 +1,150 @@
+"""Concurrency limiter classes."""
+import asyncio
+from collections import deque
+from contextlib import suppress
+import time
+from typing import Optional
+
+from dubbo.exceptions import ConcurrencyLimitError, RpcTimeoutError
+
+__all__ = ("AdaptiveLimiter",)
+
+
+class AdaptiveLimiter:
+    """AIMD limit on the calls in flight to one provider.
+
+    The limit grows by about one per limit's worth of calls answered in
+    time and shrinks by ``backoff`` when a call is dropped or its RTT
+    exceeds ``tolerance`` times the long-term RTT, at most once per RTT.
+    Callers over the limit queue up to ``max_queue`` deep, beyond which
+    they fail fast.
+    """
+
+    __slots__ = (
+        "_limit",
+        "_min_limit",
+        "_max_limit",
+        "_max_queue",
+        "_tolerance",
+        "_backoff",
+        "_inflight",
+        "_waiters",
+        "_rtt",
+        "_decreased",
+    )
+
+    _limit: float
+    _min_limit: int
+    _max_limit: int
+    _max_queue: int
+    _tolerance: float
+    _backoff: float
+    _inflight: int
+    _waiters: deque[asyncio.Future]
+    # Slow moving average of the RTTs seen, in seconds.
+    _rtt: Optional[float]
+    _decreased: float
+
+    RTT_SMOOTHING: float = 0.05
+
+    def __init__(
+        self,
+        initial: int = 32,
+        min_limit: int = 1,
+        max_limit: int = 1000,
+        max_queue: int = 128,
+        tolerance: float = 2.0,
+        backoff: float = 0.9,
+    ) -> None:
+        self._limit = float(initial)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._max_queue = max_queue
+        self._tolerance = tolerance
+        self._backoff = backoff
+        self._inflight = 0
+        self._waiters = deque()
+        self._rtt = None
+        self._decreased = 0.0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def saturated(self) -> bool:
+        return self._inflight >= int(self._limit)
+
+    def try_acquire(self) -> bool:
+        if self._inflight < int(self._limit) and not self._waiters:
+            self._inflight += 1
+            return True
+        return False
+
+    async def acquire(self, timeout: Optional[float] = None) -> None:
+        if self.try_acquire():
+            return
+        if len(self._waiters) >= self._max_queue:
+            raise ConcurrencyLimitError(
+                f"{self._inflight} calls in flight and {len(self._waiters)} queued"
+            )
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Granted as the wait was given up: pass it on.
+                self._inflight -= 1
+                self._wake()
+            else:
+                with suppress(ValueError):
+                    self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                raise RpcTimeoutError(f"queued for {timeout:.3f}s") from None
+            raise
+
+    def release(self, rtt: Optional[float]) -> None:
+        # ``rtt`` is None for calls that timed out or lost their connection.
+        self._inflight -= 1
+        if rtt is None:
+            self._decrease()
+        else:
+            baseline = self._rtt
+            if baseline is None:
+                self._rtt = rtt
+            else:
+                self._rtt = baseline + (rtt - baseline) * self.RTT_SMOOTHING
+            if baseline is not None and rtt > baseline * self._tolerance:
+                self._decrease()
+            elif self._inflight + 1 >= self._limit / 2:
+                # Grown only while the limit is actually used.
+                self._limit = min(self._max_limit, self._limit + 1 / self._limit)
+        self._wake()
+
+    def discard(self) -> None:
+        # Releases a call that was cancelled, leaving the limit as it is.
+        self._inflight -= 1
+        self._wake()
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._decreased >= (self._rtt or 0.0):
+            self._decreased = now
+            self._limit = max(self._min_limit, self._limit * self._backoff)
+
+    def _wake(self) -> None:
+        waiters = self._waiters
+        while waiters and self._inflight < int(self._limit):
+            waiter = waiters.popleft()
+            if not waiter.done():
+                self._inflight += 1
+                waiter.set_result(None)
@@ -0,0 +1,290 @@
+"""Load balance classes."""
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from hashlib import md5
+from itertools import accumulate
+import math
+import random
+import time
+from typing import Any, Collection, Optional, Sequence
+
+from dubbo.registry import Instance
+
+__all__ = (
+    "LoadBalance",
+    "RandomLoadBalance",
+    "LeastActiveLoadBalance",
+    "P2CLoadBalance",
+    "ConsistentHashLoadBalance",
+    "LoadBalanceFactory",
+)
+
+
+def warmup_weight(instance: Instance, now: float) -> int:
+    weight = instance.weight
+    if weight <= 0 or instance.timestamp <= 0:
+        return max(weight, 0)
+    uptime = now * 1000 - instance.timestamp
+    if uptime < 0:
+        return 1
+    if uptime < instance.warmup:
+        return max(1, min(weight, int(uptime / (instance.warmup / weight))))
+    return weight
+
+
+class LoadBalance(ABC):
+    """Chooses a provider per call.
+
+    Derived state is cached against the identity of the instance tuple the
+    registry hands out, which only changes when the providers change. State
+    kept per provider is only forgotten by ``retain``, as callers also pass
+    views of that tuple that leave providers out for a while.
+    """
+
+    __slots__ = ("_instances",)
+
+    _instances: Optional[Sequence[Instance]]
+
+    def __init__(self) -> None:
+        self._instances = None
+
+    def select(
+        self, instances: Sequence[Instance], method: str, args: Sequence[Any]
+    ) -> Instance:
+        if instances is not self._instances:
+            self._instances = instances
+            self._rebuild(instances)
+        if len(instances) == 1:
+            return instances[0]
+        return self._select(instances, method, args)
+
+    def start(self, instance: Instance) -> None:
+        pass
+
+    def finish(self, instance: Instance, elapsed: float) -> None:
+        pass
+
+    def retain(self, netlocs: Collection[str]) -> None:
+        pass
+
+    def _rebuild(self, instances: Sequence[Instance]) -> None:
+        pass
+
+    @abstractmethod
+    def _select(
+        self, instances: Sequence[Instance], method: str, args: Sequence[Any]
+    ) -> Instance:
+        pass
+
+
+class _Weights:
+    """Cumulative weights, recomputed while any provider is warming up."""
+
+    __slots__ = ("weights", "cumulative", "total", "uniform", "_warm_until", "_expires")
+
+    weights: list[int]
+    cumulative: list[int]
+    total: int
+    uniform: bool
+    _warm_until: float
+    _expires: float
+
+    REFRESH_INTERVAL: float = 1.0
+
+    def __init__(self, instances: Sequence[Instance]) -> None:
+        self._warm_until = max(
+            (
+                (instance.timestamp + instance.warmup) / 1000
+                for instance in instances
+                if instance.timestamp > 0
+            ),
+            default=0,
+        )
+        self.refresh(instances, time.time())
+
+    def refresh(self, instances: Sequence[Instance], now: float) -> None:
+        self.weights = [warmup_weight(instance, now) for instance in instances]
+        self.cumulative = list(accumulate(self.weights))
+        self.total = self.cumulative[-1] if self.cumulative else 0
+        self.uniform = len(set(self.weights)) <= 1
+        self._expires = now + self.REFRESH_INTERVAL if now < self._warm_until else math.inf
+
+    def check(self, instances: Sequence[Instance]) -> None:
+        if self._expires != math.inf:
+            now = time.time()
+            if now >= self._expires:
+                self.refresh(instances, now)
+
+
+class RandomLoadBalance(LoadBalance):
+
+    __slots__ = ("_weights",)
+
+    _weights: _Weights
+
+    def _rebuild(self, instances: Sequence[Instance]) -> None:
+        self._weights = _Weights(instances)
+
+    def _select(
+        self, instances: Sequence[Instance], method: str, args: Sequence[Any]
+    ) -> Instance:
+        weights = self._weights
+        weights.check(instances)
+        if weights.uniform or weights.total <= 0:
+            return instances[int(random.random() * len(instances))]
+        return instances[bisect_right(weights.cumulative, random.random() * weights.total)]
+
+
+class LeastActiveLoadBalance(LoadBalance):
+
+    __slots__ = ("_weights", "_active")
+
+    _weights: _Weights
+    _active: dict[str, int]
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._active = dict()
+
+    def start(self, instance: Instance) -> None:
+        self._active[instance.netloc] = self._active.get(instance.netloc, 0) + 1
+
+    def finish(self, instance: Instance, elapsed: float) -> None:
+        active = self._active.get(instance.netloc, 0) - 1
+        if active > 0:
+            self._active[instance.netloc] = active
+        else:
+            self._active.pop(instance.netloc, None)
+
+    def _rebuild(self, instances: Sequence[Instance]) -> None:
+        self._weights = _Weights(instances)
+
+    def _select(
+        self, instances: Sequence[Instance], method: str, args: Sequence[Any]
+    ) -> Instance:
+        weights = self._weights
+        weights.check(instances)
+        active = self._active
+        least = -1
+        candidates: list[int] = []
+        for index, instance in enumerate(instances):
+            count = active.get(instance.netloc, 0)
+            if least < 0 or count < least:
+                least = count
+                candidates = [index]
+            elif count == least:
+                candidates.append(index)
+        if len(candidates) == 1:
+            return instances[candidates[0]]
+        total = sum(weights.weights[index] for index in candidates)
+        if total > 0:
+            offset = random.random() * total
+            for index in candidates:
+                offset -= weights.weights[index]
+                if offset < 0:
+                    return instances[index]
+        return instances[random.choice(candidates)]
+
+
+class P2CLoadBalance(LoadBalance):
+    """Power of two choices over EWMA latency scaled by in-flight calls."""
+
+    __slots__ = ("_decay", "_active", "_latency", "_updated")
+
+    _decay: float
+    _active: dict[str, int]
+    _latency: dict[str, float]
+    _updated: dict[str, float]
+
+    def __init__(self, decay: float = 10.0) -> None:
+        super().__init__()
+        self._decay = decay
+        self._active = dict()
+        self._latency = dict()
+        self._updated = dict()
+
+    def start(self, instance: Instance) -> None:
+        self._active[instance.netloc] = self._active.get(instance.netloc, 0) + 1
+
+    def finish(self, instance: Instance, elapsed: float) -> None:
+        netloc = instance.netloc
+        self._active[netloc] = max(0, self._active.get(netloc, 1) - 1)
+        now = time.monotonic()
+        latency = self._latency.get(netloc)
+        if latency is None:
+            self._latency[netloc] = elapsed
+        else:
+            weight = math.exp(-(now - self._updated[netloc]) / self._decay)
+            self._latency[netloc] = latency * weight + elapsed * (1 - weight)
+        self._updated[netloc] = now
+
+    def retain(self, netlocs: Collection[str]) -> None:
+        # Forgets the providers gone from the registry.
+        for state in (self._active, self._latency, self._updated):
+            for netloc in [netloc for netloc in state if netloc not in netlocs]:
+                del state[netloc]
+
+    def _select(
+        self, instances: Sequence[Instance], method: str, args: Sequence[Any]
+    ) -> Instance:
+        first, second = random.sample(instances, 2)
+        return first if self._score(first) <= self._score(second) else second
+
+    def _score(self, instance: Instance) -> float:
+        netloc = instance.netloc
+        return self._latency.get(netloc, 0.0) * (self._active.get(netloc, 0) + 1) / max(
+            instance.weight, 1
+        )
+
+
+class ConsistentHashLoadBalance(LoadBalance):
+    """Hash ring compatible with the Java ConsistentHashLoadBalance."""
+
+    __slots__ = ("_arguments", "_replicas", "_points", "_owners")
+
+    _arguments: tuple[int, ...]
+    _replicas: int
+    _points: list[int]
+    _owners: list[int]
+
+    def __init__(self, arguments: Sequence[int] = (0,), replicas: int = 160) -> None:
+        super().__init__()
+        self._arguments = tuple(arguments)
+        self._replicas = replicas
+
+    def _rebuild(self, instances: Sequence[Instance]) -> None:
+        ring = []
+        for owner, instance in enumerate(instances):
+            for replica in range(self._replicas // 4):
+                digest = md5(f"{instance.netloc}{replica}".encode()).digest()
+                for part in range(4):
+                    point = int.from_bytes(digest[part * 4 : part * 4 + 4], "little")
+                    ring.append((point, owner))
+        ring.sort()
+        self._points = [point for point, _ in ring]
+        self._owners = [owner for _, owner in ring]
+
+    def _select(
+        self, instances: Sequence[Instance], method: str, args: Sequence[Any]
+    ) -> Instance:
+        key = "".join(str(args[index]) for index in self._arguments if index < len(args))
+        point = int.from_bytes(md5(key.encode()).digest()[:4], "little")
+        index = bisect_left(self._points, point)
+        return instances[self._owners[index if index < len(self._owners) else 0]]
+
+
+class LoadBalanceFactory:
+
+    __slots__ = ()
+
+    LOAD_BALANCES = {
+        "random": RandomLoadBalance,
+        "leastactive": LeastActiveLoadBalance,
+        "p2c": P2CLoadBalance,
+        "consistenthash": ConsistentHashLoadBalance,
+    }
+
+    @staticmethod
+    def get_loadbalance(name: str, **kwargs: Any) -> LoadBalance:
+        assert name in LoadBalanceFactory.LOAD_BALANCES, f"unknown loadbalance {name}"
+        return LoadBalanceFactory.LOAD_BALANCES[name](**kwargs)
@@ -0,0 +1,259 @@
+"""Outlier detection classes."""
+from array import array
+import time
+from typing import Collection, Optional, Sequence
+
+from dubbo.registry import Instance
+
+__all__ = ("CallWindow", "OutlierDetector")
+
+
+class CallWindow:
+    """The outcomes of the latest ``size`` calls to a provider, in a ring."""
+
+    __slots__ = ("_failures", "_latencies", "_index", "_count", "_failed", "_total")
+
+    _failures: bytearray
+    _latencies: array
+    _index: int
+    _count: int
+    # Running sums over the ring, updated as entries are overwritten.
+    _failed: int
+    _total: float
+
+    def __init__(self, size: int = 100) -> None:
+        self._failures = bytearray(size)
+        self._latencies = array("d", bytes(8 * size))
+        self._index = 0
+        self._count = 0
+        self._failed = 0
+        self._total = 0.0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def error_rate(self) -> float:
+        return self._failed / self._count if self._count else 0.0
+
+    @property
+    def latency(self) -> float:
+        return self._total / self._count if self._count else 0.0
+
+    def record(self, ok: bool, latency: float) -> None:
+        index = self._index
+        if self._count == len(self._failures):
+            self._failed -= self._failures[index]
+            self._total -= self._latencies[index]
+        else:
+            self._count += 1
+        self._failures[index] = not ok
+        self._latencies[index] = latency
+        self._failed += not ok
+        self._total += latency
+        self._index = (index + 1) % len(self._failures)
+
+    def clear(self) -> None:
+        self._index = self._count = self._failed = 0
+        self._total = 0.0
+
+
+class _Provider:
+
+    __slots__ = ("window", "ejections", "until", "probing")
+
+    window: CallWindow
+    ejections: int
+    # The time.monotonic() the ejection ends, 0 while not ejected; past it
+    # the provider is half-open and admits one probe call at a time.
+    until: float
+    probing: bool
+
+    def __init__(self, size: int) -> None:
+        self.window = CallWindow(size)
+        self.ejections = 0
+        self.until = 0.0
+        self.probing = False
+
+
+class OutlierDetector:
+    """Ejects the providers of a reference that fail or lag behind the rest.
+
+    A provider is ejected once its window shows more than
+    ``max_error_rate`` failures, or a mean latency above ``latency_factor``
+    times the reference's average, for ``base_ejection`` seconds doubled
+    on every ejection up to ``max_ejection``. No more than
+    ``max_ejected_ratio`` of the providers are ever ejected together.
+    """
+
+    __slots__ = (
+        "_size",
+        "_min_calls",
+        "_max_error_rate",
+        "_latency_factor",
+        "_base_ejection",
+        "_max_ejection",
+        "_max_ejected_ratio",
+        "_providers",
+        "_ejected",
+        "_latency",
+        "_total",
+        "_version",
+        "_next_expiry",
+        "_filtered",
+    )
+
+    _size: int
+    _min_calls: int
+    _max_error_rate: float
+    _latency_factor: float
+    _base_ejection: float
+    _max_ejection: float
+    _max_ejected_ratio: float
+    _providers: dict[str, _Provider]
+    _ejected: set[str]
+    # Average latency of the successful calls to every provider.
+    _latency: Optional[float]
+    _total: int
+    _version: int
+    _next_expiry: float
+    # The last filtered instances, kept while neither input changes.
+    _filtered: tuple[Sequence[Instance], int, tuple[Instance, ...]]
+
+    LATENCY_SMOOTHING: float = 0.01
+
+    def __init__(
+        self,
+        size: int = 100,
+        min_calls: int = 20,
+        max_error_rate: float = 0.5,
+        latency_factor: float = 3.0,
+        base_ejection: float = 30.0,
+        max_ejection: float = 300.0,
+        max_ejected_ratio: float = 0.5,
+    ) -> None:
+        self._size = size
+        self._min_calls = min_calls
+        self._max_error_rate = max_error_rate
+        self._latency_factor = latency_factor
+        self._base_ejection = base_ejection
+        self._max_ejection = max_ejection
+        self._max_ejected_ratio = max_ejected_ratio
+        self._providers = dict()
+        self._ejected = set()
+        self._latency = None
+        self._total = 0
+        self._version = 0
+        self._next_expiry = float("inf")
+        self._filtered = ((), -1, ())
+
+    @property
+    def ejected(self) -> set[str]:
+        return self._ejected
+
+    def healthy(self, instances: Sequence[Instance]) -> Sequence[Instance]:
+        # The very same sequence while nothing is ejected, so that load
+        # balancers keep their derived state.
+        self._total = len(instances)
+        if not self._ejected:
+            return instances
+        cached, version, filtered = self._filtered
+        if cached is not instances or version != self._version:
+            ejected = self._ejected
+            filtered = tuple(
+                instance for instance in instances if instance.netloc not in ejected
+            )
+            self._filtered = (instances, self._version, filtered)
+        return filtered or instances
+
+    def probe(self, instances: Sequence[Instance]) -> Optional[Instance]:
+        # A half-open provider to send this call to, if one awaits a probe.
+        if not self._ejected or time.monotonic() < self._next_expiry:
+            return None
+        now = time.monotonic()
+        self._next_expiry = float("inf")
+        candidate = None
+        for netloc in self._ejected:
+            provider = self._providers[netloc]
+            if provider.probing:
+                continue
+            if provider.until <= now:
+                if candidate is None:
+                    candidate = netloc
+                else:
+                    # Probed on a later call.
+                    self._next_expiry = now
+            else:
+                self._next_expiry = min(self._next_expiry, provider.until)
+        if candidate is None:
+            return None
+        for instance in instances:
+            if instance.netloc == candidate:
+                self._providers[candidate].probing = True
+                return instance
+        # Gone from the registry while ejected.
+        self._readmit(candidate)
+        return None
+
+    def record(self, netloc: str, ok: bool, latency: float) -> None:
+        provider = self._providers.get(netloc)
+        if provider is None:
+            provider = self._providers[netloc] = _Provider(self._size)
+        if provider.probing:
+            provider.probing = False
+            if ok:
+                self._readmit(netloc)
+            else:
+                self._eject(netloc, provider, force=True)
+            return
+        if provider.until:
+            return
+        window = provider.window
+        window.record(ok, latency)
+        if ok:
+            baseline = self._latency
+            self._latency = (
+                latency
+                if baseline is None
+                else baseline + (latency - baseline) * self.LATENCY_SMOOTHING
+            )
+        if len(window) >= self._min_calls and (
+            window.error_rate > self._max_error_rate
+            or window.latency > self._latency_factor * (self._latency or float("inf"))
+        ):
+            self._eject(netloc, provider)
+
+    def release(self, netloc: str) -> None:
+        # The call ended without telling anything about the provider.
+        provider = self._providers.get(netloc)
+        if provider is not None and provider.probing:
+            provider.probing = False
+            self._next_expiry = 0.0
+
+    def retain(self, netlocs: Collection[str]) -> None:
+        # Forgets the providers gone from the registry.
+        for netloc in [netloc for netloc in self._providers if netloc not in netlocs]:
+            del self._providers[netloc]
+            if netloc in self._ejected:
+                self._ejected.discard(netloc)
+                self._next_expiry = 0.0
+                self._version += 1
+
+    def _eject(self, netloc: str, provider: _Provider, force: bool = False) -> None:
+        if not force and len(self._ejected) >= self._total * self._max_ejected_ratio:
+            return
+        duration = min(self._max_ejection, self._base_ejection * 2**provider.ejections)
+        provider.ejections += 1
+        provider.until = time.monotonic() + duration
+        provider.window.clear()
+        self._ejected.add(netloc)
+        self._next_expiry = min(self._next_expiry, provider.until)
+        self._version += 1
+
+    def _readmit(self, netloc: str) -> None:
+        provider = self._providers[netloc]
+        provider.until = 0.0
+        provider.window.clear()
+        self._ejected.discard(netloc)
+        self._next_expiry = 0.0
+        self._version += 1
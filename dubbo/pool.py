@@ -0,0 +1,296 @@
+"""Connection pool classes."""
+import asyncio
+import random
+import time
+from typing import Optional
+
+from dubbo.common.config import ProtocolConfig
+from dubbo.exceptions import ConnectError, RpcTimeoutError
+from dubbo.transport import DubboProtocol, connect
+
+__all__ = ("ConnectionPool", "Endpoint")
+
+
+class Endpoint:
+    """Up to ``size`` multiplexed connections to one provider."""
+
+    __slots__ = (
+        "_host",
+        "_port",
+        "_protocol_config",
+        "_size",
+        "_idle_timeout",
+        "_heartbeat",
+        "_connections",
+        "_connecting",
+        "_used",
+        "_probed",
+        "_reconnecting",
+        "_failures",
+        "_acquired",
+    )
+
+    _host: str
+    _port: int
+    _protocol_config: ProtocolConfig
+    _size: int
+    _idle_timeout: float
+    _heartbeat: float
+    _connections: list[DubboProtocol]
+    _connecting: Optional[asyncio.Future]
+    _used: dict[DubboProtocol, float]
+    # The loop time of each connection's latest heartbeat.
+    _probed: dict[DubboProtocol, float]
+    _reconnecting: Optional[asyncio.TimerHandle]
+    _failures: int
+    # The time.monotonic() of the last acquire.
+    _acquired: float
+
+    # Another connection is opened once every open one carries this many
+    # in-flight requests.
+    GROW_INFLIGHT: int = 64
+    # A connection that has read nothing for this many heartbeats is dead.
+    MISSED_HEARTBEATS: int = 3
+    RECONNECT_DELAY: float = 0.5
+    RECONNECT_MAX_DELAY: float = 30.0
+
+    def __init__(self, netloc: str, protocol_config: ProtocolConfig) -> None:
+        host, port = netloc.rsplit(":", 1)
+        self._host = host
+        self._port = int(port)
+        self._protocol_config = protocol_config
+        self._size = max(1, protocol_config.connections)
+        self._idle_timeout = protocol_config.idle_timeout
+        self._heartbeat = protocol_config.heartbeat
+        self._connections = []
+        self._connecting = None
+        self._used = dict()
+        self._probed = dict()
+        self._reconnecting = None
+        self._failures = 0
+        self._acquired = time.monotonic()
+
+    @property
+    def netloc(self) -> str:
+        return f"{self._host}:{self._port}"
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def connections(self) -> list[DubboProtocol]:
+        return [protocol for protocol in self._connections if protocol.connected]
+
+    def idle(self, now: float) -> bool:
+        # Whether the endpoint holds nothing worth keeping: no connection,
+        # and no reconnect attempt anyone asked for lately.
+        return (
+            not self._connections
+            and self._connecting is None
+            and (
+                self._reconnecting is None
+                or now - self._acquired > self._idle_timeout
+            )
+        )
+
+    async def acquire(self, timeout: Optional[float] = None) -> DubboProtocol:
+        # A caller giving up, or out of time, leaves the connect to others.
+        self._acquired = time.monotonic()
+        protocol = self._least_loaded()
+        if protocol is None or (
+            protocol.inflight >= self.GROW_INFLIGHT
+            and len(self._connections) < self._size
+        ):
+            connecting = self._connect()
+            if protocol is None:
+                try:
+                    protocol = await asyncio.wait_for(
+                        asyncio.shield(connecting), timeout
+                    )
+                except asyncio.TimeoutError:
+                    raise RpcTimeoutError(
+                        f"no connection to {self.netloc} within {timeout:.3f}s"
+                    ) from None
+        self._used[protocol] = time.monotonic()
+        return protocol
+
+    def evict(self, now: Optional[float] = None) -> int:
+        deadline = (now or time.monotonic()) - self._idle_timeout
+        evicted = 0
+        for protocol in list(self._connections):
+            if protocol.inflight == 0 and self._used.get(protocol, 0) < deadline:
+                self._remove(protocol)
+                protocol.close()
+                evicted += 1
+        return evicted
+
+    def heartbeat(self, now: float) -> None:
+        # Called with the loop time; connections silent in either direction
+        # for a heartbeat are probed, once per heartbeat, and replaced once
+        # they stay silent.
+        interval = self._heartbeat
+        for protocol in list(self._connections):
+            if not protocol.connected:
+                continue
+            if now - protocol.last_read > interval * self.MISSED_HEARTBEATS:
+                self._remove(protocol)
+                protocol.close()
+                self._reconnect()
+            elif (
+                now - protocol.last_read > interval
+                or now - protocol.last_write > interval
+            ) and now - self._probed.get(protocol, -interval) >= interval:
+                self._probed[protocol] = now
+                protocol.heartbeat(interval).add_done_callback(_consume)
+
+    def close(self) -> None:
+        for protocol in list(self._connections):
+            self._remove(protocol)
+            protocol.close()
+        if self._connecting is not None:
+            self._connecting.cancel()
+        if self._reconnecting is not None:
+            self._reconnecting.cancel()
+            self._reconnecting = None
+
+    def _least_loaded(self) -> Optional[DubboProtocol]:
+        best = None
+        for protocol in list(self._connections):
+            if not protocol.connected:
+                self._remove(protocol)
+            elif best is None or protocol.inflight < best.inflight:
+                best = protocol
+        return best
+
+    def _connect(self) -> asyncio.Future:
+        connecting = self._connecting
+        if connecting is None:
+            connecting = self._connecting = asyncio.ensure_future(self._open())
+            connecting.add_done_callback(_consume)
+        return connecting
+
+    def _reconnect(self) -> None:
+        if self._reconnecting is None:
+            # Jittered so that providers coming back are not hit at once.
+            delay = min(
+                self.RECONNECT_MAX_DELAY, self.RECONNECT_DELAY * 2**self._failures
+            )
+            self._reconnecting = asyncio.get_running_loop().call_later(
+                delay * random.uniform(0.5, 1.5), self._reconnect_now
+            )
+
+    def _reconnect_now(self) -> None:
+        self._reconnecting = None
+        if len(self._connections) < self._size:
+            self._connect().add_done_callback(self._reconnected)
+
+    def _reconnected(self, future: asyncio.Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            self._failures += 1
+            self._reconnect()
+        else:
+            self._failures = 0
+
+    def _remove(self, protocol: DubboProtocol) -> None:
+        self._connections.remove(protocol)
+        self._used.pop(protocol, None)
+        self._probed.pop(protocol, None)
+
+    async def _open(self) -> DubboProtocol:
+        try:
+            protocol = await asyncio.wait_for(
+                connect(self._host, self._port, protocol_config=self._protocol_config),
+                self._protocol_config.connect_timeout,
+            )
+        except asyncio.TimeoutError:
+            raise ConnectError(
+                f"no connection to {self.netloc} within "
+                f"{self._protocol_config.connect_timeout:.3f}s"
+            ) from None
+        except OSError as e:
+            raise ConnectError(f"cannot connect to {self.netloc}: {e}") from e
+        finally:
+            self._connecting = None
+        self._connections.append(protocol)
+        return protocol
+
+
+def _consume(future: asyncio.Future) -> None:
+    # Failures are raised to the waiting callers, if there are any.
+    if not future.cancelled():
+        future.exception()
+
+
+class ConnectionPool:
+    """Connections shared by every reference, keyed by provider and protocol."""
+
+    __slots__ = ("_endpoints", "_sweeper", "_swept")
+
+    _endpoints: dict[tuple[str, str], Endpoint]
+    # One timer for the whole pool drives heartbeats and idle eviction.
+    _sweeper: Optional[asyncio.TimerHandle]
+    _swept: float
+
+    HEARTBEAT_TICK: float = 1.0
+    SWEEP_INTERVAL: float = 30.0
+
+    def __init__(self) -> None:
+        self._endpoints = dict()
+        self._sweeper = None
+        self._swept = time.monotonic()
+
+    def __len__(self) -> int:
+        return sum(len(endpoint.connections) for endpoint in self._endpoints.values())
+
+    def endpoint(self, netloc: str, protocol_config: ProtocolConfig) -> Endpoint:
+        key = (netloc, protocol_config.id)
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = self._endpoints[key] = Endpoint(netloc, protocol_config)
+            if self._sweeper is None:
+                self._schedule()
+        return endpoint
+
+    async def acquire(
+        self,
+        netloc: str,
+        protocol_config: ProtocolConfig,
+        timeout: Optional[float] = None,
+    ) -> DubboProtocol:
+        return await self.endpoint(netloc, protocol_config).acquire(timeout)
+
+    def evict(self, now: Optional[float] = None) -> int:
+        return sum(endpoint.evict(now) for endpoint in self._endpoints.values())
+
+    def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        endpoints, self._endpoints = self._endpoints, dict()
+        for endpoint in endpoints.values():
+            endpoint.close()
+
+    def _schedule(self) -> None:
+        self._sweeper = asyncio.get_running_loop().call_later(
+            self.HEARTBEAT_TICK, self._sweep
+        )
+
+    def _sweep(self) -> None:
+        now = asyncio.get_running_loop().time()
+        for endpoint in list(self._endpoints.values()):
+            endpoint.heartbeat(now)
+        if time.monotonic() - self._swept >= self.SWEEP_INTERVAL:
+            self._swept = time.monotonic()
+            self.evict()
+            self.prune(self._swept)
+        self._schedule()
+
+    def prune(self, now: Optional[float] = None) -> int:
+        # Drops the endpoints left without connections, most of them of
+        # providers gone from the registry.
+        now = now or time.monotonic()
+        idle = [key for key, endpoint in self._endpoints.items() if endpoint.idle(now)]
+        for key in idle:
+            self._endpoints.pop(key).close()
+        return len(idle)
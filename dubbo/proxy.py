@@ -1,9 +1,582 @@
 """Proxy classes."""
+import asyncio
+from functools import partial
+import math
+import random
+import time
+from typing import Any, Optional, Sequence
 
-__all__ = ('Proxy',)
+from dubbo.cache import MISSING, ResultCache
+from dubbo.codec import Invocation, java_types
+from dubbo.common.config import ProtocolConfig, ReferenceConfig
+from dubbo.context import remaining
+from dubbo.exceptions import (
+    ConnectionLostError,
+    NoProviderError,
+    RemotingError,
+    RpcError,
+    RpcTimeoutError,
+    ServiceError,
+)
+from dubbo.hedge import HedgeBudget, LatencyTracker
+from dubbo.limiter import AdaptiveLimiter
+from dubbo.loadbalance import LoadBalance, LoadBalanceFactory
+from dubbo.metrics import METRICS, MethodMetrics, ReferenceMetrics
+from dubbo.outlier import OutlierDetector
+from dubbo.pool import ConnectionPool
+from dubbo.registry import Instance, Registry
 
+__all__ = ("Proxy", "MethodStub")
 
-class Proxy():
+GENERIC_PARAMETER_TYPES = (
+    "java.lang.String",
+    "java.lang.String[]",
+    "java.lang.Object[]",
+)
 
-    def __init__(self) -> None:
-        pass
+# Error statuses that tell of a bad request rather than a sick provider.
+CLIENT_STATUSES = frozenset((40, 90))
+
+
+def _answered(call: asyncio.Future) -> bool:
+    # Whether a finished call got a response from its provider.
+    exception = call.exception()
+    return exception is None or isinstance(exception, (ServiceError, RemotingError))
+
+
+def _consume(call: asyncio.Future) -> None:
+    if not call.cancelled():
+        call.exception()
+
+
+class Proxy:
+    """Calls to the providers of one reference.
+
+    Remote methods are attributes of the proxy, ``await proxy.sayHello(name)``.
+    The names the proxy defines itself, such as ``invoke``, ``connect``,
+    ``instances``, ``stub``, ``generic_invoke`` and ``reference_config``,
+    stay the proxy's own: a remote method of one of those names is called
+    through ``proxy.stub(name)`` or ``proxy.invoke(name, args)``.
+    """
+
+    __slots__ = (
+        "_reference_config",
+        "_registry",
+        "_pool",
+        "_protocol_config",
+        "_loadbalance",
+        "_invocations",
+        "_limiters",
+        "_outliers",
+        "_hedges",
+        "_hedge_budget",
+        "_metrics",
+        "_caches",
+        "_instances",
+        # Holds the method stubs made on attribute access.
+        "__dict__",
+    )
+
+    _reference_config: ReferenceConfig
+    _registry: Registry
+    _pool: ConnectionPool
+    _protocol_config: ProtocolConfig
+    _loadbalance: LoadBalance
+    _invocations: dict[tuple[str, tuple[str, ...]], Invocation]
+    _limiters: dict[str, AdaptiveLimiter]
+    _outliers: Optional[OutlierDetector]
+    _hedges: dict[str, LatencyTracker]
+    _hedge_budget: HedgeBudget
+    _metrics: ReferenceMetrics
+    _caches: dict[str, ResultCache]
+    # The providers last selected from, to notice them change.
+    _instances: tuple[Instance, ...]
+
+    SELECT_ATTEMPTS: int = 3
+
+    def __init__(
+        self,
+        reference_config: ReferenceConfig,
+        registry: Registry,
+        pool: Optional[ConnectionPool] = None,
+    ) -> None:
+        self._reference_config = reference_config
+        self._registry = registry
+        self._pool = ConnectionPool() if pool is None else pool
+        self._protocol_config = next(
+            iter(reference_config.protocols.values()), ProtocolConfig()
+        )
+        self._loadbalance = LoadBalanceFactory.get_loadbalance(
+            reference_config.loadbalance
+        )
+        self._invocations = dict()
+        self._limiters = dict()
+        self._outliers = (
+            OutlierDetector() if reference_config.outlier_detection else None
+        )
+        self._hedges = {
+            name: LatencyTracker(config.hedge)
+            for name, config in reference_config.methods.items()
+            if config.hedge is not None
+        }
+        self._hedge_budget = HedgeBudget(reference_config.hedge_budget)
+        self._metrics = METRICS.reference(reference_config.id)
+        self._caches = {
+            name: ResultCache(
+                config.cache_ttl, config.cache_entries, config.cache_bytes
+            )
+            for name, config in reference_config.methods.items()
+            if config.cache is not None
+        }
+        self._instances = ()
+
+    @property
+    def reference_config(self) -> ReferenceConfig:
+        return self._reference_config
+
+    def __getattr__(self, name: str) -> "MethodStub":
+        # Only for names not found otherwise, never the proxy's own: the
+        # stub is kept as an attribute, so later calls find it directly.
+        if name.startswith("_"):
+            raise AttributeError(name)
+        stub = self.stub(name)
+        setattr(self, name, stub)
+        return stub
+
+    def stub(
+        self, method: str, parameter_types: Optional[Sequence[str]] = None
+    ) -> "MethodStub":
+        return MethodStub(self, method, parameter_types)
+
+    async def invoke(
+        self,
+        method: str,
+        args: Sequence[Any] = (),
+        parameter_types: Optional[Sequence[str]] = None,
+        attachments: Optional[dict[str, Any]] = None,
+    ) -> Any:
+        invocation = self._invocation(
+            method, java_types(args) if parameter_types is None else parameter_types
+        )
+        return await self._invoke(
+            self._metrics.method(method), invocation, args, attachments
+        )
+
+    async def generic_invoke(
+        self,
+        method: str,
+        parameter_types: Sequence[str],
+        args: Sequence[Any] = (),
+        attachments: Optional[dict[str, Any]] = None,
+    ) -> Any:
+        # Dubbo's generic call, for providers whose interface is not known
+        # beyond the method's signature.
+        return await self.invoke(
+            "$invoke",
+            (method, list(parameter_types), list(args)),
+            GENERIC_PARAMETER_TYPES,
+            dict(attachments or (), generic="true"),
+        )
+
+    async def instances(self) -> tuple[Instance, ...]:
+        return await self._registry.instances(self._reference_config)
+
+    async def connect(self, ratio: float = 1.0) -> int:
+        # Opens connections to a random ``ratio`` of the providers ahead of
+        # the first calls; returns how many succeeded.
+        instances = await self.instances()
+        count = min(len(instances), math.ceil(len(instances) * ratio))
+        results = await asyncio.gather(
+            *[
+                self._pool.acquire(instance.netloc, self._protocol_config)
+                for instance in random.sample(instances, count)
+            ],
+            return_exceptions=True,
+        )
+        return sum(not isinstance(result, BaseException) for result in results)
+
+    async def _call(
+        self,
+        metrics: MethodMetrics,
+        invocation: Invocation,
+        args: Sequence[Any],
+        attachments: Optional[dict[str, Any]],
+        timeout: Optional[float],
+        tried: Optional[set[str]] = None,
+    ) -> tuple[Any, int]:
+        # The result, and the size of the response that carried it.
+        selecting = time.monotonic()
+        instance, limiter = await self._select(
+            invocation.method, args, timeout, tried
+        )
+        if tried is not None:
+            tried.add(instance.netloc)
+        started = time.monotonic()
+        # Only a sample of the calls is recorded, RTT included: a call
+        # costs next to nothing otherwise, and the quantiles hardly move.
+        sample = self._reference_config.metrics_sample
+        sampled = sample and not metrics.calls % sample
+        if sampled:
+            metrics.queue.record(started - selecting)
+        # The timeout covers the whole call, connecting and draining
+        # included; what is left of it goes to the request.
+        expires = None if timeout is None else selecting + timeout
+        rtt = None
+        # Whether the provider served the call well, None if it cannot tell.
+        healthy = None
+        try:
+            protocol = await self._pool.acquire(
+                instance.netloc,
+                self._protocol_config,
+                None if expires is None else expires - started,
+            )
+            if not protocol.writable:
+                try:
+                    await asyncio.wait_for(
+                        protocol.drain(),
+                        None if expires is None else expires - time.monotonic(),
+                    )
+                except asyncio.TimeoutError:
+                    raise RpcTimeoutError(
+                        f"connection to {instance.netloc} stayed saturated"
+                    ) from None
+            codec = protocol.codec
+            if sampled:
+                encoding = time.monotonic()
+                body = codec.encode_request(invocation, args, attachments)
+                sent = time.monotonic()
+                metrics.serialize.record(sent - encoding)
+                metrics.request_size.record(len(body))
+            else:
+                body = codec.encode_request(invocation, args, attachments)
+                sent = time.monotonic()
+            if expires is not None:
+                timeout = expires - sent
+                if timeout <= 0:
+                    raise RpcTimeoutError(
+                        f"no connection to {instance.netloc} in time to call"
+                    )
+            loadbalance = self._loadbalance
+            loadbalance.start(instance)
+            try:
+                response = await protocol.request(body, timeout=timeout)
+                received = time.monotonic()
+                rtt = received - sent
+            finally:
+                loadbalance.finish(
+                    instance, time.monotonic() - sent if rtt is None else rtt
+                )
+            if sampled:
+                metrics.rtt.record(rtt)
+                self._metrics.provider(instance.netloc).record(rtt)
+            healthy = response.ok or response.status in CLIENT_STATUSES
+        except (RpcTimeoutError, ConnectionLostError, OSError):
+            # Refused or timed out connects included.
+            healthy = False
+            raise
+        except asyncio.CancelledError:
+            # Given up by the caller, or a hedge that lost the race: says
+            # nothing about the provider.
+            if limiter is not None:
+                limiter.discard()
+                limiter = None
+            raise
+        finally:
+            if limiter is not None:
+                limiter.release(rtt)
+            outliers = self._outliers
+            if outliers is not None:
+                if healthy is None:
+                    outliers.release(instance.netloc)
+                else:
+                    outliers.record(
+                        instance.netloc,
+                        healthy,
+                        (time.monotonic() if rtt is None else received) - started,
+                    )
+        tracker = self._hedges.get(invocation.method)
+        if tracker is not None:
+            tracker.record(rtt)  # type: ignore[arg-type]
+        size = len(response.body)
+        if not sampled:
+            return codec.decode_response(response.status, response.body), size
+        metrics.response_size.record(size)
+        decoding = time.monotonic()
+        try:
+            return codec.decode_response(response.status, response.body), size
+        finally:
+            metrics.deserialize.record(time.monotonic() - decoding)
+
+    async def _hedged(
+        self,
+        metrics: MethodMetrics,
+        tracker: LatencyTracker,
+        invocation: Invocation,
+        args: Sequence[Any],
+        attachments: Optional[dict[str, Any]],
+        timeout: Optional[float],
+    ) -> tuple[Any, int]:
+        # Once the call has taken longer than the method's latency
+        # percentile, a second one goes to another provider, budget
+        # permitting, and the first answer wins.
+        budget = self._hedge_budget
+        budget.deposit()
+        tried: set[str] = set()
+        started = time.monotonic()
+        calls = [
+            asyncio.ensure_future(
+                self._call(metrics, invocation, args, attachments, timeout, tried)
+            )
+        ]
+        try:
+            delay = tracker.value
+            if delay is not None and (timeout is None or delay < timeout):
+                done, _ = await asyncio.wait(calls, timeout=delay)
+                if not done and budget.withdraw():
+                    metrics.hedges += 1
+                    left = (
+                        None
+                        if timeout is None
+                        else timeout - (time.monotonic() - started)
+                    )
+                    calls.append(
+                        asyncio.ensure_future(
+                            self._call(
+                                metrics, invocation, args, attachments, left, tried
+                            )
+                        )
+                    )
+            pending = set(calls)
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for call in calls:
+                    if call in done and (not pending or _answered(call)):
+                        return call.result()
+        finally:
+            if not calls[0].done():
+                # The first call lost the race: it would have taken at least
+                # this long, which only the winners' latencies would hide.
+                tracker.record(time.monotonic() - started)
+            for call in calls:
+                if not call.done():
+                    call.cancel()
+                else:
+                    _consume(call)
+
+    async def _invoke(
+        self,
+        metrics: MethodMetrics,
+        invocation: Invocation,
+        args: Sequence[Any],
+        attachments: Optional[dict[str, Any]],
+    ) -> Any:
+        cache = self._caches.get(invocation.method)
+        if cache is None:
+            return (await self._remote(metrics, invocation, args, attachments))[0]
+        key = cache.key(invocation.parameter_types, args)
+        value = cache.get(key)
+        if value is not MISSING:
+            metrics.cache_hits += 1
+            return value
+        metrics.cache_misses += 1
+        return await cache.load(
+            key, partial(self._remote, metrics, invocation, args, attachments)
+        )
+
+    async def _remote(
+        self,
+        metrics: MethodMetrics,
+        invocation: Invocation,
+        args: Sequence[Any],
+        attachments: Optional[dict[str, Any]],
+    ) -> tuple[Any, int]:
+        # The result and its response's size, for the cache to weigh it.
+        method = invocation.method
+        metrics.calls += 1
+        try:
+            timeout = self._timeout(method)
+            if timeout is not None:
+                # Providers read the timeout attachment as milliseconds.
+                attachments = dict(
+                    attachments or (), timeout=str(int(timeout * 1000))
+                )
+            tracker = self._hedges.get(method)
+            if tracker is None:
+                return await self._call(
+                    metrics, invocation, args, attachments, timeout
+                )
+            return await self._hedged(
+                metrics, tracker, invocation, args, attachments, timeout
+            )
+        except RpcError:
+            metrics.errors += 1
+            raise
+
+    def _invocation(self, method: str, parameter_types: Sequence[str]) -> Invocation:
+        key = (method, tuple(parameter_types))
+        invocation = self._invocations.get(key)
+        if invocation is None:
+            invocation = self._invocations[key] = Invocation(
+                self._reference_config, method, parameter_types
+            )
+        return invocation
+
+    def _timeout(self, method: str) -> Optional[float]:
+        timeout = self._reference_config.method_timeout(method)
+        left = remaining()
+        if left is not None:
+            if left <= 0:
+                # The caller has given up already, the provider is spared.
+                raise RpcTimeoutError(f"deadline exceeded before calling {method}")
+            if timeout is None or left < timeout:
+                timeout = left
+        return timeout
+
+    async def _select(
+        self,
+        method: str,
+        args: Sequence[Any],
+        timeout: Optional[float],
+        tried: Optional[set[str]] = None,
+    ) -> tuple[Instance, Optional[AdaptiveLimiter]]:
+        instances = await self.instances()
+        if instances is not self._instances:
+            self._retain(instances)
+        if not instances:
+            raise NoProviderError(f"no provider for {self._reference_config.id}")
+        outliers = self._outliers
+        if outliers is not None:
+            probe = outliers.probe(instances)
+            # A provider whose ejection is over gets one call to prove itself.
+            if probe is not None:
+                if self._reference_config.concurrency is None:
+                    return probe, None
+                limiter = self._limiter(probe.netloc)
+                if limiter.try_acquire():
+                    return probe, limiter
+                outliers.release(probe.netloc)
+            instances = outliers.healthy(instances)  # type: ignore[assignment]
+        if self._reference_config.concurrency is None:
+            return self._pick(instances, method, args, tried), None
+        # Saturated providers are skipped while another one has room.
+        for _ in range(min(len(instances), self.SELECT_ATTEMPTS)):
+            instance = self._pick(instances, method, args, tried)
+            limiter = self._limiter(instance.netloc)
+            if limiter.try_acquire():
+                return instance, limiter
+        untried = not tried or any(
+            candidate.netloc not in tried for candidate in instances
+        )
+        backlog = None
+        for candidate in instances:
+            if tried and untried and candidate.netloc in tried:
+                continue
+            candidate_limiter = self._limiter(candidate.netloc)
+            if candidate_limiter.try_acquire():
+                return candidate, candidate_limiter
+            queued = candidate_limiter.queued - candidate_limiter.limit
+            if backlog is None or queued < backlog:
+                backlog, instance, limiter = queued, candidate, candidate_limiter
+        # Every provider is saturated: wait for the shortest queue, which
+        # a hedge sent meanwhile avoids.
+        if tried is not None:
+            tried.add(instance.netloc)
+        await limiter.acquire(timeout)
+        return instance, limiter
+
+    def _pick(
+        self,
+        instances: Sequence[Instance],
+        method: str,
+        args: Sequence[Any],
+        tried: Optional[set[str]],
+    ) -> Instance:
+        # A hedge goes elsewhere, if there is anywhere else to go. The
+        # balancer is asked again rather than handed the providers left,
+        # a sequence of its own that would make it rebuild its state.
+        select = self._loadbalance.select
+        instance = select(instances, method, args)
+        if not tried or instance.netloc not in tried:
+            return instance
+        for _ in range(self.SELECT_ATTEMPTS):
+            instance = select(instances, method, args)
+            if instance.netloc not in tried:
+                return instance
+        for candidate in instances:
+            if candidate.netloc not in tried:
+                return candidate
+        return instance
+
+    def _retain(self, instances: tuple[Instance, ...]) -> None:
+        # Forgets the state kept for providers gone from the registry, so
+        # that churn does not pile it up.
+        self._instances = instances
+        netlocs = {instance.netloc for instance in instances}
+        limiters = self._limiters
+        for netloc in [netloc for netloc in limiters if netloc not in netlocs]:
+            del limiters[netloc]
+        if self._outliers is not None:
+            self._outliers.retain(netlocs)
+        self._loadbalance.retain(netlocs)
+        self._metrics.retain(netlocs)
+
+    def _limiter(self, netloc: str) -> AdaptiveLimiter:
+        limiter = self._limiters.get(netloc)
+        if limiter is None:
+            reference_config = self._reference_config
+            limiter = self._limiters[netloc] = AdaptiveLimiter(
+                reference_config.concurrency or 1,
+                max_queue=reference_config.max_queue,
+            )
+        return limiter
+
+
+class MethodStub:
+    """Calls to one method of a proxy's reference.
+
+    Keeps what every call of the method shares: its metrics and the
+    pre-encoded invocation, per parameter types unless those are given.
+    """
+
+    __slots__ = ("_proxy", "_method", "_metrics", "_invocation", "_invocations")
+
+    _proxy: Proxy
+    _method: str
+    _metrics: MethodMetrics
+    _invocation: Optional[Invocation]
+    _invocations: dict[tuple[str, ...], Invocation]
+
+    def __init__(
+        self,
+        proxy: Proxy,
+        method: str,
+        parameter_types: Optional[Sequence[str]] = None,
+    ) -> None:
+        self._proxy = proxy
+        self._method = method
+        self._metrics = proxy._metrics.method(method)
+        self._invocation = (
+            None
+            if parameter_types is None
+            else proxy._invocation(method, parameter_types)
+        )
+        self._invocations = dict()
+
+    @property
+    def method(self) -> str:
+        return self._method
+
+    async def __call__(
+        self, *args: Any, attachments: Optional[dict[str, Any]] = None
+    ) -> Any:
+        invocation = self._invocation
+        if invocation is None:
+            parameter_types = java_types(args)
+            invocation = self._invocations.get(parameter_types)
+            if invocation is None:
+                invocation = self._invocations[parameter_types] = (
+                    self._proxy._invocation(self._method, parameter_types)
+                )
+        return await self._proxy._invoke(self._metrics, invocation, args, attachments)
@@ -1,37 +1,367 @@
 """Registry classes"""
 from collections import namedtuple
-from typing import Any, Callable, NamedTuple, Optional
+from functools import lru_cache
+from typing import Any, Callable, Iterable, NamedTuple, Optional
 from abc import abstractmethod
 import asyncio
-import threading
+import logging
+import os
+import random
+import sys
+import time
 import urllib.parse
 
 from kazoo.client import KazooClient, KazooState, WatchedEvent
 
-from common.config import ApplicationConfig, CenterConfig, ReferenceConfig
+from dubbo.common.config import ApplicationConfig, CenterConfig, ReferenceConfig
+from dubbo.metrics import METRICS, RegistryMetrics
+from dubbo.snapshot import Snapshot
+
+__all__ = (
+    "Instance",
+    "Registry",
+    "MemoryRegistry",
+    "FileRegistry",
+    "RegistryFactory",
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEIGHT = 100
+DEFAULT_WARMUP = 10 * 60 * 1000
+NODE_CACHE_SIZE = 8192
+
+
+class Node:
+    """A provider URL, reduced to the fields routing and load balancing read.
+
+    Strings shared between providers are interned; every other parameter is
+    parsed again from the raw child name when asked for.
+    """
+
+    __slots__ = (
+        "child",
+        "scheme",
+        "netloc",
+        "version",
+        "group",
+        "application",
+        "methods",
+        "weight",
+        "warmup",
+        "timestamp",
+    )
+
+    child: str
+    scheme: str
+    netloc: str
+    version: str
+    group: str
+    application: str
+    methods: str
+    weight: int
+    warmup: int
+    timestamp: int
+
+    def __init__(self, child: str) -> None:
+        parse_result = urllib.parse.urlparse(urllib.parse.unquote(child))
+        query = dict(urllib.parse.parse_qsl(parse_result.query))
+        self.child = child
+        self.scheme = sys.intern(parse_result.scheme)
+        self.netloc = sys.intern(parse_result.netloc)
+        self.version = sys.intern(query.get("version", ""))
+        self.group = sys.intern(query.get("group", ""))
+        self.application = sys.intern(query.get("application", ""))
+        self.methods = sys.intern(query.get("methods", ""))
+        self.weight = _int(query.get("weight"), DEFAULT_WEIGHT)
+        self.warmup = _int(query.get("warmup"), DEFAULT_WARMUP)
+        self.timestamp = _int(query.get("timestamp"), 0)
+
+    def __repr__(self) -> str:
+        return (
+            f"Node({self.scheme}://{self.netloc}, "
+            f"version={self.version!r}, group={self.group!r})"
+        )
 
-__all__ = ("Registry", "RegistryFactory")
+    @property
+    def query(self) -> dict[str, str]:
+        url = urllib.parse.unquote(self.child)
+        return dict(urllib.parse.parse_qsl(urllib.parse.urlparse(url).query))
 
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        return self.query.get(key, default)
 
-class Node(NamedTuple):
-    scheme: str
+
+class Instance(NamedTuple):
     netloc: str
-    query: dict[str, str]
+    weight: int = DEFAULT_WEIGHT
+    # Both in milliseconds, the provider start time and its warmup period.
+    warmup: int = DEFAULT_WARMUP
+    timestamp: int = 0
+
+    @classmethod
+    def from_node(cls, node: Node) -> "Instance":
+        return cls(node.netloc, node.weight, node.warmup, node.timestamp)
+
+
+def _int(value: Optional[str], default: int) -> int:
+    try:
+        return int(value) if value else default
+    except ValueError:
+        return default
+
+
+class Selector(NamedTuple):
+    # "*" matches every version, a None groups set matches every group.
+    version: str
+    groups: Optional[frozenset[str]]
+
+    @classmethod
+    def of(cls, version: Optional[str], group: Optional[str]) -> "Selector":
+        group = group or ""
+        return cls(
+            version or "", None if group == "*" else frozenset(group.split(","))
+        )
+
+    def matches(self, bucket: tuple[str, str]) -> bool:
+        version, group = bucket
+        return (self.version == "*" or self.version == version) and (
+            self.groups is None or group in self.groups
+        )
+
+
+@lru_cache(maxsize=NODE_CACHE_SIZE)
+def parse_node(child: str) -> Node:
+    # Cached by the raw child name: flapping providers re-register the
+    # same URL, which is then parsed only once.
+    return Node(child)
+
+
+class NodeIndex:
+    """The nodes of one interface, by raw child name and by version/group."""
+
+    __slots__ = ("_nodes", "_buckets")
+
+    _nodes: dict[str, Node]
+    _buckets: dict[str, dict[str, dict[str, Instance]]]
+
+    def __init__(self) -> None:
+        self._nodes = dict()
+        self._buckets = dict()
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, child: str) -> bool:
+        return child in self._nodes
+
+    @property
+    def nodes(self) -> list[Node]:
+        return list(self._nodes.values())
+
+    @property
+    def children(self) -> list[str]:
+        return list(self._nodes.keys())
+
+    def diff(self, children: Iterable[str]) -> tuple[list[str], list[str]]:
+        current = set(children)
+        known = self._nodes.keys()
+        return list(current - known), list(known - current)
+
+    def add(self, child: str, node: Node) -> tuple[tuple[str, str], Instance]:
+        bucket = (node.version, node.group)
+        instance = Instance.from_node(node)
+        self._nodes[child] = node
+        self._buckets.setdefault(bucket[0], {}).setdefault(bucket[1], {})[
+            child
+        ] = instance
+        return bucket, instance
+
+    def remove(self, child: str) -> Optional[Node]:
+        node = self._nodes.pop(child, None)
+        if node is not None:
+            version, group = node.version, node.group
+            groups = self._buckets[version]
+            del groups[group][child]
+            if not groups[group]:
+                del groups[group]
+                if not groups:
+                    del self._buckets[version]
+        return node
+
+    def lookup(self, selector: Selector) -> dict[str, Instance]:
+        if selector.version == "*":
+            versions = list(self._buckets.values())
+        else:
+            groups = self._buckets.get(selector.version)
+            versions = [groups] if groups else []
+        instances: dict[str, Instance] = {}
+        for groups in versions:
+            if selector.groups is None:
+                buckets = groups.values()
+            else:
+                buckets = [groups[group] for group in selector.groups if group in groups]
+            for bucket in buckets:
+                instances.update(bucket)
+        return instances
+
+
+class InstanceSet:
+    """The instances of one reference, kept up to date by node deltas."""
+
+    __slots__ = ("_selector", "_members", "_instances")
+
+    _selector: Selector
+    _members: dict[str, Instance]
+    _instances: Optional[tuple[Instance, ...]]
+
+    def __init__(self, selector: Selector, members: dict[str, Instance]) -> None:
+        self._selector = selector
+        self._members = members
+        self._instances = None
+
+    def __len__(self) -> int:
+        return len(self.instances)
+
+    @property
+    def selector(self) -> Selector:
+        return self._selector
+
+    @property
+    def instances(self) -> tuple[Instance, ...]:
+        # Rebuilt lazily and only after a change, so load balancers can
+        # cache against the identity of the tuple.
+        if self._instances is None:
+            unique: dict[str, Instance] = {}
+            for instance in self._members.values():
+                unique.setdefault(instance.netloc, instance)
+            self._instances = tuple(unique.values())
+        return self._instances
+
+    def add(self, child: str, instance: Instance) -> None:
+        self._members[child] = instance
+        self._instances = None
+
+    def discard(self, child: str) -> None:
+        if self._members.pop(child, None) is not None:
+            self._instances = None
+
+
+def _consume(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning(
+            "registry background task failed", exc_info=future.exception()
+        )
+
+
+class Debouncer:
+    """Coalesces keys scheduled within ``delay`` into one callback."""
+
+    __slots__ = ("_loop", "_delay", "_callback", "_pending", "_handle")
+
+    _loop: asyncio.AbstractEventLoop
+    _delay: float
+    _callback: Callable[[set[str]], None]
+    _pending: set[str]
+    _handle: Optional[asyncio.TimerHandle]
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        delay: float,
+        callback: Callable[[set[str]], None],
+    ) -> None:
+        self._loop = loop
+        self._delay = delay
+        self._callback = callback
+        self._pending = set()
+        self._handle = None
+
+    @property
+    def pending(self) -> set[str]:
+        return self._pending
+
+    def schedule(self, key: str) -> None:
+        self._pending.add(key)
+        if self._handle is None:
+            self._handle = self._loop.call_later(self._delay, self._flush)
+
+    def schedule_threadsafe(self, key: str) -> None:
+        if not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.schedule, key)
+
+    def cancel(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._pending = set()
+
+    def _flush(self) -> None:
+        keys, self._pending = self._pending, set()
+        self._handle = None
+        self._callback(keys)
 
 
 class Registry:
 
-    __slots__ = ("_application", "_scheme", "_hosts")
+    __slots__ = (
+        "_application",
+        "_scheme",
+        "_hosts",
+        "_nodes",
+        "_instances",
+        "_subscriptions",
+        "_fetches",
+        "_stale",
+        "_snapshot",
+        "_snapshot_interval",
+        "_snapshot_handle",
+        "_dirty",
+        "_listeners",
+        "_metrics",
+    )
 
     _application: str
     _scheme: str
     _hosts: str
+    _nodes: dict[str, NodeIndex]
+    _instances: dict[str, InstanceSet]
+    _subscriptions: dict[str, list[InstanceSet]]
+    _fetches: dict[str, asyncio.Future]
+    # Interfaces served from the snapshot until they are fetched live.
+    _stale: set[str]
+    _snapshot: Optional[Snapshot]
+    _snapshot_interval: float
+    _snapshot_handle: Optional[asyncio.TimerHandle]
+    _dirty: bool
+    _listeners: list[Callable[[str, list[str]], None]]
+    _metrics: RegistryMetrics
 
     def __init__(
         self, application_config: ApplicationConfig, registry_config: CenterConfig
     ) -> None:
         self._application = application_config.name
         self._scheme, self._hosts = registry_config.address.split("://")
+        self._nodes = dict()
+        self._instances = dict()
+        self._subscriptions = dict()
+        self._fetches = dict()
+        self._stale = set()
+        self._snapshot = None
+        self._snapshot_interval = registry_config.snapshot_interval
+        self._snapshot_handle = None
+        self._dirty = False
+        self._listeners = []
+        # A shared registry counts apart from the upstream one it wraps.
+        self._metrics = METRICS.registry(
+            registry_config.shared or registry_config.address
+        )
+        if registry_config.snapshot:
+            self._snapshot = Snapshot(registry_config.snapshot)
+            for interface, children in self._snapshot.load().items():
+                self._update(interface, children)
+                self._stale.add(interface)
+            self._dirty = False
 
     @property
     def scheme(self) -> str:
@@ -45,20 +375,151 @@ class Registry:
     def ready(self) -> bool:
         pass
 
+    async def instances(
+        self, reference_config: ReferenceConfig
+    ) -> tuple[Instance, ...]:
+        instances = self._instances.get(reference_config.id)
+        if instances is None:
+            instances = await self._resolve(reference_config)
+        return instances.instances
+
+    async def children(self, reference_config: ReferenceConfig) -> list[str]:
+        return [
+            instance.netloc for instance in await self.instances(reference_config)
+        ]
+
+    async def watch(self, interface: str) -> list[str]:
+        # The raw children of an interface, kept up to date from then on;
+        # listeners hear of every later change.
+        if interface not in self._nodes or interface in self._stale:
+            self._stale.discard(interface)
+            await asyncio.shield(self._fetch_once(interface))
+        return self._nodes[interface].children
+
+    def add_listener(self, listener: Callable[[str, list[str]], None]) -> None:
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str, list[str]], None]) -> None:
+        self._listeners.remove(listener)
+
     @abstractmethod
-    async def children(self, reference: ReferenceConfig) -> list[str]:
+    async def _fetch(self, interface: str) -> list[str]:
         pass
 
+    def close(self) -> None:
+        if self._snapshot_handle is not None:
+            self._snapshot_handle.cancel()
+            self._snapshot_handle = None
+        if self._snapshot is not None and self._dirty:
+            self._dirty = False
+            self._snapshot.dump(self._snapshot_data())
+
+    async def _resolve(self, reference_config: ReferenceConfig) -> InstanceSet:
+        interface = reference_config.interface
+        if self._snapshot is not None and self._snapshot_handle is None:
+            self._schedule_snapshot()
+        if interface in self._stale:
+            # Serve the snapshot now, catch up with the live state behind.
+            self._stale.discard(interface)
+            self._fetch_once(interface).add_done_callback(_consume)
+        elif interface not in self._nodes:
+            await asyncio.shield(self._fetch_once(interface))
+        instances = self._instances.get(reference_config.id)
+        if instances is None:
+            instances = self._subscribe(reference_config)
+        return instances
+
+    def _fetch_once(self, interface: str) -> asyncio.Future:
+        # Concurrent first lookups of an interface share one fetch.
+        future = self._fetches.get(interface)
+        if future is None:
+            future = self._fetches[interface] = asyncio.ensure_future(
+                self._load(interface)
+            )
+        return future
+
+    async def _load(self, interface: str) -> None:
+        try:
+            self._update(interface, await self._timed_fetch(interface))
+        finally:
+            del self._fetches[interface]
+
+    async def _timed_fetch(self, interface: str) -> list[str]:
+        metrics = self._metrics
+        metrics.fetches += 1
+        started = time.monotonic()
+        try:
+            return await self._fetch(interface)
+        except Exception:
+            metrics.failures += 1
+            raise
+        finally:
+            metrics.refresh.record(time.monotonic() - started)
+
+    def _schedule_snapshot(self) -> None:
+        self._snapshot_handle = asyncio.get_running_loop().call_later(
+            self._snapshot_interval, self._save_snapshot
+        )
+
+    def _save_snapshot(self) -> None:
+        self._schedule_snapshot()
+        if self._dirty:
+            self._dirty = False
+            asyncio.get_running_loop().run_in_executor(
+                None,
+                self._snapshot.dump,  # type: ignore[union-attr]
+                self._snapshot_data(),
+            ).add_done_callback(_consume)
+
+    def _snapshot_data(self) -> dict[str, list[str]]:
+        return {interface: index.children for interface, index in self._nodes.items()}
+
+    def _subscribe(self, reference_config: ReferenceConfig) -> InstanceSet:
+        interface = reference_config.interface
+        selector = Selector.of(reference_config.version, reference_config.group)
+        index = self._nodes.get(interface)
+        instances = InstanceSet(selector, index.lookup(selector) if index else {})
+        self._instances[reference_config.id] = instances
+        self._subscriptions.setdefault(interface, []).append(instances)
+        return instances
+
+    def _update(self, interface: str, children: Iterable[str]) -> tuple[int, int]:
+        index = self._nodes.get(interface)
+        if index is None:
+            index = self._nodes[interface] = NodeIndex()
+        added, removed = index.diff(children)
+        subscriptions = self._subscriptions.get(interface, ())
+        for child in removed:
+            index.remove(child)
+            for instances in subscriptions:
+                instances.discard(child)
+        for child in added:
+            bucket, instance = index.add(child, parse_node(child))
+            for instances in subscriptions:
+                if instances.selector.matches(bucket):
+                    instances.add(child, instance)
+        if added or removed:
+            metrics = self._metrics
+            metrics.updates += 1
+            metrics.added += len(added)
+            metrics.removed += len(removed)
+            self._dirty = True
+            if self._listeners:
+                children = index.children
+                for listener in self._listeners:
+                    listener(interface, children)
+        return len(added), len(removed)
+
 
 class ZookeeperRegistry(Registry):
 
-    __slots__ = ("_client", "_lock", "_loop", "_nodes", "_instances")
+    __slots__ = ("_client", "_debounce", "_events", "_refreshing", "_tasks")
 
     _client: KazooClient
-    _lock: threading.Lock
-    _loop: asyncio.AbstractEventLoop
-    _nodes: dict[str, list[Node]]
-    _instances: dict[str, list[str]]
+    _debounce: float
+    _events: Optional[Debouncer]
+    _refreshing: set[str]
+    _tasks: set[asyncio.Task]
 
     PROVIDER_PATH: str = "/dubbo/{}/providers"
 
@@ -66,109 +527,79 @@ class ZookeeperRegistry(Registry):
         self, application_config: ApplicationConfig, registry_config: CenterConfig
     ) -> None:
         super().__init__(application_config, registry_config)
-        self._lock = threading.Lock()
-        try:
-            self._loop = asyncio.get_running_loop()
-        except:
-            self._loop = asyncio.new_event_loop()
+        self._debounce = registry_config.debounce
+        self._events = None
+        self._refreshing = set()
+        self._tasks = set()
         self._client = KazooClient(hosts=self.hosts)
         self._client.add_listener(self._state_listener)
-        self._client.start()
-        self._nodes = dict()
-        self._instances = dict()
+        if self._snapshot is None:
+            self._client.start()
+        else:
+            # The snapshot serves traffic until ZooKeeper is reachable.
+            self._client.start_async()
 
     @property
     def ready(self) -> bool:
         return self._client.connected
 
-    async def children(self, reference_config: ReferenceConfig) -> list[str]:
-        interface = reference_config.interface
-        if interface not in self._nodes:
-            with self._lock:
-                if interface not in self._nodes:
-                    self._nodes[interface] = await self._loop.run_in_executor(
-                        None, self._get_nodes, self.PROVIDER_PATH.format(interface)
-                    )
-                    print(f"{interface} has {len(self._nodes[interface])} nodes")
-        if reference_config.id not in self._instances:
-            with self._lock:
-                if reference_config.id not in self._instances:
-                    self._instances[reference_config.id] = self._get_instances(
-                        self._nodes[interface],
-                        reference_config.version,
-                        reference_config.group,
-                    )
-                    print(
-                        f"{reference_config.id} has {len(self._instances[reference_config.id])} instances"
-                    )
-        return self._instances.get(reference_config.id, [])
+    def close(self) -> None:
+        super().close()
+        if self._events is not None:
+            self._events.cancel()
+        self._client.stop()
+        self._client.close()
+
+    async def _fetch(self, interface: str) -> list[str]:
+        loop = asyncio.get_running_loop()
+        if self._events is None:
+            # Watch events and reconnects are processed on the loop that
+            # owns the subscriptions.
+            self._events = Debouncer(loop, self._debounce, self._refresh)
+        return await loop.run_in_executor(
+            None, self._get_children, self.PROVIDER_PATH.format(interface)
+        )
 
     def _state_listener(self, state: KazooState) -> None:
         if state == KazooState.CONNECTED:
-            threading.Thread(target=self._resubscribe).start()
+            if self._events is not None:
+                for interface in list(self._nodes.keys()):
+                    self._events.schedule_threadsafe(interface)
         else:
             self._client.logger.debug("zookeeper connection state: %s", state)
 
-    def _resubscribe(self) -> None:
-        for interface in self._nodes.keys():
-            self._nodes[interface] = self._get_nodes(
-                self.PROVIDER_PATH.format(interface)
-            )
-        for reference in self._instances.keys():
-            interface, version, group = reference.split(":")
-            self._instances[reference] = self._get_instances(
-                self._nodes[interface], version, group
+    def _node_watcher(self, event: WatchedEvent) -> None:
+        if self._events is not None:
+            self._events.schedule_threadsafe(
+                urllib.parse.unquote(event.path.split("/")[2])
             )
 
-    async def _node_watcher(self, event: WatchedEvent) -> None:
-        interface = event.path.split("/")[2]
-        self._nodes[interface] = await self._loop.run_in_executor(
-            None, self._get_nodes, event.path
-        )
-        for reference in self._instances.keys():
-            if reference.startswith(interface):
-                interface, version, group = reference.split(":")
-                self._instances[reference] = self._get_instances(
-                    self._nodes[interface], version, group
-                )
-
-    def _get_nodes(self, path: str) -> list[Node]:
-        children = (
+    def _refresh(self, interfaces: set[str]) -> None:
+        for interface in interfaces:
+            if interface in self._refreshing:
+                # Picked up again once the running fetch completes.
+                self._events.schedule(interface)  # type: ignore[union-attr]
+                continue
+            self._refreshing.add(interface)
+            task = asyncio.ensure_future(self._reload(interface))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _reload(self, interface: str) -> None:
+        try:
+            self._update(interface, await self._timed_fetch(interface))
+        except Exception as e:
+            self._client.logger.warning("failed to refresh %s: %s", interface, e)
+        finally:
+            self._refreshing.discard(interface)
+
+    def _get_children(self, path: str) -> list[str]:
+        return (
             self._client.get_children(
                 urllib.parse.quote(path), watch=self._node_watcher
             )
             or []
         )
-        return [self._parse_node(child) for child in children]
-
-    def _get_instances(
-        self, nodes: list[Node], version: Optional[str], group: Optional[str]
-    ) -> list[str]:
-        matched = filter(
-            lambda node: self._filter_by_version_group(
-                node, version or "", group or ""
-            ),
-            nodes,
-        )
-        return list(set([node.netloc for node in matched]))
-
-    def _parse_node(self, path: str) -> Node:
-        url = urllib.parse.unquote(path)
-        parse_result = urllib.parse.urlparse(url)
-        query = dict(urllib.parse.parse_qsl(parse_result.query))
-        return Node(parse_result.scheme, parse_result.netloc, query)
-
-    def _filter_by_version_group(self, node: Node, version: str, group: str) -> bool:
-        if version != "*" and version != node.query.get("version", ""):
-            return False
-        if group != "*":
-            node_group = node.query.get("group", "")
-            if not group:
-                return not node_group
-            else:
-                groups = group.split(",")
-                return node_group in groups
-        return True
 
 
 class NacosRegistry(Registry):
@@ -181,19 +612,152 @@ class NacosRegistry(Registry):
         super().__init__(application_config, registry_config)
 
 
+class MemoryRegistry(Registry):
+    """Providers registered in process, for tests and local benchmarks."""
+
+    __slots__ = ("_providers",)
+
+    _providers: dict[str, set[str]]
+
+    def __init__(
+        self, application_config: ApplicationConfig, registry_config: CenterConfig
+    ) -> None:
+        super().__init__(application_config, registry_config)
+        self._providers = dict()
+
+    @property
+    def ready(self) -> bool:
+        return True
+
+    def register(self, url: str) -> None:
+        interface, child = self._child(url)
+        children = self._providers.setdefault(interface, set())
+        if child not in children:
+            children.add(child)
+            if interface in self._nodes:
+                self._update(interface, children)
+
+    def unregister(self, url: str) -> None:
+        interface, child = self._child(url)
+        children = self._providers.get(interface)
+        if children and child in children:
+            children.discard(child)
+            if interface in self._nodes:
+                self._update(interface, children)
+
+    async def churn(
+        self, urls: list[str], rate: float, duration: Optional[float] = None
+    ) -> int:
+        # Flips a random provider of ``urls`` between registered and not,
+        # ``rate`` times a second, until ``duration`` elapses or cancelled.
+        loop = asyncio.get_running_loop()
+        deadline = None if duration is None else loop.time() + duration
+        changes = 0
+        while deadline is None or loop.time() < deadline:
+            url = random.choice(urls)
+            interface, child = self._child(url)
+            if child in self._providers.get(interface, ()):
+                self.unregister(url)
+            else:
+                self.register(url)
+            changes += 1
+            await asyncio.sleep(1 / rate)
+        return changes
+
+    async def _fetch(self, interface: str) -> list[str]:
+        return list(self._providers.get(interface, ()))
+
+    def _child(self, url: str) -> tuple[str, str]:
+        interface = urllib.parse.urlparse(url).path.strip("/")
+        # Children are stored quoted, as ZooKeeper holds them.
+        return interface, urllib.parse.quote(url, safe="")
+
+
+class FileRegistry(MemoryRegistry):
+    """Provider URLs read from a file, one per line, reloaded on change."""
+
+    __slots__ = ("_path", "_mtime", "_watcher")
+
+    _path: str
+    _mtime: Optional[float]
+    _watcher: Optional[asyncio.TimerHandle]
+
+    POLL_INTERVAL: float = 1.0
+
+    def __init__(
+        self, application_config: ApplicationConfig, registry_config: CenterConfig
+    ) -> None:
+        super().__init__(application_config, registry_config)
+        self._path = self.hosts
+        self._mtime = None
+        self._watcher = None
+        self._reload()
+
+    def close(self) -> None:
+        super().close()
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+
+    async def _fetch(self, interface: str) -> list[str]:
+        if self._watcher is None:
+            self._watch()
+        return await super()._fetch(interface)
+
+    def _watch(self) -> None:
+        self._watcher = asyncio.get_running_loop().call_later(
+            self.POLL_INTERVAL, self._poll
+        )
+
+    def _poll(self) -> None:
+        self._watch()
+        self._reload()
+
+    def _reload(self) -> None:
+        try:
+            mtime = os.stat(self._path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        providers: dict[str, set[str]] = {}
+        if mtime is not None:
+            with open(self._path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        interface, child = self._child(line)
+                        providers.setdefault(interface, set()).add(child)
+        for interface in self._providers.keys() - providers.keys():
+            providers[interface] = set()
+        self._providers = providers
+        for interface, children in providers.items():
+            if interface in self._nodes:
+                self._update(interface, children)
+
+
 class RegistryFactory:
 
     __slots__ = ()
 
+    REGISTRIES: dict[str, type] = {
+        "zk": ZookeeperRegistry,
+        "nacos": NacosRegistry,
+        "memory": MemoryRegistry,
+        "file": FileRegistry,
+    }
+
     @staticmethod
     def get_registry(
         application_config: ApplicationConfig, registry_config: CenterConfig
     ) -> Registry:
-        assert registry_config.address is not None and (
-            "zk://" in registry_config.address or "nacos://" in registry_config.address
-        )
-        return (
-            ZookeeperRegistry(application_config, registry_config)
-            if "zk://" in registry_config.address
-            else NacosRegistry(application_config, registry_config)
-        )
+        assert registry_config.address is not None and "://" in registry_config.address
+        if registry_config.shared:
+            # Imported here, the shared registry builds on this module.
+            from dubbo.discovery import SharedRegistry
+
+            return SharedRegistry(application_config, registry_config)
+        scheme = registry_config.address.split("://", 1)[0]
+        assert scheme in RegistryFactory.REGISTRIES, f"unknown registry {scheme}"
+        return RegistryFactory.REGISTRIES[scheme](application_config, registry_config)
@@ -0,0 +1,55 @@
+"""Registry snapshot files."""
+import json
+import os
+import time
+
+__all__ = ("Snapshot",)
+
+
+class Snapshot:
+    """Raw provider children per interface, persisted as versioned JSON."""
+
+    __slots__ = ("_path",)
+
+    _path: str
+
+    VERSION: int = 1
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def load(self) -> dict[str, list[str]]:
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return {}
+        interfaces = data.get("interfaces")
+        return interfaces if isinstance(interfaces, dict) else {}
+
+    def dump(self, interfaces: dict[str, list[str]]) -> None:
+        # Written aside and renamed over the old file, so readers and a
+        # crash mid-write never see a partial snapshot.
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{self._path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": self.VERSION,
+                    "created": int(time.time() * 1000),
+                    "interfaces": interfaces,
+                },
+                f,
+                separators=(",", ":"),
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self._path)
@@ -0,0 +1,133 @@
+"""Blocking facade for callers that cannot await."""
+import asyncio
+import concurrent.futures
+import os
+import threading
+from typing import Any, Callable, Coroutine, Optional, Sequence
+
+from dubbo.abc.meta import SingletonMeta
+from dubbo.context import deadline, remaining
+from dubbo.exceptions import RpcTimeoutError
+from dubbo.proxy import Proxy
+
+__all__ = ("LoopThread", "SyncProxy")
+
+
+class LoopThread(metaclass=SingletonMeta):
+    """The event loop of the process, run on a daemon thread of its own.
+
+    Every transport, pool and registry used through the blocking facade
+    lives on this one loop, so calls from any number of threads share
+    connections and are multiplexed on them. A forked child starts a loop
+    of its own on first use.
+    """
+
+    __slots__ = ("_loop", "_thread", "_pid", "_starting")
+
+    _loop: Optional[asyncio.AbstractEventLoop]
+    _thread: Optional[threading.Thread]
+    _pid: int
+    _starting: threading.Lock
+
+    def __init__(self) -> None:
+        self._loop = None
+        self._thread = None
+        self._pid = 0
+        self._starting = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._pid != os.getpid():
+            with self._starting:
+                if self._pid != os.getpid():
+                    self._start()
+        return self._loop  # type: ignore[return-value]
+
+    def submit(
+        self, coroutine: Coroutine[Any, Any, Any]
+    ) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def call(
+        self, coroutine: Coroutine[Any, Any, Any], timeout: Optional[float] = None
+    ) -> Any:
+        # Blocks the calling thread until the coroutine is done on the loop.
+        if threading.current_thread() is self._thread:
+            coroutine.close()
+            raise RuntimeError("blocking call from the event loop thread")
+        future = self.submit(coroutine)
+        if timeout is not None:
+            # Not future.result(timeout), which cannot tell its own timeout
+            # from an RpcTimeoutError raised by the call.
+            done, _ = concurrent.futures.wait((future,), timeout)
+            if not done:
+                future.cancel()
+                raise RpcTimeoutError(f"no result within {timeout:.3f}s")
+        return future.result()
+
+    def run(self, function: Callable[..., Any], *args: Any) -> Any:
+        # Runs a plain function on the loop thread, such as a close().
+        async def apply() -> Any:
+            return function(*args)
+
+        return self.call(apply())
+
+    def stop(self) -> None:
+        with self._starting:
+            loop, thread = self._loop, self._thread
+            if loop is None or thread is None or self._pid != os.getpid():
+                return
+            self._loop = self._thread = None
+            self._pid = 0
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    def _start(self) -> None:
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(
+            target=self._run, args=(loop,), name="dubbo-loop", daemon=True
+        )
+        thread.start()
+        self._loop, self._thread, self._pid = loop, thread, os.getpid()
+
+    @staticmethod
+    def _run(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+
+async def _within(coroutine: Coroutine[Any, Any, Any], timeout: float) -> Any:
+    with deadline(timeout):
+        return await coroutine
+
+
+class SyncProxy:
+    """Blocking calls to a proxy, from any thread but the loop's own."""
+
+    __slots__ = ("_proxy", "_loop_thread")
+
+    _proxy: Proxy
+    _loop_thread: LoopThread
+
+    def __init__(self, proxy: Proxy, loop_thread: Optional[LoopThread] = None) -> None:
+        self._proxy = proxy
+        self._loop_thread = LoopThread() if loop_thread is None else loop_thread
+
+    @property
+    def proxy(self) -> Proxy:
+        return self._proxy
+
+    def invoke(
+        self,
+        method: str,
+        args: Sequence[Any] = (),
+        parameter_types: Optional[Sequence[str]] = None,
+        attachments: Optional[dict[str, Any]] = None,
+    ) -> Any:
+        coroutine = self._proxy.invoke(method, args, parameter_types, attachments)
+        # The calling thread's deadline holds on the loop thread too.
+        left = remaining()
+        if left is not None:
+            coroutine = _within(coroutine, left)
+        return self._loop_thread.call(coroutine)
@@ -0,0 +1,424 @@
+"""Dubbo transport classes."""
+import asyncio
+import itertools
+import math
+import struct
+from typing import Iterator, NamedTuple, Optional
+import weakref
+
+from dubbo.codec import STATUS_OK, DubboCodec
+from dubbo.common.config import ProtocolConfig
+from dubbo.exceptions import ConnectionLostError, ProtocolError, RpcTimeoutError
+
+__all__ = (
+    "DubboProtocol",
+    "Frame",
+    "FrameDecoder",
+    "Response",
+    "TimerWheel",
+    "connect",
+    "timer_wheel",
+)
+
+MAGIC = 0xDABB
+HEADER = struct.Struct(">HBBqI")
+HEADER_LENGTH = HEADER.size
+
+FLAG_REQUEST = 0x80
+FLAG_TWOWAY = 0x40
+FLAG_EVENT = 0x20
+SERIALIZATION_MASK = 0x1F
+
+HESSIAN2 = 2
+
+# Hessian2 encoded null, the body of heartbeat events.
+NULL_BODY = b"N"
+
+
+class Frame(NamedTuple):
+    flag: int
+    status: int
+    request_id: int
+    body: memoryview
+
+
+class FrameDecoder:
+    """Incremental decoder handing out frame bodies as views of the input.
+
+    Partial reads accumulate in one growing ``bytearray``. Once frames are
+    sliced out of it the buffer is left to the views and only the trailing
+    partial frame is carried over, so bodies are never copied. A header
+    announcing a body over ``max_payload`` bytes is rejected rather than
+    buffered for.
+    """
+
+    __slots__ = ("_buffer", "_max_payload")
+
+    _buffer: bytearray
+    _max_payload: int
+
+    def __init__(self, max_payload: int = 8 * 1024 * 1024) -> None:
+        self._buffer = bytearray()
+        self._max_payload = max_payload
+
+    @property
+    def buffered(self) -> int:
+        return len(self._buffer)
+
+    def feed(self, data: bytes) -> list[Frame]:
+        if self._buffer:
+            self._buffer += data
+            data = self._buffer
+        view = memoryview(data)
+        size = len(view)
+        offset = 0
+        frames = []
+        while size - offset >= HEADER_LENGTH:
+            magic, flag, status, request_id, length = HEADER.unpack_from(view, offset)
+            if magic != MAGIC:
+                view.release()
+                raise ProtocolError(f"bad magic number {magic:#x}")
+            if length > self._max_payload:
+                view.release()
+                raise ProtocolError(
+                    f"payload of {length} bytes over the {self._max_payload} limit"
+                )
+            end = offset + HEADER_LENGTH + length
+            if end > size:
+                break
+            frames.append(
+                Frame(flag, status, request_id, view[offset + HEADER_LENGTH : end])
+            )
+            offset = end
+        if not frames:
+            view.release()
+            if data is not self._buffer:
+                self._buffer = bytearray(data)
+        elif offset < size:
+            self._buffer = bytearray(view[offset:])
+        else:
+            self._buffer = bytearray()
+        return frames
+
+
+class TimerWheel:
+    """Hashed timer wheel expiring request futures in batches.
+
+    Scheduling is O(1) and the loop holds a single timer, re-armed every
+    tick while anything is scheduled, rather than one handle per request.
+    The wheel only holds weak references to the futures, so that a future
+    completed in time, and the response it carries, are freed once the
+    caller is done with them rather than when their slot comes round.
+    """
+
+    __slots__ = ("_loop", "_tick", "_wheel", "_current", "_size", "_handle")
+
+    _loop: asyncio.AbstractEventLoop
+    _tick: float
+    _wheel: list[list[tuple[int, "weakref.ref[asyncio.Future]", float]]]
+    _current: int
+    _size: int
+    _handle: Optional[asyncio.TimerHandle]
+
+    def __init__(
+        self, loop: asyncio.AbstractEventLoop, tick: float = 0.01, slots: int = 512
+    ) -> None:
+        self._loop = loop
+        self._tick = tick
+        self._wheel = [[] for _ in range(slots)]
+        self._current = 0
+        self._size = 0
+        self._handle = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, future: asyncio.Future, timeout: float) -> None:
+        if self._handle is None:
+            self._current = int(self._loop.time() / self._tick)
+            self._schedule()
+        # One tick more than the timeout, so that none expires early.
+        expires = self._current + math.ceil(timeout / self._tick) + 1
+        self._wheel[expires % len(self._wheel)].append(
+            (expires, weakref.ref(future), timeout)
+        )
+        self._size += 1
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        for bucket in self._wheel:
+            bucket.clear()
+        self._size = 0
+
+    def _schedule(self) -> None:
+        self._handle = self._loop.call_at(
+            (self._current + 1) * self._tick, self._advance
+        )
+
+    def _advance(self) -> None:
+        now = max(int(self._loop.time() / self._tick), self._current + 1)
+        wheel = self._wheel
+        while self._current < now and self._size:
+            self._current += 1
+            index = self._current % len(wheel)
+            bucket = wheel[index]
+            if not bucket:
+                continue
+            remaining = []
+            for entry in bucket:
+                expires, reference, timeout = entry
+                if expires > self._current:
+                    remaining.append(entry)
+                    continue
+                self._size -= 1
+                future = reference()
+                if future is not None and not future.done():
+                    future.set_exception(
+                        RpcTimeoutError(f"no response within {timeout:.3f}s")
+                    )
+            wheel[index] = remaining
+        if self._size:
+            self._schedule()
+        else:
+            self._handle = None
+
+
+_wheels: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, TimerWheel]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def timer_wheel(loop: asyncio.AbstractEventLoop) -> TimerWheel:
+    # Shared by every connection of a loop.
+    wheel = _wheels.get(loop)
+    if wheel is None:
+        wheel = _wheels[loop] = TimerWheel(loop)
+    return wheel
+
+
+class Response(NamedTuple):
+    status: int
+    flag: int
+    body: memoryview
+
+    @property
+    def ok(self) -> bool:
+        return self.status == STATUS_OK
+
+    @property
+    def event(self) -> bool:
+        return bool(self.flag & FLAG_EVENT)
+
+
+class DubboProtocol(asyncio.Protocol):
+
+    _loop: asyncio.AbstractEventLoop
+    _transport: Optional[asyncio.Transport]
+    _pending: dict[int, asyncio.Future]
+    _ids: Iterator[int]
+    _decoder: FrameDecoder
+    _exception: Optional[Exception]
+    _timer: TimerWheel
+    _config: ProtocolConfig
+    # Frames queued since the last flush, written out together.
+    _outbox: list[bytes]
+    _outbox_size: int
+    _flush_handle: Optional[asyncio.Handle]
+    _drain_waiter: Optional[asyncio.Future]
+    _paused: bool
+
+    codec: DubboCodec
+    # Loop times of the latest traffic, which heartbeats are timed from.
+    last_read: float
+    last_write: float
+
+    def __init__(
+        self,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        protocol_config: Optional[ProtocolConfig] = None,
+    ) -> None:
+        self._loop = loop or asyncio.get_running_loop()
+        self._transport = None
+        self._pending = dict()
+        self._ids = itertools.count(1)
+        self._config = protocol_config or ProtocolConfig()
+        self._decoder = FrameDecoder(self._config.payload)
+        self._exception = None
+        self._timer = timer_wheel(self._loop)
+        self._outbox = []
+        self._outbox_size = 0
+        self._flush_handle = None
+        self._drain_waiter = None
+        self._paused = False
+        self.codec = DubboCodec()
+        self.last_read = self.last_write = self._loop.time()
+
+    @property
+    def connected(self) -> bool:
+        return self._transport is not None and not self._transport.is_closing()
+
+    @property
+    def inflight(self) -> int:
+        return len(self._pending)
+
+    @property
+    def writable(self) -> bool:
+        return not self._paused
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self._transport = transport  # type: ignore[assignment]
+        self._transport.set_write_buffer_limits(  # type: ignore[union-attr]
+            self._config.high_water, self._config.low_water
+        )
+        self.last_read = self.last_write = self._loop.time()
+
+    def pause_writing(self) -> None:
+        self._paused = True
+
+    def resume_writing(self) -> None:
+        self._paused = False
+        self._wake_drain(None)
+
+    def data_received(self, data: bytes) -> None:
+        self.last_read = self._loop.time()
+        try:
+            frames = self._decoder.feed(data)
+        except ProtocolError as e:
+            self._abort(e)
+            return
+        for frame in frames:
+            self._frame_received(*frame)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self._transport = None
+        error = self._exception or ConnectionLostError(str(exc or "connection closed"))
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._outbox.clear()
+        self._outbox_size = 0
+        self._wake_drain(error)
+        pending, self._pending = self._pending, dict()
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def request(
+        self,
+        body: bytes,
+        serialization: int = HESSIAN2,
+        two_way: bool = True,
+        timeout: Optional[float] = None,
+    ) -> asyncio.Future:
+        future = self._loop.create_future()
+        if not self.connected:
+            future.set_exception(ConnectionLostError("connection closed"))
+            return future
+        request_id = next(self._ids)
+        flag = FLAG_REQUEST | serialization
+        if two_way:
+            flag |= FLAG_TWOWAY
+            self._pending[request_id] = future
+            future.add_done_callback(lambda _: self._pending.pop(request_id, None))
+            if timeout is not None:
+                self._timer.add(future, timeout)
+        else:
+            future.set_result(None)
+        self._write(flag, 0, request_id, body)
+        return future
+
+    def heartbeat(self, timeout: Optional[float] = None) -> asyncio.Future:
+        future = self._loop.create_future()
+        if not self.connected:
+            future.set_exception(ConnectionLostError("connection closed"))
+            return future
+        request_id = next(self._ids)
+        self._pending[request_id] = future
+        future.add_done_callback(lambda _: self._pending.pop(request_id, None))
+        if timeout is not None:
+            self._timer.add(future, timeout)
+        flag = FLAG_REQUEST | FLAG_TWOWAY | FLAG_EVENT | HESSIAN2
+        self._write(flag, 0, request_id, NULL_BODY)
+        return future
+
+    async def drain(self) -> None:
+        # Waits while the connection's write buffer is above its high water
+        # mark; callers hold back new requests until it is back below low.
+        if self._paused:
+            if self._drain_waiter is None:
+                self._drain_waiter = self._loop.create_future()
+            await asyncio.shield(self._drain_waiter)
+
+    def close(self) -> None:
+        if self._transport is not None:
+            self._flush()
+            self._transport.close()
+
+    def _write(self, flag: int, status: int, request_id: int, body: bytes) -> None:
+        self._outbox.append(HEADER.pack(MAGIC, flag, status, request_id, len(body)))
+        self._outbox.append(body)
+        self._outbox_size += HEADER_LENGTH + len(body)
+        if self._outbox_size >= self._config.flush_bytes:
+            self._flush()
+        elif self._flush_handle is None:
+            delay = self._config.flush_delay
+            self._flush_handle = (
+                self._loop.call_later(delay, self._flush)
+                if delay > 0
+                else self._loop.call_soon(self._flush)
+            )
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._outbox and self._transport is not None:
+            self._transport.writelines(self._outbox)
+            self.last_write = self._loop.time()
+        self._outbox = []
+        self._outbox_size = 0
+
+    def _wake_drain(self, exc: Optional[Exception]) -> None:
+        waiter, self._drain_waiter = self._drain_waiter, None
+        if waiter is not None and not waiter.done():
+            if exc is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(exc)
+
+    def _frame_received(
+        self, flag: int, status: int, request_id: int, body: memoryview
+    ) -> None:
+        if flag & FLAG_REQUEST:
+            # Providers probe idle consumers with heartbeat events.
+            if flag & FLAG_EVENT and flag & FLAG_TWOWAY:
+                self._write(
+                    FLAG_EVENT | (flag & SERIALIZATION_MASK),
+                    STATUS_OK,
+                    request_id,
+                    NULL_BODY,
+                )
+            return
+        future = self._pending.pop(request_id, None)
+        if future is not None and not future.done():
+            future.set_result(Response(status, flag, body))
+
+    def _abort(self, exc: Exception) -> None:
+        self._exception = exc
+        if self._transport is not None:
+            self._transport.abort()
+
+
+async def connect(
+    host: str,
+    port: int,
+    loop: Optional[asyncio.AbstractEventLoop] = None,
+    protocol_config: Optional[ProtocolConfig] = None,
+) -> DubboProtocol:
+    loop = loop or asyncio.get_running_loop()
+    _, protocol = await loop.create_connection(
+        lambda: DubboProtocol(loop, protocol_config), host, port
+    )
+    return protocol
@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+
+from dubbo.abc.meta import SingletonMeta
+from dubbo.codec import RESPONSE_NULL_VALUE
+from dubbo.config import ApplicationConfig, Bootstrap, ProtocolConfig, ReferenceConfig
+from dubbo.hessian2 import Encoder
+from dubbo.transport import HEADER, MAGIC, STATUS_OK
+from tests.test_transport import EchoProviderProtocol
+
+
+class NullProviderProtocol(EchoProviderProtocol):
+
+    def _reply(self, flag, request_id, body):
+        body = Encoder().encode(RESPONSE_NULL_VALUE)
+        self.transport.write(HEADER.pack(MAGIC, flag, STATUS_OK, request_id, len(body)) + body)
+
+
+class TestBootstrap(unittest.TestCase):
+
+    def setUp(self):
+        SingletonMeta._instances.pop(Bootstrap, None)
+
+    def tearDown(self):
+        SingletonMeta._instances.pop(Bootstrap, None)
+
+    def test_warmup(self):
+        asyncio.run(self._test_warmup())
+
+    async def _test_warmup(self):
+        loop = asyncio.get_running_loop()
+        servers = [await loop.create_server(NullProviderProtocol, '127.0.0.1', 0) for _ in range(4)]
+        bootstrap = Bootstrap().application(ApplicationConfig('test')).protocol(ProtocolConfig()).registry('memory://')
+        for name in ('DemoService', 'OtherService'):
+            bootstrap.reference(ReferenceConfig(f'com.example.{name}', '1.0'), name)
+        bootstrap.start()
+        registry = next(iter(bootstrap._registry_center.values()))
+        for server in servers:
+            port = server.sockets[0].getsockname()[1]
+            registry.register(f'dubbo://127.0.0.1:{port}/com.example.DemoService?version=1.0')
+
+        timings = await bootstrap.warmup(connect_ratio=0.5, echo=True)
+        self.assertEqual(['registries', 'subscribe', 'connect', 'echo'], list(timings))
+        self.assertEqual(4, len(await bootstrap.proxy('DemoService').instances()))
+        # Half of the providers are connected, the echo may add one more.
+        self.assertIn(len(bootstrap.connection_pool), (2, 3))
+        self.assertEqual(0, len(await bootstrap.proxy('OtherService').instances()))
+
+        bootstrap.stop()
+        for server in servers:
+            server.close()
+
+    def test_warmup_deadline(self):
+        asyncio.run(self._test_warmup_deadline())
+
+    async def _test_warmup_deadline(self):
+        bootstrap = Bootstrap().application(ApplicationConfig('test')).protocol(ProtocolConfig()).registry('memory://')
+        bootstrap.reference(ReferenceConfig('com.example.DemoService', '1.0'), 'DemoService')
+        bootstrap.start()
+        registry = next(iter(bootstrap._registry_center.values()))
+        # A provider that never accepts within the deadline.
+        registry.register('dubbo://10.255.255.1:20880/com.example.DemoService?version=1.0')
+        started = asyncio.get_running_loop().time()
+        timings = await bootstrap.warmup(timeout=0.2)
+        loop_time = asyncio.get_running_loop().time()
+        self.assertLess(loop_time - started, 1.0)
+        self.assertIn('connect', timings)
+        bootstrap.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from dubbo.cache import MISSING, ResultCache
+from dubbo.codec import RESPONSE_NULL_VALUE
+from dubbo.common.config import MethodConfig, ProtocolConfig, ReferenceConfig
+from dubbo.exceptions import RpcTimeoutError
+from dubbo.hessian2 import Encoder, JavaObject
+from tests.test_proxy import SlowProviderProtocol, start_proxy
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('dubbo.cache.time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_keys(self):
+        cache = ResultCache()
+        types = ('java.util.Map',)
+        self.assertEqual(cache.key(types, ({'a': [1, 2]},)), cache.key(types, ({'a': [1, 2]},)))
+        self.assertNotEqual(cache.key(types, ({'a': [1, 2]},)), cache.key(types, ({'a': [1, 3]},)))
+        user = JavaObject('com.example.User', id=1)
+        self.assertEqual(cache.key(('com.example.User',), (user,)), cache.key(('com.example.User',), (user,)))
+
+    def test_lru_ttl(self):
+        cache = ResultCache(ttl=10.0, max_entries=2)
+        keys = [cache.key((), (i,)) for i in range(3)]
+        cache.put(keys[0], 'a', 2)
+        cache.put(keys[1], 'b', 2)
+        self.assertEqual('a', cache.get(keys[0]))
+        # The least recently used goes first.
+        cache.put(keys[2], 'c', 2)
+        self.assertIs(MISSING, cache.get(keys[1]))
+        self.assertEqual(2, len(cache))
+        self.now += 10.0
+        self.assertIs(MISSING, cache.get(keys[0]))
+        self.assertEqual(1, len(cache))
+
+    def test_bytes(self):
+        cache = ResultCache(max_bytes=100)
+        cache.put(cache.key((), (1,)), 'x' * 60, 62)
+        cache.put(cache.key((), (2,)), 'x' * 60, 62)
+        self.assertEqual(1, len(cache))
+        self.assertLessEqual(cache.bytes, 100)
+        cache.put(cache.key((), (3,)), 'x' * 200, 203)
+        self.assertIs(MISSING, cache.get(cache.key((), (3,))))
+        cache.clear()
+        self.assertEqual(0, cache.bytes)
+
+
+class TestProxyCache(unittest.TestCase):
+
+    def setUp(self):
+        SlowProviderProtocol.requests = []
+
+    def test_cached_calls(self):
+        asyncio.run(self._test_cached_calls())
+
+    async def _test_cached_calls(self):
+        reference_config = ReferenceConfig(
+            'com.example.DictionaryService', '1.0', protocols=(ProtocolConfig(),), timeout=0.5,
+            methods=(MethodConfig('lookup', cache='lru'),),
+        )
+        server, proxy = await start_proxy(reference_config, delay=0.02)
+        # Concurrent identical calls share one request.
+        results = await asyncio.gather(*[proxy.lookup('key') for _ in range(10)])
+        self.assertEqual([None] * 10, results)
+        self.assertEqual(1, len(SlowProviderProtocol.requests))
+        self.assertIsNone(await proxy.lookup('key'))
+        await proxy.lookup('other')
+        self.assertEqual(2, len(SlowProviderProtocol.requests))
+        # Entries weigh their keys and the responses as received.
+        cache = proxy._caches['lookup']
+        keys = sum(len(cache.key(('java.lang.String',), (arg,))[1]) for arg in ('key', 'other'))
+        self.assertEqual(keys + 2 * len(Encoder().encode(RESPONSE_NULL_VALUE)), cache.bytes)
+        # Methods without a cache are always called.
+        await proxy.invoke('update', ('key',))
+        await proxy.invoke('update', ('key',))
+        self.assertEqual(4, len(SlowProviderProtocol.requests))
+        metrics = proxy._metrics.method('lookup')
+        self.assertEqual((1, 11, 2), (metrics.cache_hits, metrics.cache_misses, metrics.calls))
+        proxy._pool.close()
+        server.close()
+
+    def test_failures(self):
+        asyncio.run(self._test_failures())
+
+    async def _test_failures(self):
+        reference_config = ReferenceConfig(
+            'com.example.DictionaryService', '1.0', protocols=(ProtocolConfig(),), timeout=0.01,
+            methods=(MethodConfig('lookup', cache='lru'),),
+        )
+        server, proxy = await start_proxy(reference_config, delay=0.05)
+        results = await asyncio.gather(*[proxy.lookup('key') for _ in range(3)], return_exceptions=True)
+        self.assertTrue(all(isinstance(result, RpcTimeoutError) for result in results))
+        # Failures are not cached.
+        with self.assertRaises(RpcTimeoutError):
+            await proxy.lookup('key')
+        self.assertEqual(2, len(SlowProviderProtocol.requests))
+        proxy._pool.close()
+        server.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+from dubbo.codec import (
+    RESPONSE_NULL_VALUE,
+    RESPONSE_VALUE,
+    RESPONSE_VALUE_WITH_ATTACHMENTS,
+    RESPONSE_WITH_EXCEPTION,
+    DubboCodec,
+    Invocation,
+    descriptor,
+    java_types,
+)
+from dubbo.common.config import ReferenceConfig
+from dubbo.exceptions import ProtocolError, RemotingError, ServiceError
+from dubbo.hessian2 import Decoder, Encoder, JavaObject
+
+
+class TestCodec(unittest.TestCase):
+
+    def test_descriptor(self):
+        self.assertEqual('', descriptor(()))
+        self.assertEqual('Ljava/lang/String;IJ', descriptor(('java.lang.String', 'int', 'long')))
+        self.assertEqual('[I[[Ljava/lang/String;', descriptor(('int[]', 'java.lang.String[][]')))
+        self.assertEqual('[Ljava/lang/String;', descriptor(('[Ljava.lang.String;',)))
+
+    def test_java_types(self):
+        self.assertEqual(
+            ('java.lang.String', 'int', 'long', 'boolean', 'java.util.Map', 'example.User'),
+            java_types(('a', 1, 2 ** 40, True, {}, JavaObject('example.User'))),
+        )
+
+    def test_encode_request(self):
+        reference_config = ReferenceConfig('example.UserService', '1.0', 'g1')
+        invocation = Invocation(reference_config, 'getUser', ('long', 'java.lang.String'))
+        body = DubboCodec().encode_request(invocation, (42, 'name'), {'timeout': '100'})
+        decoder = Decoder()
+        decoder.reset(body)
+        self.assertEqual(
+            ['2.0.2', 'example.UserService', '1.0', 'getUser', 'JLjava/lang/String;', 42, 'name'],
+            [decoder.read() for _ in range(7)],
+        )
+        self.assertEqual(
+            {
+                'path': 'example.UserService',
+                'interface': 'example.UserService',
+                'version': '1.0',
+                'group': 'g1',
+                'timeout': '100',
+            },
+            decoder.read(),
+        )
+        self.assertEqual(len(body), decoder.position)
+
+    def test_decode_response(self):
+        codec = DubboCodec()
+        encoder = Encoder()
+        self.assertEqual('hi', codec.decode_response(20, encoder.encode(RESPONSE_VALUE, 'hi')))
+        self.assertEqual(
+            [1], codec.decode_response(20, encoder.encode(RESPONSE_VALUE_WITH_ATTACHMENTS, [1], {}))
+        )
+        self.assertIsNone(codec.decode_response(20, encoder.encode(RESPONSE_NULL_VALUE)))
+        exception = JavaObject('java.lang.IllegalStateException', detailMessage='boom')
+        with self.assertRaises(ServiceError) as context:
+            codec.decode_response(20, encoder.encode(RESPONSE_WITH_EXCEPTION, exception))
+        self.assertEqual('java.lang.IllegalStateException: boom', str(context.exception))
+        with self.assertRaises(RemotingError) as context:
+            codec.decode_response(60, encoder.encode('service not found: x'))
+        self.assertEqual(60, context.exception.status)
+
+    def test_truncated_response(self):
+        codec = DubboCodec()
+        encoder = Encoder()
+        # Cut short inside a double, a truncated error body keeps the status.
+        with self.assertRaises(RemotingError) as context:
+            codec.decode_response(60, encoder.encode(1.5)[:3])
+        self.assertEqual(60, context.exception.status)
+        body = encoder.encode(RESPONSE_VALUE, 1.5)
+        for end in range(len(body)):
+            with self.assertRaises(ProtocolError):
+                codec.decode_response(20, body[:end])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import asyncio
+import os
+import tempfile
+import urllib.parse
+import unittest
+from unittest import mock
+
+from dubbo.config import ApplicationConfig, CenterConfig, ReferenceConfig
+from dubbo.discovery import SharedRegistry
+from dubbo.exceptions import RegistryError
+from dubbo.registry import MemoryRegistry, RegistryFactory
+
+
+def url(netloc: str) -> str:
+    return f'dubbo://{netloc}/com.example.DemoService?{urllib.parse.urlencode({"version": "1.0"})}'
+
+
+class TestSharedRegistry(unittest.TestCase):
+
+    def test_shared(self):
+        asyncio.run(self._test_shared())
+
+    async def _test_shared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            registry_config = CenterConfig('memory://', shared=os.path.join(directory, 'registry.sock'))
+            reference_config = ReferenceConfig('com.example.DemoService', '1.0')
+            workers = [RegistryFactory.get_registry(ApplicationConfig('test'), registry_config) for _ in range(3)]
+            self.assertIsInstance(workers[0], SharedRegistry)
+            self.assertEqual([], await workers[0].children(reference_config))
+            owner = workers[0]
+            self.assertTrue(owner.owner)
+            self.assertIsInstance(owner.upstream, MemoryRegistry)
+            owner.upstream.register(url('a:1'))
+            results = await asyncio.gather(*[worker.children(reference_config) for worker in workers])
+            self.assertEqual([['a:1']] * 3, results)
+            self.assertFalse(any(worker.owner for worker in workers[1:]))
+
+            # Updates are pushed to every worker.
+            owner.upstream.register(url('b:1'))
+            await asyncio.sleep(0.05)
+            for worker in workers:
+                self.assertEqual(['a:1', 'b:1'], sorted(await worker.children(reference_config)))
+            self.assertEqual(2, workers[1]._versions['com.example.DemoService'][1])
+
+            # A surviving worker takes over once the owner goes away.
+            with mock.patch.object(SharedRegistry, 'RETRY_INTERVAL', 0.01):
+                owner.close()
+                await asyncio.sleep(0.2)
+            self.assertEqual(1, sum(worker.owner for worker in workers[1:]))
+            successor = next(worker for worker in workers[1:] if worker.owner)
+            successor.upstream.register(url('c:1'))
+            await asyncio.sleep(0.05)
+            for worker in workers[1:]:
+                self.assertEqual(['c:1'], await worker.children(reference_config))
+                worker.close()
+
+    def test_upstream_error(self):
+        asyncio.run(self._test_upstream_error())
+
+    async def _test_upstream_error(self):
+        fetch = MemoryRegistry._fetch
+
+        async def failing(registry, interface):
+            if interface == 'com.example.MissingService':
+                raise LookupError('no node')
+            return await fetch(registry, interface)
+
+        with tempfile.TemporaryDirectory() as directory, mock.patch.object(MemoryRegistry, '_fetch', failing):
+            registry_config = CenterConfig('memory://', shared=os.path.join(directory, 'registry.sock'))
+            owner, worker = [RegistryFactory.get_registry(ApplicationConfig('test'), registry_config) for _ in range(2)]
+            reference_config = ReferenceConfig('com.example.DemoService', '1.0')
+            self.assertEqual([], await owner.children(reference_config))
+            self.assertTrue(owner.owner)
+            owner.upstream.register(url('a:1'))
+            # Fails the worker's call, as it would the owner's.
+            with self.assertRaises(RegistryError):
+                await asyncio.wait_for(worker.children(ReferenceConfig('com.example.MissingService', '1.0')), 1)
+            writer = worker._writer
+            self.assertIsNotNone(writer)
+            # The connection stays up for the other interfaces.
+            self.assertEqual(['a:1'], await worker.children(reference_config))
+            self.assertIs(writer, worker._writer)
+            self.assertFalse(worker.owner)
+            worker.close()
+            owner.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from dubbo.hedge import HedgeBudget, LatencyTracker
+
+
+class TestLatencyTracker(unittest.TestCase):
+
+    def test_percentile(self):
+        tracker = LatencyTracker(0.9, size=16, min_samples=10)
+        for latency in range(9):
+            tracker.record(latency / 100)
+        self.assertIsNone(tracker.value)
+        tracker.record(0.09)
+        self.assertEqual(0.09, tracker.value)
+        # Only the latest calls count, and only every size // 8 calls.
+        for _ in range(15):
+            tracker.record(0.5)
+        self.assertEqual(16, len(tracker))
+        self.assertEqual(0.5, tracker.value)
+
+
+class TestHedgeBudget(unittest.TestCase):
+
+    def test_budget(self):
+        budget = HedgeBudget(0.25, max_tokens=2.0)
+        self.assertFalse(budget.withdraw())
+        for _ in range(4):
+            budget.deposit()
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        for _ in range(100):
+            budget.deposit()
+        self.assertEqual(2.0, budget.tokens)
+
+
+if __name__ == '__main__':
+    unittest.main()
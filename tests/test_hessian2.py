@@ -0,0 +1,116 @@
+from datetime import datetime
+from decimal import Decimal
+import unittest
+
+from dubbo.hessian2 import Decoder, Encoder, JavaObject
+
+
+class TestHessian2(unittest.TestCase):
+
+    def setUp(self):
+        self.encoder = Encoder()
+        self.decoder = Decoder()
+
+    def assertEncoded(self, expected, value):
+        data = self.encoder.encode(value)
+        self.assertEqual(expected, data)
+        self.assertEqual(value, self.decoder.decode(data))
+
+    def test_spec_examples(self):
+        self.assertEncoded(b'N', None)
+        self.assertEncoded(b'T', True)
+        self.assertEncoded(b'F', False)
+        self.assertEncoded(b'\x90', 0)
+        self.assertEncoded(b'\x80', -16)
+        self.assertEncoded(b'\xbf', 47)
+        self.assertEncoded(b'\xc0\x00', -2048)
+        self.assertEncoded(b'\xcf\xff', 2047)
+        self.assertEncoded(b'\xd0\x00\x00', -262144)
+        self.assertEncoded(b'\xd7\xff\xff', 262143)
+        self.assertEncoded(b'I\x00\x04\x00\x00', 262144)
+        self.assertEncoded(b'L\x00\x00\x00\x01\x00\x00\x00\x00', 2 ** 32)
+        self.assertEncoded(b'\x5b', 0.0)
+        self.assertEncoded(b'\x5c', 1.0)
+        self.assertEncoded(b'\x5d\x80', -128.0)
+        self.assertEncoded(b'\x5e\x80\x00', -32768.0)
+        self.assertEncoded(b'\x5f\x00\x00\x30\x39', 12.345)
+        self.assertEncoded(b'D\x40\x09\x21\xfb\x54\x44\x2d\x18', 3.141592653589793)
+        self.assertEncoded(b'\x00', '')
+        self.assertEncoded(b'\x05hello', 'hello')
+        self.assertEncoded(b'\x01\xc3\x83', 'Ã')
+        self.assertEncoded(b'\x20', b'')
+        self.assertEncoded(b'\x23\x01\x02\x03', b'\x01\x02\x03')
+        self.assertEncoded(b'\x7a\x91\x92', [1, 2])
+        self.assertEncoded(b'H\x91\x03fee\xa0\x03fie\xc9\x00\x03foeZ', {1: 'fee', 16: 'fie', 256: 'foe'})
+
+    def test_decode_only_forms(self):
+        decoder = self.decoder
+        self.assertEqual(1, decoder.decode(b'\xe1'))
+        self.assertEqual(-8, decoder.decode(b'\xd8'))
+        self.assertEqual(2048, decoder.decode(b'\x3c\x08\x00'))
+        self.assertEqual(300, decoder.decode(b'Y\x00\x00\x01\x2c'))
+        self.assertEqual([1, 2], decoder.decode(b'V\x04[int\x92\x91\x92'))
+        self.assertEqual([1, 2], decoder.decode(b'\x72\x04[int\x91\x92'))
+        self.assertEqual([1, 2], decoder.decode(b'W\x91\x92Z'))
+        self.assertEqual({1: 'fee'}, decoder.decode(b'M\x13com.caucho.test.Car\x91\x03feeZ'))
+        self.assertEqual(
+            datetime.fromtimestamp(894621091),
+            decoder.decode(b'J\x00\x00\x00\xd0\x4b\x92\x84\xb8'),
+        )
+        self.assertEqual('hello world', decoder.decode(b'R\x00\x06hello \x05world'))
+
+    def test_strings(self):
+        for value in ('a' * 31, 'a' * 32, 'é' * 1023, 'b' * 1024, 'x' * 100000, '中文', '😀' * 3, 'a😀' * 20000):
+            self.assertEqual(value, self.decoder.decode(self.encoder.encode(value)))
+        # Characters outside the BMP count as two UTF-16 units, as in Java.
+        self.assertEqual(b'\x02\xed\xa0\xbd\xed\xb8\x80', self.encoder.encode('😀'))
+
+    def test_binary(self):
+        for value in (b'x' * 15, b'x' * 16, b'y' * 1023, bytes(range(256)) * 300):
+            self.assertEqual(value, self.decoder.decode(self.encoder.encode(value)))
+
+    def test_objects(self):
+        car = JavaObject('example.Car', color='red', model='corvette')
+        data = self.encoder.encode([car, JavaObject('example.Car', color='green', model='civic')])
+        self.assertEqual(
+            b'\x7aC\x0bexample.Car\x92\x05color\x05model'
+            b'\x60\x03red\x08corvette\x60\x05green\x05civic',
+            data,
+        )
+        decoded = self.decoder.decode(data)
+        self.assertEqual('example.Car', decoded[0].java_class)
+        self.assertEqual('corvette', decoded[0].model)
+        self.assertEqual([car, {'color': 'green', 'model': 'civic'}], decoded)
+
+    def test_class_definitions_cached(self):
+        car = JavaObject('example.Car', color='red', model='corvette')
+        first = self.decoder.decode(self.encoder.encode(car))
+        second = self.decoder.decode(self.encoder.encode(car))
+        self.assertEqual(first, second)
+        self.assertEqual(1, len(self.encoder._definitions))
+        self.assertEqual(1, len(self.decoder._definitions))
+        # Names are shared across messages instead of decoded again.
+        self.assertIs(list(first.keys())[0], list(second.keys())[0])
+
+    def test_refs(self):
+        decoded = self.decoder.decode(b'\x7aH\x01a\x91Z\x51\x91')
+        self.assertIs(decoded[0], decoded[1])
+
+    def test_decimal(self):
+        self.assertEqual(Decimal('12.30'), self.decoder.decode(self.encoder.encode(Decimal('12.30'))))
+
+    def test_sequential_reads(self):
+        data = self.encoder.encode('2.0.2', 1, {'a': 'b'})
+        self.decoder.reset(memoryview(data))
+        self.assertEqual('2.0.2', self.decoder.read())
+        self.assertEqual(1, self.decoder.read())
+        self.assertEqual({'a': 'b'}, self.decoder.read())
+        self.assertEqual(len(data), self.decoder.position)
+
+    def test_unsupported(self):
+        with self.assertRaises(TypeError):
+            self.encoder.encode(object())
+
+
+if __name__ == '__main__':
+    unittest.main()
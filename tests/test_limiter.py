@@ -0,0 +1,60 @@
+import asyncio
+import unittest
+
+from dubbo.exceptions import ConcurrencyLimitError, RpcTimeoutError
+from dubbo.limiter import AdaptiveLimiter
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+
+    def test_queue(self):
+        asyncio.run(self._test_queue())
+
+    async def _test_queue(self):
+        limiter = AdaptiveLimiter(initial=2, max_queue=2)
+        self.assertTrue(limiter.try_acquire())
+        await limiter.acquire()
+        self.assertTrue(limiter.saturated)
+        self.assertFalse(limiter.try_acquire())
+        waiters = [asyncio.ensure_future(limiter.acquire()) for _ in range(2)]
+        await asyncio.sleep(0)
+        self.assertEqual(2, limiter.queued)
+        with self.assertRaises(ConcurrencyLimitError):
+            await limiter.acquire()
+        limiter.release(0.01)
+        await asyncio.sleep(0)
+        self.assertTrue(waiters[0].done())
+        self.assertFalse(waiters[1].done())
+        self.assertEqual(2, limiter.inflight)
+        waiters[1].cancel()
+        await asyncio.sleep(0)
+        self.assertEqual(0, limiter.queued)
+        with self.assertRaises(RpcTimeoutError):
+            await limiter.acquire(0.01)
+        self.assertEqual(0, limiter.queued)
+
+    def test_aimd(self):
+        limiter = AdaptiveLimiter(initial=10, max_limit=12)
+        for _ in range(200):
+            for _ in range(10):
+                self.assertTrue(limiter.try_acquire())
+            for _ in range(10):
+                limiter.release(0.01)
+        self.assertEqual(12, limiter.limit)
+        # A latency spike, then drops, back off multiplicatively.
+        limiter.try_acquire()
+        limiter.release(0.1)
+        self.assertEqual(10, limiter.limit)
+        limiter._decreased = 0
+        limiter.try_acquire()
+        limiter.release(None)
+        self.assertEqual(9, limiter.limit)
+        for _ in range(20):
+            limiter._decreased = 0
+            limiter.try_acquire()
+            limiter.release(None)
+        self.assertEqual(1, limiter.limit)
+
+
+if __name__ == '__main__':
+    unittest.main()
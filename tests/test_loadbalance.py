@@ -0,0 +1,97 @@
+from collections import Counter
+import random
+import time
+import unittest
+
+from dubbo.loadbalance import (
+    ConsistentHashLoadBalance,
+    LeastActiveLoadBalance,
+    LoadBalanceFactory,
+    P2CLoadBalance,
+    RandomLoadBalance,
+    warmup_weight,
+)
+from dubbo.registry import Instance
+
+
+class TestLoadBalance(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(7)
+
+    def test_factory(self):
+        self.assertIsInstance(LoadBalanceFactory.get_loadbalance('random'), RandomLoadBalance)
+        self.assertIsInstance(LoadBalanceFactory.get_loadbalance('p2c'), P2CLoadBalance)
+
+    def test_warmup_weight(self):
+        now = time.time()
+        self.assertEqual(100, warmup_weight(Instance('a:1'), now))
+        self.assertEqual(100, warmup_weight(Instance('a:1', timestamp=int(now * 1000) - 600000), now))
+        self.assertEqual(50, warmup_weight(Instance('a:1', timestamp=int(now * 1000) - 300000), now))
+        self.assertEqual(1, warmup_weight(Instance('a:1', timestamp=int(now * 1000) + 1000), now))
+        self.assertEqual(0, warmup_weight(Instance('a:1', weight=0), now))
+
+    def test_weighted_random(self):
+        instances = (Instance('a:1', 100), Instance('b:1', 300), Instance('c:1', 0))
+        loadbalance = RandomLoadBalance()
+        counter = Counter(loadbalance.select(instances, 'm', ()).netloc for _ in range(8000))
+        self.assertNotIn('c:1', counter)
+        self.assertAlmostEqual(3, counter['b:1'] / counter['a:1'], delta=0.3)
+
+    def test_rebuild_on_change(self):
+        loadbalance = RandomLoadBalance()
+        first = (Instance('a:1'),)
+        loadbalance.select(first, 'm', ())
+        weights = loadbalance._weights
+        loadbalance.select(first, 'm', ())
+        self.assertIs(weights, loadbalance._weights)
+        second = (Instance('a:1'), Instance('b:1'))
+        loadbalance.select(second, 'm', ())
+        self.assertIsNot(weights, loadbalance._weights)
+
+    def test_least_active(self):
+        instances = (Instance('a:1'), Instance('b:1'), Instance('c:1'))
+        loadbalance = LeastActiveLoadBalance()
+        loadbalance.start(instances[0])
+        loadbalance.start(instances[1])
+        self.assertEqual('c:1', loadbalance.select(instances, 'm', ()).netloc)
+        loadbalance.finish(instances[0], 0.01)
+        self.assertIn(loadbalance.select(instances, 'm', ()).netloc, ('a:1', 'c:1'))
+
+    def test_p2c_prefers_fast(self):
+        instances = (Instance('fast:1'), Instance('slow:1'))
+        loadbalance = P2CLoadBalance()
+        for _ in range(10):
+            loadbalance.start(instances[0])
+            loadbalance.finish(instances[0], 0.001)
+            loadbalance.start(instances[1])
+            loadbalance.finish(instances[1], 0.5)
+        counter = Counter(loadbalance.select(instances, 'm', ()).netloc for _ in range(100))
+        self.assertEqual(100, counter['fast:1'])
+
+    def test_p2c_retain(self):
+        instances = (Instance('fast:1'), Instance('slow:1'))
+        loadbalance = P2CLoadBalance()
+        loadbalance.start(instances[1])
+        loadbalance.finish(instances[1], 0.5)
+        # A view leaving the slow provider out does not forget its latency,
+        # only the providers the registry no longer has are.
+        loadbalance.select(instances[:1], 'm', ())
+        self.assertEqual(0.5, loadbalance._latency['slow:1'])
+        loadbalance.retain({'fast:1'})
+        self.assertNotIn('slow:1', loadbalance._latency)
+
+    def test_consistent_hash(self):
+        instances = tuple(Instance(f'10.0.0.{i}:20880') for i in range(10))
+        loadbalance = ConsistentHashLoadBalance()
+        selected = {key: loadbalance.select(instances, 'm', (key,)) for key in range(200)}
+        self.assertTrue(all(selected[key] == loadbalance.select(instances, 'm', (key, 'x')) for key in range(200)))
+        self.assertGreater(len(set(selected.values())), 5)
+        # Removing one provider only moves the keys it owned.
+        remaining = instances[1:]
+        moved = [key for key in range(200) if loadbalance.select(remaining, 'm', (key,)) != selected[key]]
+        self.assertTrue(all(selected[key] == instances[0] for key in moved))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+from dubbo.common.config import ProtocolConfig, ReferenceConfig
+from dubbo.exceptions import NoProviderError
+from dubbo.metrics import METRICS, Histogram, Metrics, MetricsApp
+from tests.test_proxy import start_proxy
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_buckets(self):
+        histogram = Histogram()
+        self.assertIsNone(histogram.quantile(0.5))
+        for value in (0, 1e-6, 1.9e-6, 3e-6, 1e-3, 1e9):
+            histogram.record(value)
+        self.assertEqual(6, len(histogram))
+        upper = [bound for bound, _ in histogram.buckets()]
+        self.assertEqual([1.25e-6, 2e-6, 3.5e-6], [round(bound, 12) for bound in upper[:3]])
+        # Every value is within a quarter power of two of its bucket's bound.
+        self.assertTrue(1e-3 < upper[3] <= 1.25e-3)
+        self.assertEqual(histogram.upper(127), upper[-1])
+
+    def test_quantile(self):
+        histogram = Histogram()
+        for i in range(1, 1001):
+            histogram.record(i / 1000)
+        for q in (0.5, 0.9, 0.99):
+            self.assertLessEqual(q, histogram.quantile(q))
+            self.assertLess(histogram.quantile(q), q * 1.25)
+        other = Histogram()
+        other.record(5.0)
+        histogram.merge(other)
+        self.assertEqual(1001, histogram.summary()['count'])
+        self.assertGreaterEqual(histogram.quantile(1.0), 5.0)
+        histogram.clear()
+        self.assertEqual(0, len(histogram))
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        METRICS.clear()
+
+    def test_calls(self):
+        asyncio.run(self._test_calls())
+
+    async def _test_calls(self):
+        reference_config = ReferenceConfig('com.example.DemoService', '1.0', protocols=(ProtocolConfig(),), timeout=0.1, metrics_sample=1)
+        server, proxy = await start_proxy(reference_config, delay=0.01)
+        for _ in range(3):
+            await proxy.invoke('hello', ('world',))
+        port = server.sockets[0].getsockname()[1]
+        proxy._registry.unregister(f'dubbo://127.0.0.1:{port}/com.example.DemoService?version=1.0')
+        with self.assertRaises(NoProviderError):
+            await proxy.invoke('hello', ('world',))
+        snapshot = METRICS.snapshot()
+        reference = snapshot['references'][reference_config.id]
+        self.assertEqual(4, reference['calls'])
+        self.assertEqual(1, reference['errors'])
+        method = reference['methods']['hello']
+        self.assertEqual(3, method['rtt']['count'])
+        self.assertGreaterEqual(method['rtt']['p50'], 0.01)
+        self.assertGreater(method['request_size']['p50'], 0)
+        self.assertEqual(3, method['deserialize']['count'])
+        # The provider's RTTs are forgotten along with the provider.
+        self.assertEqual({}, reference['providers'])
+        registry = snapshot['registries']['memory://']
+        self.assertEqual(1, registry['fetches'])
+        self.assertEqual(2, registry['updates'])
+        self.assertEqual((1, 1), (registry['added'], registry['removed']))
+        proxy._pool.close()
+        server.close()
+
+    def test_sampled(self):
+        asyncio.run(self._test_sampled())
+
+    async def _test_sampled(self):
+        reference_config = ReferenceConfig('com.example.DemoService', '1.0', protocols=(ProtocolConfig(),), metrics_sample=4)
+        server, proxy = await start_proxy(reference_config, delay=0)
+        for _ in range(4):
+            await proxy.invoke('hello', ('world',))
+        with mock.patch.object(Histogram, 'record', autospec=True, side_effect=Histogram.record) as record:
+            for _ in range(3):
+                await proxy.invoke('hello', ('world',))
+            # Unsampled calls record nothing but the count of calls.
+            self.assertEqual(0, record.call_count)
+            await proxy.invoke('hello', ('world',))
+            self.assertEqual(7, record.call_count)
+        method = METRICS.snapshot()['references'][reference_config.id]['methods']['hello']
+        self.assertEqual(8, method['calls'])
+        self.assertEqual(2, method['rtt']['count'])
+        self.assertEqual(2, method['deserialize']['count'])
+        proxy._pool.close()
+        server.close()
+
+    def test_app(self):
+        asyncio.run(self._test_app())
+
+    async def _test_app(self):
+        metrics = Metrics()
+        metrics.registry('memory://').fetches += 1
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await MetricsApp(metrics)({'type': 'http', 'method': 'GET', 'path': '/'}, None, send)
+        self.assertEqual(200, messages[0]['status'])
+        body = json.loads(messages[1]['body'])
+        self.assertEqual(1, body['registries']['memory://']['fetches'])
+        messages.clear()
+        await MetricsApp(metrics)({'type': 'http', 'method': 'POST', 'path': '/'}, None, send)
+        self.assertEqual(405, messages[0]['status'])
+
+
+if __name__ == '__main__':
+    unittest.main()
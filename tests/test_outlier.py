@@ -0,0 +1,114 @@
+import unittest
+from unittest import mock
+
+from dubbo.outlier import CallWindow, OutlierDetector
+from dubbo.registry import Instance
+
+
+class TestCallWindow(unittest.TestCase):
+
+    def test_ring(self):
+        window = CallWindow(4)
+        self.assertEqual(0.0, window.error_rate)
+        for ok in (False, False, True, True):
+            window.record(ok, 0.1)
+        self.assertEqual(4, len(window))
+        self.assertEqual(0.5, window.error_rate)
+        # The oldest outcomes are overwritten.
+        window.record(True, 0.5)
+        window.record(True, 0.5)
+        self.assertEqual(4, len(window))
+        self.assertEqual(0.0, window.error_rate)
+        self.assertAlmostEqual(0.3, window.latency)
+        window.clear()
+        self.assertEqual(0, len(window))
+
+
+class TestOutlierDetector(unittest.TestCase):
+
+    def setUp(self):
+        self.instances = tuple(Instance(f'{host}:1') for host in 'abcd')
+        self.now = 1000.0
+        patcher = mock.patch('dubbo.outlier.time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_error_rate(self):
+        detector = OutlierDetector(size=10, min_calls=5, base_ejection=10.0)
+        self.assertIs(self.instances, detector.healthy(self.instances))
+        for _ in range(4):
+            detector.record('a:1', False, 0.01)
+        self.assertFalse(detector.ejected)
+        detector.record('a:1', False, 0.01)
+        self.assertEqual({'a:1'}, detector.ejected)
+        healthy = detector.healthy(self.instances)
+        self.assertEqual(self.instances[1:], healthy)
+        self.assertIs(healthy, detector.healthy(self.instances))
+        # Calls that were in flight while it got ejected are ignored.
+        detector.record('a:1', True, 0.01)
+        self.assertIsNone(detector.probe(self.instances))
+
+    def test_latency(self):
+        detector = OutlierDetector(size=10, min_calls=5)
+        detector.healthy(self.instances)
+        for _ in range(100):
+            for netloc in ('b:1', 'c:1', 'd:1'):
+                detector.record(netloc, True, 0.01)
+        for _ in range(5):
+            detector.record('a:1', True, 0.1)
+        self.assertEqual({'a:1'}, detector.ejected)
+
+    def test_max_ejected_ratio(self):
+        detector = OutlierDetector(size=10, min_calls=5)
+        detector.healthy(self.instances)
+        for netloc in ('a:1', 'b:1', 'c:1'):
+            for _ in range(5):
+                detector.record(netloc, False, 0.01)
+        self.assertEqual({'a:1', 'b:1'}, detector.ejected)
+
+    def test_probe(self):
+        detector = OutlierDetector(size=10, min_calls=5, base_ejection=10.0)
+        detector.healthy(self.instances)
+        for _ in range(5):
+            detector.record('a:1', False, 0.01)
+        self.now += 10.0
+        probe = detector.probe(self.instances)
+        self.assertEqual(self.instances[0], probe)
+        # One probe at a time.
+        self.assertIsNone(detector.probe(self.instances))
+        # A failed probe doubles the ejection.
+        detector.record('a:1', False, 0.01)
+        self.now += 10.0
+        self.assertIsNone(detector.probe(self.instances))
+        self.now += 10.0
+        self.assertEqual(probe, detector.probe(self.instances))
+        # A call that tells nothing lets the next one probe.
+        detector.release('a:1')
+        self.assertEqual(probe, detector.probe(self.instances))
+        detector.record('a:1', True, 0.01)
+        self.assertFalse(detector.ejected)
+        self.assertIs(self.instances, detector.healthy(self.instances))
+
+    def test_gone(self):
+        detector = OutlierDetector(size=10, min_calls=5, base_ejection=10.0)
+        detector.healthy(self.instances)
+        for _ in range(5):
+            detector.record('a:1', False, 0.01)
+        self.now += 10.0
+        self.assertIsNone(detector.probe(self.instances[1:]))
+        self.assertFalse(detector.ejected)
+
+    def test_retain(self):
+        detector = OutlierDetector(size=10, min_calls=5)
+        detector.healthy(self.instances)
+        for _ in range(5):
+            detector.record('a:1', False, 0.01)
+        detector.record('b:1', True, 0.01)
+        detector.retain({'b:1', 'c:1'})
+        self.assertEqual({'b:1'}, set(detector._providers))
+        self.assertFalse(detector.ejected)
+        self.assertIs(self.instances, detector.healthy(self.instances))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from dubbo.common.config import ProtocolConfig
+from dubbo.exceptions import ConnectError, RpcError
+from dubbo.pool import ConnectionPool, Endpoint
+from tests.test_transport import start_provider
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def test_shared_connection(self):
+        asyncio.run(self._test_shared_connection())
+
+    async def _test_shared_connection(self):
+        server, port = await start_provider()
+        pool = ConnectionPool()
+        protocol_config = ProtocolConfig()
+        netloc = f'127.0.0.1:{port}'
+        protocols = await asyncio.gather(*[pool.acquire(netloc, protocol_config) for _ in range(100)])
+        self.assertEqual(1, len(set(protocols)))
+        self.assertIs(protocols[0], await pool.acquire(netloc, ProtocolConfig()))
+        self.assertEqual(1, len(pool))
+        pool.close()
+        server.close()
+
+    @mock.patch.object(Endpoint, 'GROW_INFLIGHT', 2)
+    def test_grow_on_demand(self):
+        asyncio.run(self._test_grow_on_demand())
+
+    async def _test_grow_on_demand(self):
+        server, port = await start_provider(delay=0.05)
+        pool = ConnectionPool()
+        protocol_config = ProtocolConfig(connections=3)
+        netloc = f'127.0.0.1:{port}'
+        endpoint = pool.endpoint(netloc, protocol_config)
+        futures = []
+        for _ in range(50):
+            protocol = await pool.acquire(netloc, protocol_config)
+            futures.append(protocol.request(b'x'))
+            await asyncio.sleep(0)
+        self.assertEqual(3, len(endpoint.connections))
+        await asyncio.gather(*futures)
+        pool.close()
+        server.close()
+
+    def test_evict_idle(self):
+        asyncio.run(self._test_evict_idle())
+
+    async def _test_evict_idle(self):
+        server, port = await start_provider()
+        pool = ConnectionPool()
+        protocol_config = ProtocolConfig(idle_timeout=60)
+        netloc = f'127.0.0.1:{port}'
+        protocol = await pool.acquire(netloc, protocol_config)
+        self.assertEqual(0, pool.evict())
+        self.assertEqual(1, pool.evict(time.monotonic() + 120))
+        self.assertFalse(protocol.connected)
+        self.assertIsNot(protocol, await pool.acquire(netloc, protocol_config))
+        pool.close()
+        server.close()
+
+    @mock.patch.object(ConnectionPool, 'HEARTBEAT_TICK', 0.01)
+    def test_heartbeat(self):
+        asyncio.run(self._test_heartbeat())
+
+    async def _test_heartbeat(self):
+        server, port = await start_provider()
+        pool = ConnectionPool()
+        protocol_config = ProtocolConfig(heartbeat=0.05)
+        protocol = await pool.acquire(f'127.0.0.1:{port}', protocol_config)
+        connected = protocol.last_read
+        await asyncio.sleep(0.3)
+        # Idle, but kept alive by answered heartbeats.
+        self.assertGreater(protocol.last_read, connected + 0.1)
+        self.assertIs(protocol, await pool.acquire(f'127.0.0.1:{port}', protocol_config))
+        pool.close()
+        server.close()
+
+    @mock.patch.object(ConnectionPool, 'HEARTBEAT_TICK', 0.01)
+    @mock.patch.object(Endpoint, 'RECONNECT_DELAY', 0.01)
+    def test_reconnect_dead(self):
+        asyncio.run(self._test_reconnect_dead())
+
+    async def _test_reconnect_dead(self):
+        # A provider that accepts but never answers.
+        server, port = await start_provider(delay=10)
+        pool = ConnectionPool()
+        protocol_config = ProtocolConfig(heartbeat=0.05)
+        netloc = f'127.0.0.1:{port}'
+        endpoint = pool.endpoint(netloc, protocol_config)
+        protocol = await pool.acquire(netloc, protocol_config)
+        with mock.patch.object(protocol, 'heartbeat', wraps=protocol.heartbeat) as heartbeat:
+            await asyncio.sleep(0.25)
+        self.assertFalse(protocol.connected)
+        # Probed once per heartbeat interval, not on every sweep.
+        self.assertLessEqual(heartbeat.call_count, Endpoint.MISSED_HEARTBEATS)
+        self.assertEqual(1, len(endpoint.connections))
+        self.assertIsNot(protocol, endpoint.connections[0])
+        pool.close()
+        server.close()
+
+    def test_connect_error(self):
+        asyncio.run(self._test_connect_error())
+
+    async def _test_connect_error(self):
+        server, port = await start_provider()
+        server.close()
+        await server.wait_closed()
+        pool = ConnectionPool()
+        with self.assertRaises(ConnectError) as raised:
+            await pool.acquire(f'127.0.0.1:{port}', ProtocolConfig())
+        self.assertIsInstance(raised.exception, RpcError)
+
+        async def never(*args, **kwargs):
+            await asyncio.sleep(10)
+
+        loop = asyncio.get_running_loop()
+        with mock.patch.object(loop, 'create_connection', never):
+            started = time.monotonic()
+            with self.assertRaises(ConnectError):
+                await pool.acquire('127.0.0.1:1', ProtocolConfig(connect_timeout=0.05))
+            self.assertLess(time.monotonic() - started, 1)
+        pool.close()
+
+    def test_prune(self):
+        asyncio.run(self._test_prune())
+
+    async def _test_prune(self):
+        server, port = await start_provider()
+        pool = ConnectionPool()
+        protocol_config = ProtocolConfig(idle_timeout=60)
+        await pool.acquire(f'127.0.0.1:{port}', protocol_config)
+        pool.endpoint('127.0.0.1:1', protocol_config)
+        self.assertEqual(2, len(pool._endpoints))
+        # Only the endpoint without connections goes.
+        self.assertEqual(1, pool.prune())
+        self.assertEqual(1, len(pool._endpoints))
+        pool.evict(time.monotonic() + 120)
+        self.assertEqual(1, pool.prune())
+        self.assertEqual(0, len(pool._endpoints))
+        pool.close()
+        server.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,332 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from dubbo.codec import RESPONSE_NULL_VALUE
+from dubbo.common.config import ApplicationConfig, CenterConfig, MethodConfig, ProtocolConfig, ReferenceConfig
+from dubbo.context import deadline
+from dubbo.exceptions import ConcurrencyLimitError, ConnectError, RpcTimeoutError
+from dubbo.hedge import HedgeBudget
+from dubbo.hessian2 import Encoder
+from dubbo.pool import ConnectionPool
+from dubbo.proxy import Proxy
+from dubbo.registry import MemoryRegistry
+from dubbo.transport import HEADER, MAGIC, STATUS_OK
+from tests.test_transport import EchoProviderProtocol
+
+
+class SlowProviderProtocol(EchoProviderProtocol):
+    """Answers every call with null after at least ``delay``, keeping the requests."""
+
+    requests: list = []
+
+    def data_received(self, data):
+        self.requests.append(bytes(data))
+        super().data_received(data)
+
+    def _reply(self, flag, request_id, body):
+        asyncio.get_running_loop().call_later(self._delay, self._reply_null, flag, request_id)
+
+    def _reply_null(self, flag, request_id):
+        if not self.transport.is_closing():
+            body = Encoder().encode(RESPONSE_NULL_VALUE)
+            self.transport.write(HEADER.pack(MAGIC, flag, STATUS_OK, request_id, len(body)) + body)
+
+
+async def start_proxy(reference_config, delay):
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(lambda: SlowProviderProtocol(delay), '127.0.0.1', 0)
+    registry = MemoryRegistry(ApplicationConfig('test'), CenterConfig('memory://'))
+    port = server.sockets[0].getsockname()[1]
+    registry.register(f'dubbo://127.0.0.1:{port}/{reference_config.interface}?version=1.0')
+    return server, Proxy(reference_config, registry, ConnectionPool())
+
+
+class TestProxyTimeout(unittest.TestCase):
+
+    def setUp(self):
+        SlowProviderProtocol.requests = []
+
+    def test_timeout(self):
+        asyncio.run(self._test_timeout())
+
+    async def _test_timeout(self):
+        reference_config = ReferenceConfig(
+            'com.example.DemoService', '1.0', protocols=(ProtocolConfig(),), timeout=0.02,
+            methods=(MethodConfig('slow', timeout=0.5),),
+        )
+        server, proxy = await start_proxy(reference_config, delay=0.05)
+        with self.assertRaises(RpcTimeoutError):
+            await proxy.invoke('fast', ())
+        self.assertIsNone(await proxy.invoke('slow', ()))
+        self.assertIn(b'timeout\x03500', SlowProviderProtocol.requests[-1])
+        proxy._pool.close()
+        server.close()
+
+    def test_deadline(self):
+        asyncio.run(self._test_deadline())
+
+    async def _test_deadline(self):
+        reference_config = ReferenceConfig('com.example.DemoService', '1.0', protocols=(ProtocolConfig(),))
+        server, proxy = await start_proxy(reference_config, delay=0.01)
+        with deadline(0.3):
+            with deadline(5):
+                self.assertIsNone(await proxy.invoke('call', ()))
+        # The shorter, inherited deadline is propagated to the provider.
+        self.assertRegex(SlowProviderProtocol.requests[-1], rb'timeout\x03[12]\d\d')
+        sent = len(SlowProviderProtocol.requests)
+        with deadline(0):
+            with self.assertRaises(RpcTimeoutError):
+                await proxy.invoke('call', ())
+        self.assertEqual(sent, len(SlowProviderProtocol.requests))
+        proxy._pool.close()
+        server.close()
+
+    def test_connect_timeout(self):
+        asyncio.run(self._test_connect_timeout())
+
+    async def _test_connect_timeout(self):
+        reference_config = ReferenceConfig(
+            'com.example.DemoService', '1.0', protocols=(ProtocolConfig(connect_timeout=10),), timeout=0.05,
+        )
+        server, proxy = await start_proxy(reference_config, delay=0.01)
+
+        async def never(*args, **kwargs):
+            await asyncio.sleep(10)
+
+        loop = asyncio.get_running_loop()
+        with mock.patch.object(loop, 'create_connection', never):
+            started = time.monotonic()
+            with self.assertRaises(RpcTimeoutError):
+                await proxy.invoke('call', ())
+            # The call's own timeout bounds the wait for a connection.
+            self.assertLess(time.monotonic() - started, 0.5)
+        proxy._pool.close()
+        server.close()
+
+
+class TestProxyConcurrency(unittest.TestCase):
+
+    def test_skip_saturated(self):
+        asyncio.run(self._test_skip_saturated())
+
+    async def _test_skip_saturated(self):
+        reference_config = ReferenceConfig('com.example.DemoService', '1.0', protocols=(ProtocolConfig(),), timeout=0.3, concurrency=4, max_queue=4)
+        server, proxy = await start_proxy(reference_config, delay=0.05)
+        proxy._registry.register('dubbo://127.0.0.1:1/com.example.DemoService?version=1.0')
+        saturated = proxy._limiter('127.0.0.1:1')
+        while saturated.try_acquire():
+            pass
+        # Calls avoid the saturated provider while the other has room.
+        results = await asyncio.gather(*[proxy.invoke('call', ()) for _ in range(4)])
+        self.assertEqual([None] * 4, results)
+        # Then queue, and fail fast once every queue is full.
+        results = await asyncio.gather(*[proxy.invoke('call', ()) for _ in range(20)], return_exceptions=True)
+        self.assertEqual(8, sum(isinstance(result, ConcurrencyLimitError) for result in results))
+        self.assertGreaterEqual(results.count(None), 4)
+        proxy._pool.close()
+        server.close()
+
+    def test_burst(self):
+        asyncio.run(self._test_burst())
+
+    async def _test_burst(self):
+        # Defaults only: a healthy provider takes a burst of calls, all of
+        # them multiplexed on one connection.
+        reference_config = ReferenceConfig('com.example.DemoService', '1.0', protocols=(ProtocolConfig(),))
+        server, proxy = await start_proxy(reference_config, delay=0.01)
+        results = await asyncio.gather(*[proxy.invoke('call', ()) for _ in range(1000)], return_exceptions=True)
+        self.assertEqual([None] * 1000, results)
+        self.assertEqual(1, len(proxy._pool))
+        proxy._pool.close()
+        server.close()
+
+    def test_forget_departed(self):
+        asyncio.run(self._test_forget_departed())
+
+    async def _test_forget_departed(self):
+        reference_config = ReferenceConfig('com.example.DemoService', '1.0', protocols=(ProtocolConfig(),), concurrency=32, metrics_sample=1)
+        server, proxy = await start_proxy(reference_config, delay=0.01)
+        port = server.sockets[0].getsockname()[1]
+        self.assertIsNone(await proxy.invoke('call', ()))
+        netlocs = {f'127.0.0.1:{port}'}
+        self.assertEqual(netlocs, set(proxy._limiters))
+        self.assertEqual(netlocs, set(proxy._outliers._providers))
+        self.assertEqual(netlocs, set(proxy._metrics._providers))
+        # The provider leaves, another one takes its place.
+        other = await asyncio.get_running_loop().create_server(lambda: SlowProviderProtocol(0.01), '127.0.0.1', 0)
+        other_port = other.sockets[0].getsockname()[1]
+        proxy._registry.register(f'dubbo://127.0.0.1:{other_port}/com.example.DemoService?version=1.0')
+        proxy._registry.unregister(f'dubbo://127.0.0.1:{port}/com.example.DemoService?version=1.0')
+        self.assertIsNone(await proxy.invoke('call', ()))
+        netlocs = {f'127.0.0.1:{other_port}'}
+        self.assertEqual(netlocs, set(proxy._limiters))
+        self.assertEqual(netlocs, set(proxy._outliers._providers))
+        self.assertEqual(netlocs, set(proxy._metrics._providers))
+        proxy._pool.close()
+        server.close()
+        other.close()
+
+
+class TestProxyOutliers(unittest.TestCase):
+
+    def test_eject_unreachable(self):
+        asyncio.run(self._test_eject_unreachable())
+
+    async def _test_eject_unreachable(self):
+        reference_config = ReferenceConfig('com.example.DemoService', '1.0', protocols=(ProtocolConfig(),))
+        server, proxy = await start_proxy(reference_config, delay=0)
+        proxy._registry.register('dubbo://127.0.0.1:1/com.example.DemoService?version=1.0')
+        refused = 0
+        for _ in range(200):
+            try:
+                await proxy.invoke('call', ())
+            except ConnectError:
+                refused += 1
+        # Refused connects count against the provider, which gets ejected.
+        self.assertEqual({'127.0.0.1:1'}, proxy._outliers.ejected)
+        self.assertLess(refused, 100)
+        proxy._pool.close()
+        server.close()
+
+
+class TestProxyStubs(unittest.TestCase):
+
+    def setUp(self):
+        SlowProviderProtocol.requests = []
+
+    def test_stubs(self):
+        asyncio.run(self._test_stubs())
+
+    async def _test_stubs(self):
+        reference_config = ReferenceConfig('com.example.DemoService', '1.0', protocols=(ProtocolConfig(),))
+        server, proxy = await start_proxy(reference_config, delay=0)
+        self.assertIsNone(await proxy.sayHello('world'))
+        # Made once, then found as a plain attribute.
+        stub = proxy.sayHello
+        self.assertIs(stub, proxy.sayHello)
+        self.assertIn('sayHello', proxy.__dict__)
+        self.assertIn(b'sayHello', SlowProviderProtocol.requests[-1])
+        self.assertIn(b'Ljava/lang/String;', SlowProviderProtocol.requests[-1])
+        await proxy.sayHello(1, attachments={'trace': 'x'})
+        self.assertEqual(2, len(stub._invocations))
+        self.assertIn(b'trace', SlowProviderProtocol.requests[-1])
+        typed = proxy.stub('sayHello', ('java.lang.CharSequence',))
+        await typed('world')
+        self.assertIn(b'Ljava/lang/CharSequence;', SlowProviderProtocol.requests[-1])
+        with self.assertRaises(AttributeError):
+            proxy._missing
+        # A remote method named like one of the proxy's own.
+        self.assertTrue(asyncio.iscoroutinefunction(proxy.connect))
+        self.assertIsNone(await proxy.stub('connect')())
+        self.assertIn(b'connect', SlowProviderProtocol.requests[-1])
+        self.assertEqual(3, proxy._metrics.method('sayHello').calls)
+        self.assertEqual(1, proxy._metrics.method('connect').calls)
+        proxy._pool.close()
+        server.close()
+
+    def test_generic_invoke(self):
+        asyncio.run(self._test_generic_invoke())
+
+    async def _test_generic_invoke(self):
+        reference_config = ReferenceConfig('com.example.DemoService', '1.0', protocols=(ProtocolConfig(),))
+        server, proxy = await start_proxy(reference_config, delay=0)
+        await proxy.generic_invoke('sayHello', ('java.lang.String',), ('world',))
+        request = SlowProviderProtocol.requests[-1]
+        self.assertIn(b'$invoke', request)
+        self.assertIn(b'Ljava/lang/String;[Ljava/lang/String;[Ljava/lang/Object;', request)
+        self.assertIn(b'generic', request)
+        proxy._pool.close()
+        server.close()
+
+
+class TestProxyHedging(unittest.TestCase):
+
+    def test_hedge(self):
+        asyncio.run(self._test_hedge())
+
+    async def _test_hedge(self):
+        loop = asyncio.get_running_loop()
+        reference_config = ReferenceConfig(
+            'com.example.DemoService', '1.0', protocols=(ProtocolConfig(),),
+            methods=(MethodConfig('read', hedge=0.9),), hedge_budget=1.0,
+        )
+        server, proxy = await start_proxy(reference_config, delay=0.5)
+        fast = await loop.create_server(lambda: SlowProviderProtocol(0.005), '127.0.0.1', 0)
+        port = fast.sockets[0].getsockname()[1]
+        proxy._registry.register(f'dubbo://127.0.0.1:{port}/com.example.DemoService?version=1.0')
+        self.assertEqual(2, await proxy.connect())
+        tracker = proxy._hedges['read']
+        for _ in range(32):
+            tracker.record(0.01)
+        started = loop.time()
+        self.assertEqual([None] * 8, await asyncio.gather(*[proxy.invoke('read', ()) for _ in range(8)]))
+        # The calls to the slow provider are hedged to the fast one after 10ms.
+        self.assertLess(loop.time() - started, 0.3)
+        # The calls that lost the race count at least for how long they took.
+        self.assertGreater(max(tracker._latencies[:len(tracker)]), 0.01)
+        # Without budget, calls stuck on the slow provider wait it out.
+        proxy._hedge_budget = HedgeBudget(0.0)
+        started = loop.time()
+        await asyncio.gather(*[proxy.invoke('read', ()) for _ in range(16)])
+        self.assertGreater(loop.time() - started, 0.3)
+        # Methods without a hedge percentile are never hedged.
+        self.assertNotIn('write', proxy._hedges)
+        proxy._pool.close()
+        server.close()
+        fast.close()
+
+    def test_hedge_queued(self):
+        asyncio.run(self._test_hedge_queued())
+
+    async def _test_hedge_queued(self):
+        reference_config = ReferenceConfig('com.example.DemoService', '1.0', protocols=(ProtocolConfig(),), concurrency=1)
+        server, proxy = await start_proxy(reference_config, delay=0.01)
+        port = server.sockets[0].getsockname()[1]
+        netloc = f'127.0.0.1:{port}'
+        self.assertTrue(proxy._limiter(netloc).try_acquire())
+        tried = set()
+        selecting = asyncio.ensure_future(proxy._select('read', (), 1.0, tried))
+        await asyncio.sleep(0.01)
+        # A hedge started while the first call waits for its provider
+        # already knows to go elsewhere.
+        self.assertFalse(selecting.done())
+        self.assertEqual({netloc}, tried)
+        proxy._limiter(netloc).release(0.001)
+        instance, limiter = await selecting
+        self.assertEqual(netloc, instance.netloc)
+        limiter.release(0.001)
+        proxy._pool.close()
+        server.close()
+
+    def test_hedge_keeps_state(self):
+        asyncio.run(self._test_hedge_keeps_state())
+
+    async def _test_hedge_keeps_state(self):
+        reference_config = ReferenceConfig(
+            'com.example.DemoService', '1.0', protocols=(ProtocolConfig(),), loadbalance='p2c',
+        )
+        registry = MemoryRegistry(ApplicationConfig('test'), CenterConfig('memory://'))
+        for port in (20880, 20881, 20882):
+            registry.register(f'dubbo://127.0.0.1:{port}/com.example.DemoService?version=1.0')
+        proxy = Proxy(reference_config, registry, ConnectionPool())
+        instances = await proxy.instances()
+        loadbalance = proxy._loadbalance
+        slow = instances[0]
+        loadbalance.start(slow)
+        loadbalance.finish(slow, 0.5)
+        for _ in range(20):
+            instance, _ = await proxy._select('read', (), 1.0, {slow.netloc})
+            # A hedge avoids the slow provider without the balancer seeing
+            # a sequence of its own, which would forget the slow latency.
+            self.assertNotEqual(slow.netloc, instance.netloc)
+            self.assertIs(instances, loadbalance._instances)
+        self.assertEqual(0.5, loadbalance._latency[slow.netloc])
+        picked = [(await proxy._select('read', (), 1.0))[0].netloc for _ in range(100)]
+        self.assertNotIn(slow.netloc, picked)
+        registry.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,13 +2,25 @@ import os
 import asyncio
 from typing import Optional
 from time import sleep
+import tempfile
 import urllib.parse
 import unittest
+from unittest import mock
 
 from kazoo.client import KazooClient
-from dubbo.config import ApplicationConfig, CenterConfig, ReferenceConfig
 
-from dubbo.registry import RegistryFactory
+from dubbo.config import ApplicationConfig, CenterConfig, ReferenceConfig
+from dubbo.registry import (
+    Debouncer,
+    FileRegistry,
+    MemoryRegistry,
+    Registry,
+    RegistryFactory,
+    Selector,
+    _consume,
+    parse_node,
+)
+from dubbo.snapshot import Snapshot
 
 
 def my_listener(state):
@@ -62,6 +74,233 @@ class TestRegistry(unittest.TestCase):
             self.assertGreaterEqual(len(children), 0)
 
 
+def child(netloc: str, version: str = '', group: str = '', **query) -> str:
+    if version:
+        query['version'] = version
+    if group:
+        query['group'] = group
+    url = f'dubbo://{netloc}/com.example.DemoService?{urllib.parse.urlencode(query)}'
+    return urllib.parse.quote(url, safe='')
+
+
+class TestNodeIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = Registry(ApplicationConfig('test'), CenterConfig('test://local'))
+        self.registry._update('com.example.DemoService', [
+            child('a:1', '1.0'),
+            child('b:1', '1.0', 'g1'),
+            child('c:1', '1.0', 'g2'),
+            child('d:1', '2.0', 'g1', weight='200'),
+            child('a:1', '2.0'),
+        ])
+        self.index = self.registry._nodes['com.example.DemoService']
+
+    def lookup(self, version, group):
+        return sorted({instance.netloc for instance in self.index.lookup(Selector.of(version, group)).values()})
+
+    def test_lookup(self):
+        self.assertEqual(['a:1'], self.lookup('1.0', None))
+        self.assertEqual(['b:1'], self.lookup('1.0', 'g1'))
+        self.assertEqual(['b:1', 'c:1'], self.lookup('1.0', 'g1,g2'))
+        self.assertEqual(['a:1', 'b:1', 'c:1'], self.lookup('1.0', '*'))
+        self.assertEqual(['b:1', 'd:1'], self.lookup('*', 'g1'))
+        self.assertEqual(['a:1', 'b:1', 'c:1', 'd:1'], self.lookup('*', '*'))
+        self.assertEqual([], self.lookup('3.0', '*'))
+        self.assertEqual(200, list(self.index.lookup(Selector.of('2.0', 'g1')).values())[0].weight)
+        self.assertTrue(Selector.of('*', 'g1').matches(('2.0', 'g1')))
+        self.assertFalse(Selector.of('1.0', 'g1,g2').matches(('2.0', 'g1')))
+        self.assertFalse(Selector.of('2.0', None).matches(('2.0', 'g1')))
+
+    def test_node(self):
+        node = parse_node(child('a:1', '1.0', 'g1', weight='200', methods='sayHello,sayBye', pid='42'))
+        other = parse_node(child('b:1', '1.0', 'g1', methods='sayHello,sayBye'))
+        self.assertEqual(('dubbo', 'a:1', '1.0', 'g1', 200), (node.scheme, node.netloc, node.version, node.group, node.weight))
+        self.assertIs(node.methods, other.methods)
+        self.assertEqual('42', node.get('pid'))
+        self.assertIsNone(node.get('missing'))
+        self.assertFalse(hasattr(node, '__dict__'))
+
+    def test_deltas(self):
+        reference_config = ReferenceConfig('com.example.DemoService', '*', 'g1')
+        instances = self.registry._subscribe(reference_config).instances
+        self.assertEqual(['b:1', 'd:1'], sorted(instance.netloc for instance in instances))
+        other = self.registry._subscribe(ReferenceConfig('com.example.DemoService', '1.0'))
+        unchanged = other.instances
+
+        parse_misses = parse_node.cache_info().misses
+        added, removed = self.registry._update('com.example.DemoService', [
+            child('a:1', '1.0'),
+            child('b:1', '1.0', 'g1'),
+            child('c:1', '1.0', 'g2'),
+            child('a:1', '2.0'),
+            child('e:1', '2.0', 'g1'),
+        ])
+        self.assertEqual((1, 1), (added, removed))
+        self.assertEqual(parse_misses + 1, parse_node.cache_info().misses)
+        instances = self.registry._instances[reference_config.id].instances
+        self.assertEqual(['b:1', 'e:1'], sorted(instance.netloc for instance in instances))
+        # References untouched by the delta keep the very same tuple.
+        self.assertIs(unchanged, other.instances)
+        self.assertEqual((0, 0), self.registry._update('com.example.DemoService', [
+            child('a:1', '1.0'),
+            child('b:1', '1.0', 'g1'),
+            child('c:1', '1.0', 'g2'),
+            child('a:1', '2.0'),
+            child('e:1', '2.0', 'g1'),
+        ]))
+
+
+class CountingRegistry(Registry):
+
+    __slots__ = ('fetches', 'delay')
+
+    def __init__(self, registry_config=None, delay=0.01):
+        super().__init__(ApplicationConfig('test'), registry_config or CenterConfig('test://local'))
+        self.fetches = 0
+        self.delay = delay
+
+    async def _fetch(self, interface):
+        self.fetches += 1
+        await asyncio.sleep(self.delay)
+        return [child('a:1', '1.0'), child('b:1', '1.0', 'g1')]
+
+
+class TestSubscription(unittest.TestCase):
+
+    def test_single_flight(self):
+        asyncio.run(self._test_single_flight())
+
+    async def _test_single_flight(self):
+        registry = CountingRegistry()
+        references = [ReferenceConfig('com.example.DemoService', '1.0', group) for group in ('', 'g1', '*')] * 50
+        results = await asyncio.gather(*[registry.children(reference) for reference in references])
+        self.assertEqual(1, registry.fetches)
+        self.assertEqual([['a:1'], ['b:1']], results[:2])
+        self.assertEqual(['a:1', 'b:1'], sorted(results[2]))
+        # Subscribed references are served without awaiting anything.
+        self.assertIs(
+            await registry.instances(references[0]),
+            registry._instances[references[0].id].instances,
+        )
+
+
+    def test_snapshot(self):
+        asyncio.run(self._test_snapshot())
+
+    async def _test_snapshot(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'registry.json')
+            Snapshot(path).dump({'com.example.DemoService': [child('c:1', '1.0')]})
+            registry_config = CenterConfig('test://local', snapshot=path, snapshot_interval=0.05)
+            registry = CountingRegistry(registry_config, delay=0.05)
+            reference_config = ReferenceConfig('com.example.DemoService', '1.0')
+            # Served from the snapshot while the live fetch runs behind.
+            self.assertEqual(['c:1'], await registry.children(reference_config))
+            await asyncio.sleep(0.2)
+            self.assertEqual(1, registry.fetches)
+            self.assertEqual(['a:1'], await registry.children(reference_config))
+            self.assertEqual(2, len(Snapshot(path).load()['com.example.DemoService']))
+            registry.close()
+
+
+class TestDebouncer(unittest.TestCase):
+
+    def test_coalesce(self):
+        asyncio.run(self._test_coalesce())
+
+    async def _test_coalesce(self):
+        flushed = []
+        debouncer = Debouncer(asyncio.get_running_loop(), 0.05, flushed.append)
+        for i in range(300):
+            debouncer.schedule(f'interface-{i % 3}')
+        debouncer.schedule_threadsafe('interface-3')
+        await asyncio.sleep(0.01)
+        self.assertEqual([], flushed)
+        await asyncio.sleep(0.1)
+        self.assertEqual([{'interface-0', 'interface-1', 'interface-2', 'interface-3'}], flushed)
+        debouncer.schedule('interface-0')
+        debouncer.cancel()
+        await asyncio.sleep(0.1)
+        self.assertEqual(1, len(flushed))
+
+
+def url(netloc: str, version: str = '1.0') -> str:
+    return urllib.parse.unquote(child(netloc, version))
+
+
+class TestLocalRegistry(unittest.TestCase):
+
+    def test_factory(self):
+        application_config = ApplicationConfig('test')
+        self.assertIsInstance(RegistryFactory.get_registry(application_config, CenterConfig('memory://')), MemoryRegistry)
+        with tempfile.TemporaryDirectory() as directory:
+            registry = RegistryFactory.get_registry(application_config, CenterConfig(f'file://{directory}/providers'))
+            self.assertIsInstance(registry, FileRegistry)
+            self.assertEqual(f'{directory}/providers', registry.hosts)
+
+    def test_memory(self):
+        asyncio.run(self._test_memory())
+
+    async def _test_memory(self):
+        registry = MemoryRegistry(ApplicationConfig('test'), CenterConfig('memory://'))
+        reference_config = ReferenceConfig('com.example.DemoService', '1.0')
+        registry.register(url('a:1'))
+        self.assertEqual(['a:1'], await registry.children(reference_config))
+        registry.register(url('b:1'))
+        registry.register(url('c:1', '2.0'))
+        self.assertEqual(['a:1', 'b:1'], sorted(await registry.children(reference_config)))
+        registry.unregister(url('a:1'))
+        self.assertEqual(['b:1'], await registry.children(reference_config))
+
+    def test_churn(self):
+        asyncio.run(self._test_churn())
+
+    async def _test_churn(self):
+        registry = MemoryRegistry(ApplicationConfig('test'), CenterConfig('memory://'))
+        reference_config = ReferenceConfig('com.example.DemoService', '1.0')
+        urls = [url(f'10.0.0.{i}:20880') for i in range(10)]
+        for provider in urls:
+            registry.register(provider)
+        self.assertEqual(10, len(await registry.instances(reference_config)))
+        changes = await registry.churn(urls, rate=500, duration=0.1)
+        self.assertGreater(changes, 5)
+        children = await registry.children(reference_config)
+        self.assertEqual(len(children), len(registry._providers['com.example.DemoService']))
+
+    @mock.patch.object(FileRegistry, 'POLL_INTERVAL', 0.02)
+    def test_file(self):
+        asyncio.run(self._test_file())
+
+    async def _test_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'providers')
+            with open(path, 'w') as f:
+                f.write(f'# providers\n{url("a:1")}\n\n{url("b:1")}\n')
+            registry = FileRegistry(ApplicationConfig('test'), CenterConfig(f'file://{path}'))
+            reference_config = ReferenceConfig('com.example.DemoService', '1.0')
+            self.assertEqual(['a:1', 'b:1'], sorted(await registry.children(reference_config)))
+            with open(path, 'w') as f:
+                f.write(f'{url("b:1")}\n{url("c:1")}\n')
+            os.utime(path, (0, 1))
+            await asyncio.sleep(0.1)
+            self.assertEqual(['b:1', 'c:1'], sorted(await registry.children(reference_config)))
+            os.remove(path)
+            await asyncio.sleep(0.1)
+            self.assertEqual([], await registry.children(reference_config))
+            registry.close()
+
+    def test_background_failure(self):
+        asyncio.run(self._test_background_failure())
+
+    async def _test_background_failure(self):
+        future = asyncio.get_running_loop().create_future()
+        future.set_exception(OSError('disk full'))
+        with self.assertLogs('dubbo.registry', 'WARNING') as logs:
+            _consume(future)
+        self.assertIn('disk full', logs.output[0])
+
+
 class TestZookeeper(unittest.TestCase):
 
     def test_client(self):
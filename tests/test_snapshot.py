@@ -0,0 +1,38 @@
+import json
+import os
+import tempfile
+import unittest
+
+from dubbo.snapshot import Snapshot
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'cache', 'registry.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        snapshot = Snapshot(self.path)
+        self.assertEqual({}, snapshot.load())
+        interfaces = {'com.example.DemoService': ['dubbo%3A%2F%2Fa%3A1', 'dubbo%3A%2F%2Fb%3A1']}
+        snapshot.dump(interfaces)
+        self.assertEqual(interfaces, Snapshot(self.path).load())
+        self.assertEqual(['registry.json'], os.listdir(os.path.dirname(self.path)))
+
+    def test_invalid(self):
+        snapshot = Snapshot(self.path)
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as f:
+            f.write('{"version": 1, "interfa')
+        self.assertEqual({}, snapshot.load())
+        with open(self.path, 'w') as f:
+            json.dump({'version': Snapshot.VERSION + 1, 'interfaces': {'a': []}}, f)
+        self.assertEqual({}, snapshot.load())
+
+
+if __name__ == '__main__':
+    unittest.main()
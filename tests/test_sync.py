@@ -0,0 +1,61 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import unittest
+
+from dubbo.common.config import ApplicationConfig, CenterConfig, ProtocolConfig, ReferenceConfig
+from dubbo.context import deadline
+from dubbo.exceptions import RpcTimeoutError
+from dubbo.pool import ConnectionPool
+from dubbo.proxy import Proxy
+from dubbo.registry import MemoryRegistry
+from dubbo.sync import LoopThread, SyncProxy
+from tests.test_proxy import SlowProviderProtocol
+
+
+class TestSyncProxy(unittest.TestCase):
+
+    def setUp(self):
+        self.loop_thread = LoopThread()
+        loop = self.loop_thread.loop
+        self.server = self.loop_thread.call(
+            loop.create_server(lambda: SlowProviderProtocol(0.05), '127.0.0.1', 0)
+        )
+        port = self.server.sockets[0].getsockname()[1]
+        registry = MemoryRegistry(ApplicationConfig('test'), CenterConfig('memory://'))
+        registry.register(f'dubbo://127.0.0.1:{port}/com.example.DemoService?version=1.0')
+        reference_config = ReferenceConfig('com.example.DemoService', '1.0', protocols=(ProtocolConfig(),), timeout=1.0)
+        self.pool = ConnectionPool()
+        self.proxy = SyncProxy(Proxy(reference_config, registry, self.pool))
+
+    def tearDown(self):
+        self.loop_thread.run(self.pool.close)
+        self.loop_thread.run(self.server.close)
+        self.loop_thread.stop()
+
+    def test_threads(self):
+        self.assertIs(self.loop_thread, LoopThread())
+        with ThreadPoolExecutor(16) as executor:
+            results = list(executor.map(lambda _: self.proxy.invoke('call'), range(64)))
+        self.assertEqual([None] * 64, results)
+        # Every thread's calls shared the one connection.
+        self.assertEqual(1, self.loop_thread.run(lambda: len(self.pool)))
+        self.assertEqual(1, self.loop_thread.run(lambda: next(iter(self.pool._endpoints.values())).size))
+
+    def test_deadline(self):
+        with deadline(0.01):
+            with self.assertRaises(RpcTimeoutError):
+                self.proxy.invoke('call')
+        self.assertIsNone(self.proxy.invoke('call'))
+
+    def test_loop_thread(self):
+        async def nested():
+            return self.proxy.invoke('call')
+
+        with self.assertRaises(RuntimeError):
+            self.loop_thread.call(nested())
+        with self.assertRaises(RpcTimeoutError):
+            self.loop_thread.call(asyncio.sleep(1), timeout=0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,273 @@
+import asyncio
+import random
+import unittest
+import weakref
+
+from dubbo.common.config import ProtocolConfig
+from dubbo.exceptions import ConnectionLostError, ProtocolError, RpcTimeoutError
+from dubbo.transport import (
+    FLAG_EVENT,
+    FLAG_REQUEST,
+    FLAG_TWOWAY,
+    HEADER,
+    HEADER_LENGTH,
+    HESSIAN2,
+    MAGIC,
+    STATUS_OK,
+    FrameDecoder,
+    TimerWheel,
+    connect,
+)
+
+
+def frame(request_id: int, body: bytes) -> bytes:
+    return HEADER.pack(MAGIC, HESSIAN2, STATUS_OK, request_id, len(body)) + body
+
+
+class EchoProviderProtocol(asyncio.Protocol):
+
+    def __init__(self, delay: float = 0) -> None:
+        self._delay = delay
+        self._buffer = bytearray()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self._buffer += data
+        while len(self._buffer) >= HEADER_LENGTH:
+            _, flag, _, request_id, length = HEADER.unpack_from(self._buffer)
+            if len(self._buffer) < HEADER_LENGTH + length:
+                break
+            body = bytes(self._buffer[HEADER_LENGTH:HEADER_LENGTH + length])
+            del self._buffer[:HEADER_LENGTH + length]
+            # Answer out of order to exercise request id matching.
+            delay = random.random() * self._delay
+            asyncio.get_running_loop().call_later(
+                delay, self._reply, flag & FLAG_EVENT | HESSIAN2, request_id, body
+            )
+
+    def _reply(self, flag, request_id, body):
+        if not self.transport.is_closing():
+            self.transport.write(HEADER.pack(MAGIC, flag, STATUS_OK, request_id, len(body)) + body)
+
+
+async def start_provider(delay: float = 0):
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(lambda: EchoProviderProtocol(delay), '127.0.0.1', 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+class TestFrameDecoder(unittest.TestCase):
+
+    def test_coalesced_frames(self):
+        decoder = FrameDecoder()
+        data = b''.join(frame(i, b'x' * i) for i in range(10))
+        frames = decoder.feed(data)
+        self.assertEqual(list(range(10)), [f.request_id for f in frames])
+        self.assertEqual([b'x' * i for i in range(10)], [bytes(f.body) for f in frames])
+        self.assertEqual(0, decoder.buffered)
+        # Bodies are views of the received chunk, not copies.
+        self.assertIs(data, frames[1].body.obj)
+
+    def test_partial_reads(self):
+        data = b''.join(frame(i, bytes(range(i * 7 % 256)) * 3) for i in range(50))
+        for step in (1, 3, 16, 17, 100, 1000):
+            decoder = FrameDecoder()
+            frames = []
+            for i in range(0, len(data), step):
+                frames.extend(decoder.feed(data[i:i + step]))
+            self.assertEqual(list(range(50)), [f.request_id for f in frames])
+            self.assertEqual(
+                [bytes(range(i * 7 % 256)) * 3 for i in range(50)],
+                [bytes(f.body) for f in frames],
+            )
+            self.assertEqual(0, decoder.buffered)
+
+    def test_views_survive_later_reads(self):
+        decoder = FrameDecoder()
+        data = frame(1, b'first') + frame(2, b'second')
+        frames = decoder.feed(data[:30])
+        frames += decoder.feed(data[30:])
+        frames += decoder.feed(frame(3, b'third'))
+        self.assertEqual([b'first', b'second', b'third'], [bytes(f.body) for f in frames])
+
+    def test_bad_magic(self):
+        with self.assertRaises(ProtocolError):
+            FrameDecoder().feed(b'\x00' * 32)
+
+    def test_max_payload(self):
+        decoder = FrameDecoder(max_payload=100)
+        self.assertEqual(1, len(decoder.feed(frame(1, b'x' * 100))))
+        # Rejected from the header alone, before any of the body arrives.
+        with self.assertRaises(ProtocolError):
+            decoder.feed(HEADER.pack(MAGIC, 0, STATUS_OK, 2, 101))
+
+
+class TestTimerWheel(unittest.TestCase):
+
+    def test_expire(self):
+        asyncio.run(self._test_expire())
+
+    async def _test_expire(self):
+        loop = asyncio.get_running_loop()
+        wheel = TimerWheel(loop, tick=0.01, slots=8)
+        started = loop.time()
+        futures = [loop.create_future() for _ in range(1000)]
+        for i, future in enumerate(futures):
+            # Longer than a revolution of the wheel for some of them.
+            wheel.add(future, 0.02 + i % 5 * 0.03)
+        futures[0].set_result('done')
+        self.assertEqual(1000, len(wheel))
+        await asyncio.sleep(0.1)
+        self.assertEqual(400, len(wheel))
+        expired = [future for future in futures[1:] if future.done()]
+        self.assertTrue(all(isinstance(future.exception(), RpcTimeoutError) for future in expired))
+        await asyncio.gather(*futures, return_exceptions=True)
+        self.assertGreaterEqual(loop.time() - started, 0.14)
+        self.assertEqual('done', futures[0].result())
+        await asyncio.sleep(0.02)
+        self.assertEqual(0, len(wheel))
+        self.assertIsNone(wheel._handle)
+
+    def test_completed_freed(self):
+        asyncio.run(self._test_completed_freed())
+
+    async def _test_completed_freed(self):
+        loop = asyncio.get_running_loop()
+        wheel = TimerWheel(loop)
+        future = loop.create_future()
+        wheel.add(future, 60)
+        future.set_result(bytearray(1024 * 1024))
+        reference = weakref.ref(future)
+        del future
+        # Answered calls are not held, with their responses, until they expire.
+        self.assertIsNone(reference())
+        self.assertEqual(1, len(wheel))
+        wheel.close()
+
+
+class TestTransport(unittest.TestCase):
+
+    def test_multiplexed_requests(self):
+        asyncio.run(self._test_multiplexed_requests())
+
+    async def _test_multiplexed_requests(self):
+        server, port = await start_provider(delay=0.01)
+        protocol = await connect('127.0.0.1', port)
+        bodies = [f'request-{i}'.encode() for i in range(1000)]
+        responses = await asyncio.gather(*[protocol.request(body) for body in bodies])
+        self.assertEqual(bodies, [response.body for response in responses])
+        self.assertTrue(all(response.ok for response in responses))
+        self.assertEqual(0, protocol.inflight)
+        protocol.close()
+        server.close()
+
+    def test_timeout(self):
+        asyncio.run(self._test_timeout())
+
+    async def _test_timeout(self):
+        server, port = await start_provider(delay=10)
+        protocol = await connect('127.0.0.1', port)
+        with self.assertRaises(RpcTimeoutError):
+            await protocol.request(b'x', timeout=0.05)
+        self.assertEqual(0, protocol.inflight)
+        protocol.close()
+        server.close()
+
+    def test_write_coalescing(self):
+        asyncio.run(self._test_write_coalescing())
+
+    async def _test_write_coalescing(self):
+        server, port = await start_provider()
+        for flush_bytes, writes in ((64 * 1024, 1), (1000, 21)):
+            protocol = await connect('127.0.0.1', port, protocol_config=ProtocolConfig(flush_bytes=flush_bytes))
+            calls = []
+            writelines = protocol._transport.writelines
+            protocol._transport.writelines = lambda data: calls.append(len(data)) or writelines(data)
+            # 205 frames of 100 bytes queued within one loop iteration.
+            futures = [protocol.request(bytes(84)) for _ in range(205)]
+            self.assertEqual(writes - 1, len(calls))
+            await asyncio.gather(*futures)
+            self.assertEqual(writes, len(calls))
+            self.assertEqual(410, sum(calls))
+            protocol.close()
+        server.close()
+
+    def test_backpressure(self):
+        asyncio.run(self._test_backpressure())
+
+    async def _test_backpressure(self):
+        server, port = await start_provider()
+        protocol = await connect('127.0.0.1', port)
+        self.assertTrue(protocol.writable)
+        await protocol.drain()
+        protocol.pause_writing()
+        self.assertFalse(protocol.writable)
+        drain = asyncio.ensure_future(protocol.drain())
+        await asyncio.sleep(0.01)
+        self.assertFalse(drain.done())
+        protocol.resume_writing()
+        await asyncio.wait_for(drain, 1)
+        protocol.pause_writing()
+        drain = asyncio.ensure_future(protocol.drain())
+        await asyncio.sleep(0)
+        protocol.close()
+        with self.assertRaises(ConnectionLostError):
+            await drain
+        server.close()
+
+    def test_heartbeat(self):
+        asyncio.run(self._test_heartbeat())
+
+    async def _test_heartbeat(self):
+        server, port = await start_provider()
+        protocol = await connect('127.0.0.1', port)
+        response = await protocol.heartbeat()
+        self.assertTrue(response.event)
+        protocol.close()
+        server.close()
+
+    def test_provider_heartbeat(self):
+        asyncio.run(self._test_provider_heartbeat())
+
+    async def _test_provider_heartbeat(self):
+        replies = asyncio.get_running_loop().create_future()
+
+        class ProbeProtocol(asyncio.Protocol):
+            def connection_made(self, transport):
+                flag = FLAG_REQUEST | FLAG_TWOWAY | FLAG_EVENT | HESSIAN2
+                transport.write(HEADER.pack(MAGIC, flag, 0, 7, 1) + b'N')
+
+            def data_received(self, data):
+                replies.set_result(HEADER.unpack_from(data))
+
+        server = await asyncio.get_running_loop().create_server(ProbeProtocol, '127.0.0.1', 0)
+        protocol = await connect('127.0.0.1', server.sockets[0].getsockname()[1])
+        _, flag, status, request_id, _ = await asyncio.wait_for(replies, 1)
+        self.assertEqual(7, request_id)
+        self.assertEqual(STATUS_OK, status)
+        self.assertTrue(flag & FLAG_EVENT)
+        self.assertFalse(flag & FLAG_REQUEST)
+        protocol.close()
+        server.close()
+
+    def test_connection_lost(self):
+        asyncio.run(self._test_connection_lost())
+
+    async def _test_connection_lost(self):
+        server, port = await start_provider(delay=10)
+        protocol = await connect('127.0.0.1', port)
+        futures = [protocol.request(b'x') for _ in range(10)]
+        await asyncio.sleep(0.01)
+        protocol.close()
+        for future in futures:
+            with self.assertRaises(ConnectionLostError):
+                await future
+        with self.assertRaises(ConnectionLostError):
+            await protocol.request(b'x')
+        server.close()
+
+
+if __name__ == '__main__':
+    unittest.main()